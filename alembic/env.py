@@ -22,6 +22,7 @@ if config.config_file_name is not None:
 # === SQLAlchemy models
 from app.db.base import Base
 from app import models  # force loading of all models
+from app.db.autogenerate import include_object_for, partitioned_tables
 target_metadata = Base.metadata
 
 # === Load DB variables from env (via load_project_env)
@@ -43,6 +44,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object_for(),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -58,9 +60,13 @@ def run_migrations_online() -> None:
         poolclass=pool.NullPool,
     )
 
+    # Autogenerate skips what migrations create outside the models (change tracking, partitions)
+    with connectable.connect() as connection:
+        include_object = include_object_for(partitioned_tables(connection))
+
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
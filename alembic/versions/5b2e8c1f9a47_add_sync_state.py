@@ -0,0 +1,43 @@
+"""add sync_state
+
+Revision ID: 5b2e8c1f9a47
+Revises: 31ceb0647877
+Create Date: 2026-10-18 10:12:41.553201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8c1f9a47'
+down_revision: Union[str, None] = '31ceb0647877'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # The empty initial revision relies on the schema made by init_db (Base.metadata.create_all)
+    if not inspector.has_table('customers'):
+        raise RuntimeError(
+            "❌ No application tables: create the schema with `make init-db` "
+            "(Base.metadata.create_all, then alembic upgrade head)"
+        )
+    if inspector.has_table('sync_state'):  # already created from the models
+        return
+    op.create_table(
+        'sync_state',
+        sa.Column('resource', sa.String(), nullable=False),
+        sa.Column('last_created', sa.BigInteger(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('resource'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sync_state', if_exists=True)
@@ -0,0 +1,31 @@
+"""add sync_state checkpoint columns
+
+Revision ID: 8d41f0c3b6e2
+Revises: 5b2e8c1f9a47
+Create Date: 2026-10-18 11:04:17.208634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41f0c3b6e2'
+down_revision: Union[str, None] = '5b2e8c1f9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: already there on a schema created from the models
+    op.add_column('sync_state', sa.Column('resume_after', sa.String(), nullable=True), if_not_exists=True)
+    op.add_column('sync_state', sa.Column('pending_created', sa.BigInteger(), nullable=True), if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sync_state', 'pending_created', if_exists=True)
+    op.drop_column('sync_state', 'resume_after', if_exists=True)
@@ -0,0 +1,38 @@
+"""add stripe_events
+
+Revision ID: a3f5c8e1b7d4
+Revises: e4b7d2a91c03
+Create Date: 2026-10-18 21:40:03.118724
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f5c8e1b7d4'
+down_revision: Union[str, None] = 'e4b7d2a91c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('stripe_events'):  # already created from the models
+        return
+    op.create_table(
+        'stripe_events',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('created', sa.BigInteger(), nullable=True),
+        sa.Column('object_id', sa.String(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stripe_events', if_exists=True)
@@ -0,0 +1,66 @@
+"""add foreign key and created indexes
+
+Revision ID: b6d1e4f8a209
+Revises: a3f5c8e1b7d4
+Create Date: 2026-10-18 23:12:47.530911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1e4f8a209'
+down_revision: Union[str, None] = 'a3f5c8e1b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column), named ix_<table>_<column> like the index=True declarations of the models
+INDEXES = [
+    ('customers', 'created'),
+    ('products', 'created'),
+    ('prices', 'product_id'),
+    ('prices', 'created'),
+    ('payment_methods', 'customer_id'),
+    ('payment_methods', 'created'),
+    ('subscriptions', 'customer_id'),
+    ('subscriptions', 'price_id'),
+    ('subscriptions', 'created'),
+    ('invoices', 'customer_id'),
+    ('invoices', 'created'),
+    ('payment_intents', 'customer_id'),
+    ('payment_intents', 'payment_method'),
+    ('payment_intents', 'created'),
+    ('charges', 'invoice_id'),
+    ('charges', 'payment_intent'),
+    ('charges', 'created'),
+]
+
+
+def _invalid_indexes() -> set:
+    """Indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY."""
+    return set(op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+    )).scalars())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY builds without blocking writes but cannot run in a transaction: each
+    # index is committed on its own, and a rerun skips the ones already built
+    with op.get_context().autocommit_block():
+        invalid = _invalid_indexes()
+        for table, column in INDEXES:
+            name = f'ix_{table}_{column}'
+            if name in invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, [column], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(f'ix_{table}_{column}', table_name=table, postgresql_concurrently=True, if_exists=True)
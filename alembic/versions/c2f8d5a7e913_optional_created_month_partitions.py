@@ -0,0 +1,177 @@
+"""optional created month partitions
+
+Revision ID: c2f8d5a7e913
+Revises: b6d1e4f8a209
+Create Date: 2026-10-19 00:41:26.207318
+
+Always adds charges.invoice_created / payment_intent_created (the `created` of the referenced
+rows, second half of the foreign keys once invoices and payment_intents are partitioned).
+
+Opt-in: converts invoices, payment_intents and charges only when run with
+`alembic -x partition_by_month=true upgrade head` (or PARTITION_BY_MONTH=true).
+Without it the revision is recorded and the tables stay plain; they can still be converted
+later with scripts/partition_tables.py. See app/db/partitioning.py for the layout; the
+definitions below are frozen copies of it as of this revision.
+
+"""
+import os
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8d5a7e913'
+down_revision: Union[str, None] = 'b6d1e4f8a209'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONED_TABLES = ('invoices', 'payment_intents', 'charges')
+MONTHS_AHEAD = 3
+PLACEHOLDER_CREATED = '1970-01-01'  # `created` of placeholder rows once partitioned
+
+# Indexes of the partitioned tables, named ix_<table>_<column>
+INDEXES = {
+    'invoices': ['id', 'customer_id', 'created'],
+    'payment_intents': ['id', 'customer_id', 'payment_method', 'created'],
+    'charges': ['id', 'payment_intent', 'invoice_id', 'created'],
+}
+
+# Foreign keys from or to the partitioned tables: (table, column, referenced table), named <table>_<column>_fkey
+FOREIGN_KEYS = [
+    ('invoices', 'customer_id', 'customers'),
+    ('payment_intents', 'customer_id', 'customers'),
+    ('payment_intents', 'payment_method', 'payment_methods'),
+    ('charges', 'payment_intent', 'payment_intents'),
+    ('charges', 'invoice_id', 'invoices'),
+]
+
+# (table, foreign key column) → column holding the referenced row's `created`
+REFERENCE_CREATED = {
+    ('charges', 'invoice_id'): 'invoice_created',
+    ('charges', 'payment_intent'): 'payment_intent_created',
+}
+
+
+def _enabled() -> bool:
+    value = context.get_x_argument(as_dictionary=True).get("partition_by_month", os.getenv("PARTITION_BY_MONTH", ""))
+    return value.lower() in ("1", "true", "yes")
+
+
+def _is_partitioned(table: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"), {"t": table}
+    ).scalar()
+
+
+def _next_month(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def _months(first: datetime) -> list:
+    last = datetime(datetime.now().year, datetime.now().month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    months, month = [], datetime(first.year, first.month, 1)
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _backfill_reference_created() -> None:
+    for (table, column), created in REFERENCE_CREATED.items():
+        target = next(t for s, c, t in FOREIGN_KEYS if (s, c) == (table, column))
+        op.execute(
+            f"UPDATE {table} r SET {created} = t.created FROM {target} t "
+            f"WHERE t.id = r.{column} AND r.{created} IS DISTINCT FROM t.created"
+        )
+
+
+def _drop_foreign_keys() -> None:
+    for table, column, _ in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{column}_fkey")
+
+
+def _add_foreign_keys(composite: bool) -> None:
+    for table, column, target in FOREIGN_KEYS:
+        created = REFERENCE_CREATED.get((table, column))
+        if composite and created:
+            definition = f"({column}, {created}) REFERENCES {target} (id, created) MATCH FULL DEFERRABLE"
+        else:
+            definition = f"({column}) REFERENCES {target} (id)"
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY {definition}")
+
+
+def _add_keys(table: str, primary_key: str) -> None:
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    for column in INDEXES[table]:
+        op.execute(f"CREATE INDEX ix_{table}_{column} ON {table} ({column})")
+
+
+def _partition(table: str) -> None:
+    old = f"{table}_unpartitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE (created)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN created SET NOT NULL")
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    # Placeholders stay in the default partition
+    oldest = op.get_bind().execute(sa.text(
+        f"SELECT min(created) FROM {old} WHERE created > '{PLACEHOLDER_CREATED}'")).scalar()
+    now = datetime.now()
+    for start in _months(min(oldest, now) if oldest else now):
+        op.execute(
+            f"CREATE TABLE {table}_p{start:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{_next_month(start):%Y-%m-%d}')"
+        )
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+    _add_keys(table, "id, created")
+
+
+def _unpartition(table: str) -> None:
+    old = f"{table}_partitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN created DROP NOT NULL")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")  # with its partitions
+    op.execute(
+        f"UPDATE {table} SET created = NULL "
+        f"WHERE created = '{PLACEHOLDER_CREATED}' AND stripe_metadata ->> 'placeholder' = 'true'"
+    )
+    _add_keys(table, "id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for created in REFERENCE_CREATED.values():  # already there on a database made by init_db (create_all)
+        op.execute(f"ALTER TABLE charges ADD COLUMN IF NOT EXISTS {created} timestamp")
+    _backfill_reference_created()
+    if not _enabled():
+        print("⏭️  Monthly partitioning not requested (-x partition_by_month=true): tables left as is")
+        return
+    for table in PARTITIONED_TABLES:
+        # Placeholders (no `created`) are kept: the partition key cannot be NULL
+        op.execute(f"UPDATE {table} SET created = '{PLACEHOLDER_CREATED}' WHERE created IS NULL")
+    _backfill_reference_created()
+    _drop_foreign_keys()
+    for table in PARTITIONED_TABLES:
+        _partition(table)
+        print(f"🗂️  {table}: partitioned by month")
+    _add_foreign_keys(composite=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if any(_is_partitioned(table) for table in PARTITIONED_TABLES):
+        _drop_foreign_keys()
+        for table in reversed(PARTITIONED_TABLES):
+            if _is_partitioned(table):
+                _unpartition(table)
+                print(f"🗂️  {table}: back to a plain table")
+        _add_foreign_keys(composite=False)
+    for created in REFERENCE_CREATED.values():
+        op.execute(f"ALTER TABLE charges DROP COLUMN IF EXISTS {created}")
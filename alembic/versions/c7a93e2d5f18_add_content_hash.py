@@ -0,0 +1,36 @@
+"""add content_hash to stripe tables
+
+Revision ID: c7a93e2d5f18
+Revises: 8d41f0c3b6e2
+Create Date: 2026-10-18 14:22:51.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a93e2d5f18'
+down_revision: Union[str, None] = '8d41f0c3b6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    'customers', 'products', 'prices', 'payment_methods',
+    'subscriptions', 'invoices', 'payment_intents', 'charges',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        # if_not_exists: already there on a schema created from the models
+        op.add_column(table, sa.Column('content_hash', sa.String(length=64), nullable=True), if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'content_hash', if_exists=True)
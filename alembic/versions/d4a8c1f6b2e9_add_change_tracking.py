@@ -0,0 +1,93 @@
+"""add change tracking
+
+Revision ID: d4a8c1f6b2e9
+Revises: c2f8d5a7e913
+Create Date: 2026-10-19 10:05:12.884215
+
+Adds the trigger-maintained `row_xid` column and the `row_deletions` tombstones used by
+incremental dumps (see app/db/change_tracking.py, of which the definitions below are
+frozen copies as of this revision).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8c1f6b2e9'
+down_revision: Union[str, None] = 'c2f8d5a7e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRACKED_TABLES = (
+    'customers', 'products', 'prices', 'payment_methods',
+    'subscriptions', 'invoices', 'payment_intents', 'charges',
+)
+
+FUNCTIONS = """
+CREATE OR REPLACE FUNCTION stamp_row_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.row_xid := pg_current_xact_id();
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_row_deletion() RETURNS trigger AS $$
+BEGIN
+    -- Rows moved between partitions (app.db.partitioning) are not deleted
+    IF current_setting('change_tracking.moving_rows', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- TG_ARGV[0]: the tracked table, partitions included (TG_TABLE_NAME would name the partition)
+    INSERT INTO row_deletions (table_name, row_id) VALUES (TG_ARGV[0], OLD.id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+
+def _is_partitioned(table: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"), {"t": table}
+    ).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(FUNCTIONS)
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS row_deletions ("
+        "table_name varchar NOT NULL, row_id varchar NOT NULL, "
+        "deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(), deleted_at timestamp NOT NULL DEFAULT now())"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_row_deletions_table_xid ON row_deletions (table_name, deleted_xid)")
+    for table in TRACKED_TABLES:
+        # Column without default: no table rewrite, existing rows stay NULL (covered by the first full dump)
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_xid xid8")
+        op.execute(
+            f"CREATE OR REPLACE TRIGGER {table}_stamp_row_xid BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION stamp_row_xid()"
+        )
+        op.execute(
+            f"CREATE OR REPLACE TRIGGER {table}_record_deletion AFTER DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION record_row_deletion('{table}')"
+        )
+    partitioned = {table for table in TRACKED_TABLES if _is_partitioned(table)}
+    with op.get_context().autocommit_block():
+        for table in TRACKED_TABLES:
+            # CONCURRENTLY is not supported on partitioned tables
+            op.create_index(
+                f'ix_{table}_row_xid', table, ['row_xid'], if_not_exists=True,
+                postgresql_where='row_xid IS NOT NULL',
+                postgresql_concurrently=table not in partitioned,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_stamp_row_xid ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_record_deletion ON {table}")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS row_xid")  # drops its index
+    op.execute("DROP TABLE IF EXISTS row_deletions")
+    op.execute("DROP FUNCTION IF EXISTS stamp_row_xid(), record_row_deletion()")
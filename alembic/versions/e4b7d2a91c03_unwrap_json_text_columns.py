@@ -0,0 +1,44 @@
+"""store charge/price JSON sub-objects as JSONB objects, not JSON strings
+
+Revision ID: e4b7d2a91c03
+Revises: c7a93e2d5f18
+Create Date: 2026-10-18 21:05:12.284611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7d2a91c03'
+down_revision: Union[str, None] = 'c7a93e2d5f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns the transformers used to json.dumps() before the JSONB encoding
+COLUMNS = {
+    'charges': ('billing_details', 'outcome', 'fraud_details', 'payment_method_details', 'stripe_metadata'),
+    'prices': ('recurring', 'custom_unit_amount', 'transform_quantity'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            # '"{\"a\": 1}"' → '{"a": 1}'
+            op.execute(
+                f"UPDATE {table} SET {column} = ({column} #>> '{{}}')::jsonb "
+                f"WHERE jsonb_typeof({column}) = 'string'"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            op.execute(
+                f"UPDATE {table} SET {column} = to_jsonb({column}::text) "
+                f"WHERE jsonb_typeof({column}) IN ('object', 'array')"
+            )
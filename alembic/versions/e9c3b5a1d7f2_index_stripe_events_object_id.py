@@ -0,0 +1,36 @@
+"""index stripe_events.object_id
+
+Revision ID: e9c3b5a1d7f2
+Revises: d4a8c1f6b2e9
+Create Date: 2026-10-19 10:04:26.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c3b5a1d7f2'
+down_revision: Union[str, None] = 'd4a8c1f6b2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Newest applied event per object, looked up for every event batch
+INDEXES = [
+    ('stripe_events', 'object_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(f'ix_{table}_{column}', table, [column], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(f'ix_{table}_{column}', table_name=table, postgresql_concurrently=True, if_exists=True)
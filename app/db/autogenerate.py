@@ -0,0 +1,55 @@
+"""
+Filter for Alembic autogenerate (alembic/env.py `include_object`).
+
+Some schema objects live only in the database, created by migrations and maintenance
+code rather than declared on the models:
+
+- change tracking (app.db.change_tracking): the `row_xid` columns, their partial indexes
+  and the `row_deletions` table;
+- monthly partitioning (app.db.partitioning), when enabled: the partitions, `created`
+  made NOT NULL for the (id, created) primary key, and the composite foreign keys
+  replacing the models' single-column ones.
+
+Without this filter `alembic revision --autogenerate` proposes to drop them, and the next
+`make migrate` would disable change tracking (the triggers then fail every write).
+"""
+import re
+from sqlalchemy import text
+from app.db.change_tracking import DELETIONS_TABLE, XID_COLUMN
+from app.db.partitioning import PARTITION_KEY, PARTITIONED_TABLES, REFERENCE_CREATED
+
+_PARTITION = re.compile(rf"^({'|'.join(PARTITIONED_TABLES)})_(p\d{{6}}|default)$")
+
+
+def partitioned_tables(connection) -> list:
+    """PARTITIONED_TABLES currently partitioned (uncached: Connection.info outlives the connection)."""
+    return list(connection.execute(
+        text("SELECT relname FROM pg_class WHERE relkind = 'p' AND relname = ANY(:tables)"),
+        {"tables": list(PARTITIONED_TABLES)},
+    ).scalars())
+
+
+def is_database_only(obj, name: str, type_: str, reflected: bool, partitioned=()) -> bool:
+    """True for the objects above; `partitioned` lists the tables partitioned in the database."""
+    if type_ == "table":
+        return reflected and (name == DELETIONS_TABLE or bool(_PARTITION.match(name)))
+    if type_ == "column":
+        return (reflected and name == XID_COLUMN) or (name == PARTITION_KEY and obj.table.name in partitioned)
+    if type_ == "index":
+        return reflected and name is not None and name.endswith(f"_{XID_COLUMN}")
+    if type_ == "foreign_key_constraint":
+        if reflected:
+            return any(column in REFERENCE_CREATED.values() for column in obj.column_keys)
+        return obj.referred_table.name in partitioned and any(
+            (obj.table.name, column) in REFERENCE_CREATED for column in obj.column_keys
+        )
+    return False
+
+
+def include_object_for(partitioned=()):
+    """`include_object` hook skipping database-only objects (see partitioned_tables())."""
+    partitioned = set(partitioned)
+
+    def include_object(obj, name, type_, reflected, compare_to) -> bool:
+        return not is_database_only(obj, name, type_, reflected, partitioned)
+    return include_object
@@ -0,0 +1,274 @@
+# app/db/bulk_loader.py
+import io
+import time
+from datetime import date, datetime
+from itertools import batched
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.partitioning import conflict_target, ensure_staged_partitions, is_partitioned, replace_staged_placeholders
+from app.utils import metrics
+
+COLUMNAR_BATCH_SIZE = 5000
+
+
+def _column_values(obj, columns, processors):
+    """Read an ORM instance as a row, applying Python-side column defaults like db.add() would."""
+    row = []
+    for col in columns:
+        if col.key in obj.__dict__:
+            value = obj.__dict__[col.key]
+        elif col.default is not None and col.default.is_scalar:
+            value = col.default.arg
+        elif col.default is not None and col.default.is_callable:
+            value = col.default.arg(None)
+        else:
+            # Attribute never set: the ORM leaves it out of the INSERT → SQL NULL
+            row.append(None)
+            continue
+
+        # Same bind processing as the ORM (e.g. None → JSON 'null' for JSONB columns)
+        processor = processors[col.key]
+        row.append(processor(value) if processor is not None else value)
+    return row
+
+
+def _copy_literal(value) -> str:
+    """Format one value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like object feeding COPY from a row generator without materializing the whole payload."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _stage(db: Session, model, objects, transform, columnar: bool = False) -> tuple:
+    """
+    COPY the transformed objects into a temporary `_stage_<table>` table; returns (name, rows copied).
+    Spec-compiled transformers produce rows directly; with `columnar`, rows come from the
+    batch transformers of app.transformers.columnar instead.
+    """
+    table = model.__table__
+    columns = list(table.columns)
+    column_list = ", ".join(c.name for c in columns)
+    staging = f"_stage_{table.name}"
+
+    dialect = db.get_bind().dialect
+    processors = {c.key: c.type.bind_processor(dialect) for c in columns}
+
+    tracked = metrics.current()
+
+    def processed(rows, set_in_row):
+        # Like _column_values: bind processing for values the transformer (or a default) set,
+        # columns left out stay plain NULL
+        row_processors = [processors[c.key] if is_set else None for c, is_set in zip(columns, set_in_row)]
+        for row in rows:
+            yield [process(value) if process is not None else value for process, value in zip(row_processors, row)]
+
+    def timed_rows(convert):
+        for obj in objects:
+            started = time.perf_counter()
+            row = convert(obj)
+            if tracked is not None:
+                tracked.add_time("transform", time.perf_counter() - started)
+                tracked.count("rows")
+            yield row
+
+    def object_rows():
+        # Transformers compiled from a spec (app.transformers.spec) give rows without ORM instances
+        converters = getattr(transform, "converters", None)
+        if converters is not None:
+            return processed(timed_rows(converters.to_row), converters.set_in_row)
+        return timed_rows(lambda obj: _column_values(transform(obj), columns, processors))
+
+    def columnar_rows():
+        from app.transformers.columnar import FRAME_TRANSFORMERS, to_rows
+
+        for batch in batched(objects, COLUMNAR_BATCH_SIZE):
+            started = time.perf_counter()
+            frame = FRAME_TRANSFORMERS[model](list(batch))
+            rows = to_rows(model, frame)
+            if tracked is not None:
+                tracked.add_time("transform", time.perf_counter() - started)
+                tracked.count("rows", len(rows))
+            yield from processed(rows, [c.key in frame or c.default is not None for c in columns])
+
+    def lines():
+        for row in columnar_rows() if columnar else object_rows():
+            yield "\t".join(_copy_literal(v) for v in row) + "\n"
+
+    db.execute(text(
+        f"CREATE TEMP TABLE {staging} (LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging} ({column_list}) FROM STDIN",
+            _CopyStream(lines()),
+        )
+        copied = cursor.rowcount
+    finally:
+        cursor.close()
+    return staging, copied
+
+
+def bulk_insert(db: Session, model, objects, transform, before_merge=None, columnar: bool = False) -> int:
+    """
+    Load Stripe objects with COPY into a temporary staging table, then merge them
+    into the model's table with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+    `transform` is the usual stripe_*_to_model function, so the column mapping stays
+    identical to the ORM path; `columnar=True` uses the matching batch transformer of
+    app.transformers.columnar instead. `before_merge(db, staging_table)` can be used to
+    create referenced rows (e.g. placeholder customers) before the merge.
+    Returns the number of rows actually inserted. The caller commits.
+    """
+    table = model.__table__
+    column_list = ", ".join(c.name for c in table.columns)
+    with metrics.stage("write"):
+        staging, staged = _stage(db, model, objects, transform, columnar)
+
+        if before_merge is not None:
+            before_merge(db, staging)
+        where = ""
+        if is_partitioned(db, table.name):
+            ensure_staged_partitions(db, staging, table.name)
+            # The conflict target includes `created`: an id stored with another one (a placeholder) is kept too
+            where = f"WHERE NOT EXISTS (SELECT 1 FROM {table.name} t WHERE t.id = {staging}.id) "
+
+        result = db.execute(text(
+            f"INSERT INTO {table.name} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} {where}"
+            f"ON CONFLICT {conflict_target(db, table.name)} DO NOTHING"
+        ))
+        db.execute(text(f"DROP TABLE {staging}"))
+    metrics.count("inserted", result.rowcount)
+    metrics.count("skipped", staged - result.rowcount)
+    return result.rowcount
+
+
+class UpsertCounts:
+    """Outcome of an upsert: rows inserted, rows whose content hash changed, rows left as is."""
+
+    def __init__(self, inserted: int = 0, updated: int = 0, unchanged: int = 0):
+        self.inserted = inserted
+        self.updated = updated
+        self.unchanged = unchanged
+
+    def __add__(self, other):
+        return UpsertCounts(
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged,
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, UpsertCounts) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f"UpsertCounts(inserted={self.inserted}, updated={self.updated}, unchanged={self.unchanged})"
+
+    def __str__(self):
+        return f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
+
+def bulk_upsert(db: Session, model, objects, transform, before_merge=None, columnar: bool = False) -> UpsertCounts:
+    """
+    Same staging as bulk_insert, merged with INSERT ... ON CONFLICT DO UPDATE that
+    only rewrites rows whose `content_hash` differs (see app.utils.content_hash).
+
+    When an id appears several times in `objects`, the last occurrence wins.
+    The caller commits.
+    """
+    table = model.__table__
+    names = [c.name for c in table.columns]
+    column_list = ", ".join(names)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names if name != "id")
+    with metrics.stage("write"):
+        staging, _ = _stage(db, model, objects, transform, columnar)
+
+        if before_merge is not None:
+            before_merge(db, staging)
+        # xmax = 0 on the returned row means it was inserted rather than updated. Partitioned
+        # tables cannot return system columns: compare with the ids present before the merge
+        prefix, inserted_flag = "", "(xmax = 0)"
+        if is_partitioned(db, table.name):
+            ensure_staged_partitions(db, staging, table.name)
+            replace_staged_placeholders(db, staging, table.name)
+            prefix = f"WITH _existing AS (SELECT t.id FROM {table.name} t JOIN {staging} s ON s.id = t.id) "
+            inserted_flag = f"NOT EXISTS (SELECT 1 FROM _existing e WHERE e.id = {table.name}.id)"
+
+        staged = db.execute(text(f"SELECT count(DISTINCT id) FROM {staging}")).scalar()
+        flags = db.execute(text(
+            f"{prefix}INSERT INTO {table.name} ({column_list}) "
+            f"SELECT DISTINCT ON (id) {column_list} FROM {staging} ORDER BY id, ctid DESC "
+            f"ON CONFLICT {conflict_target(db, table.name)} DO UPDATE SET {updates} "
+            f"WHERE {table.name}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+            f"RETURNING {inserted_flag}"
+        )).scalars().all()
+        db.execute(text(f"DROP TABLE {staging}"))
+
+    inserted = sum(1 for flag in flags if flag)
+    counts = UpsertCounts(inserted, len(flags) - inserted, staged - len(flags))
+    metrics.count("inserted", counts.inserted)
+    metrics.count("updated", counts.updated)
+    metrics.count("unchanged", counts.unchanged)
+    return counts
+
+
+class UpsertWriter:
+    """
+    Buffers API objects and upserts them in batches with bulk_upsert. Pass `flush` as
+    the `before_commit` hook of CreatedCursor.iter_new so a checkpoint never commits a
+    resume point past objects still sitting in the buffer.
+    """
+
+    def __init__(self, db: Session, model, transform, before_merge=None, batch_size: int = 1000):
+        self.db = db
+        self.model = model
+        self.transform = transform
+        self.before_merge = before_merge
+        self.batch_size = batch_size or 1000
+        self.buffer = []
+        self.counts = UpsertCounts()
+
+    def add(self, obj):
+        self.buffer.append(obj)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            batch, self.buffer = self.buffer, []
+            self.counts += bulk_upsert(self.db, self.model, batch, self.transform, self.before_merge)
@@ -0,0 +1,121 @@
+"""
+Row-level change tracking for incremental dumps.
+
+Every tracked table gets a `row_xid` column (xid8, not mapped on the models) that a
+trigger stamps with the writing transaction on INSERT and UPDATE, whatever the path
+(ORM, COPY merge, webhook events, backfills). Hard deletes leave a tombstone in
+`row_deletions`. A dump records `pg_current_snapshot()`; the next one exports the rows
+and tombstones whose transaction was not visible in that snapshot. Unlike a max
+timestamp watermark, this cannot miss a transaction that was still running during the
+previous dump and committed afterwards.
+
+Rows written before tracking was enabled keep a NULL `row_xid`: they belong to the
+first (full) dump of a chain.
+"""
+from sqlalchemy import text
+
+TRACKED_TABLES = (
+    "customers", "products", "prices", "payment_methods",
+    "subscriptions", "invoices", "payment_intents", "charges",
+)
+XID_COLUMN = "row_xid"
+DELETIONS_TABLE = "row_deletions"
+
+_FUNCTIONS = f"""
+CREATE OR REPLACE FUNCTION stamp_row_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.{XID_COLUMN} := pg_current_xact_id();
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_row_deletion() RETURNS trigger AS $$
+BEGIN
+    -- Rows moved between partitions (app.db.partitioning) are not deleted
+    IF current_setting('change_tracking.moving_rows', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    -- TG_ARGV[0]: the tracked table, partitions included (TG_TABLE_NAME would name the partition)
+    INSERT INTO {DELETIONS_TABLE} (table_name, row_id) VALUES (TG_ARGV[0], OLD.id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+
+def is_tracked(db, table: str) -> bool:
+    cache = db.info.setdefault("tracked_tables", {})
+    if table not in cache:
+        cache[table] = db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(:t) AND attname = :c AND NOT attisdropped)"
+        ), {"t": table, "c": XID_COLUMN}).scalar()
+    return cache[table]
+
+
+def add_triggers(db, table: str, index: bool = True):
+    """(Re)create the triggers, and optionally the index, of a table that has the `row_xid` column."""
+    db.execute(text(
+        f"CREATE OR REPLACE TRIGGER {table}_stamp_row_xid BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION stamp_row_xid()"
+    ))
+    db.execute(text(
+        f"CREATE OR REPLACE TRIGGER {table}_record_deletion AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION record_row_deletion('{table}')"
+    ))
+    if index:
+        db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{XID_COLUMN} ON {table} ({XID_COLUMN}) WHERE {XID_COLUMN} IS NOT NULL"
+        ))
+
+
+def enable_change_tracking(db, tables=TRACKED_TABLES, index: bool = True):
+    """
+    Add the `row_xid` column (no default: metadata-only, no table rewrite), its triggers
+    and the `row_deletions` table. Idempotent; runs in the caller's transaction.
+    With index=False the partial `row_xid` indexes are left to the caller (built concurrently).
+    """
+    db.execute(text(_FUNCTIONS))
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DELETIONS_TABLE} ("
+        f"table_name varchar NOT NULL, row_id varchar NOT NULL, "
+        f"deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(), deleted_at timestamp NOT NULL DEFAULT now())"
+    ))
+    db.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{DELETIONS_TABLE}_table_xid ON {DELETIONS_TABLE} (table_name, deleted_xid)"
+    ))
+    for table in tables:
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {XID_COLUMN} xid8"))
+        add_triggers(db, table, index)
+        db.info.get("tracked_tables", {}).pop(table, None)
+
+
+def disable_change_tracking(db, tables=TRACKED_TABLES):
+    for table in tables:
+        db.execute(text(f"DROP TRIGGER IF EXISTS {table}_stamp_row_xid ON {table}"))
+        db.execute(text(f"DROP TRIGGER IF EXISTS {table}_record_deletion ON {table}"))
+        db.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {XID_COLUMN}"))  # drops its index
+        db.info.get("tracked_tables", {}).pop(table, None)
+    db.execute(text(f"DROP TABLE IF EXISTS {DELETIONS_TABLE}"))
+    db.execute(text("DROP FUNCTION IF EXISTS stamp_row_xid(), record_row_deletion()"))
+
+
+# ===== Deltas =====
+
+def current_snapshot(db) -> str:
+    """Snapshot of the current transaction (REPEATABLE READ) or statement, as text (xmin:xmax:xip,...)."""
+    return db.execute(text("SELECT pg_current_snapshot()::text")).scalar()
+
+
+def changed_since(table: str, snapshot: str):
+    """WHERE clause: rows written by transactions not visible in `snapshot` (uses the partial index)."""
+    return text(
+        f"{table}.{XID_COLUMN} >= pg_snapshot_xmin(CAST(:since AS pg_snapshot)) "
+        f"AND NOT pg_visible_in_snapshot({table}.{XID_COLUMN}, CAST(:since AS pg_snapshot))"
+    ).bindparams(since=snapshot)
+
+
+def deleted_since(db, table: str, snapshot: str):
+    """Ids hard-deleted from `table` by transactions not visible in `snapshot`, in id order."""
+    return db.execute(text(
+        f"SELECT DISTINCT row_id FROM {DELETIONS_TABLE} WHERE table_name = :t "
+        f"AND deleted_xid >= pg_snapshot_xmin(CAST(:since AS pg_snapshot)) "
+        f"AND NOT pg_visible_in_snapshot(deleted_xid, CAST(:since AS pg_snapshot)) ORDER BY row_id"
+    ), {"t": table, "since": snapshot}).scalars()
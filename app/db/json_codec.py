@@ -0,0 +1,38 @@
+# app/db/json_codec.py
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional: `fast` extra (uv sync --extra fast)
+    orjson = None
+
+
+# Built once: json.dumps() with keyword arguments creates a new encoder on every call
+_json_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _orjson_dumps(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+CODECS = {"json": (_json_dumps, json.loads)}
+if orjson is not None:
+    CODECS["orjson"] = (_orjson_dumps, orjson.loads)
+
+
+def get_codec(name: str = None) -> tuple:
+    """
+    (dumps, loads) used for JSONB columns: `name`, else $JSON_CODEC, else orjson when
+    installed, else the standard library.
+    """
+    name = name or os.getenv("JSON_CODEC") or ("orjson" if orjson is not None else "json")
+    if name not in CODECS:
+        raise ValueError(f"JSON codec '{name}' is unknown or not installed (available: {', '.join(CODECS)})")
+    return CODECS[name]
+
+
+def engine_options(name: str = None) -> dict:
+    """Keyword arguments for create_engine() so JSONB values go through the codec."""
+    dumps, loads = get_codec(name)
+    return {"json_serializer": dumps, "json_deserializer": loads}
@@ -0,0 +1,44 @@
+# app/db/lookup.py
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import String
+from app.utils import metrics
+
+LOOKUP_BATCH_SIZE = 1000
+
+
+def missing_ids(db: Session, model, ids) -> set:
+    """
+    Ids from `ids` that are not yet in the model's table (a model or a Table), with one
+    anti-join against an array parameter: memory follows the batch size, not the table size.
+    """
+    ids = list(ids)
+    if not ids:
+        return set()
+    table = getattr(model, "__table__", model).name
+    stmt = text(
+        f"SELECT t.id FROM unnest(:ids) AS t(id) "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.id = t.id)"
+    ).bindparams(bindparam("ids", type_=ARRAY(String)))
+    with metrics.stage("exists"):
+        return set(db.execute(stmt, {"ids": ids}).scalars())
+
+
+def referenced_values(db: Session, column, ids) -> dict:
+    """
+    {id: value of `column`} for the rows of `column`'s table with these ids (missing ids
+    are left out). Found values are cached in the session (`db.info`), so pages referencing
+    the same rows (e.g. prices of one product) only query the new ids.
+    """
+    ids = {i for i in ids if i}
+    cache = db.info.setdefault("referenced_values", {}).setdefault((column.table.name, column.name), {})
+    unknown = [i for i in ids if i not in cache]
+    if unknown:
+        table = column.table.name
+        stmt = text(
+            f"SELECT t.id, t.{column.name} FROM {table} t WHERE t.id = ANY(:ids)"
+        ).bindparams(bindparam("ids", type_=ARRAY(String)))
+        with metrics.stage("exists"):
+            cache.update(db.execute(stmt, {"ids": unknown}).all())
+    return {i: cache[i] for i in ids if i in cache}
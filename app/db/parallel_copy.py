@@ -0,0 +1,226 @@
+# app/db/parallel_copy.py
+"""
+Whole-table dump and restore with COPY, several tables at a time.
+
+Each table is streamed by its own connection with COPY ... TO STDOUT / FROM STDIN in
+Postgres' text format, compressed on the fly (app.utils.ndjson.open_writer), without
+building a Python object per row. Dump connections share one exported snapshot
+(`pg_export_snapshot()`, like pg_dump -j), so the tables are consistent with each
+other. Restore defers foreign keys and secondary indexes until every table is loaded
+(see restore_tables).
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+import app.models  # noqa: F401 (fills Base.metadata)
+from app.db.base import Base
+from app.utils.ndjson import SUFFIXES, open_reader, open_writer
+
+MANIFEST = "manifest.json"
+COPY_BUFFER = 1024 * 1024  # bytes per read while feeding COPY FROM
+JOBS = 4
+INDEX_MEMORY = "256MB"  # maintenance_work_mem for index rebuilds after a restore
+
+
+def _columns(table_name: str) -> list:
+    return [c.name for c in Base.metadata.tables[table_name].columns]
+
+
+# ===== Dump =====
+
+def _dump_table(engine, snapshot: str, table: str, path: str, compression: str) -> dict:
+    started = time.perf_counter()
+    columns = _columns(table)
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        conn.execute(text("SET TRANSACTION READ ONLY"))
+        conn.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+        cursor = conn.connection.cursor()
+        try:
+            with open_writer(path, compression) as f:
+                # COPY (SELECT ...) also works on partitioned tables
+                cursor.copy_expert(f"COPY (SELECT {', '.join(columns)} FROM {table}) TO STDOUT", f)
+            rows = cursor.rowcount
+        finally:
+            cursor.close()
+        conn.rollback()
+    return {
+        "file": os.path.basename(path), "columns": columns, "rows": rows,
+        "bytes": os.path.getsize(path), "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def dump_tables(engine, dump_dir: str, tables, compression: str = "gzip", jobs: int = JOBS) -> dict:
+    """
+    COPY `tables` into <dump_dir>/<table>.copy[.gz|.zst] on up to `jobs` connections, from
+    one snapshot, and write manifest.json. Returns the manifest.
+    """
+    os.makedirs(dump_dir, exist_ok=True)
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as coordinator:
+        # The exported snapshot stays usable while this transaction is open
+        snapshot = coordinator.execute(text("SELECT pg_export_snapshot()")).scalar()
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                table: pool.submit(_dump_table, engine, snapshot, table,
+                                   os.path.join(dump_dir, f"{table}.copy{SUFFIXES[compression]}"), compression)
+                for table in tables
+            }
+            results = {table: future.result() for table, future in futures.items()}
+        coordinator.rollback()
+
+    manifest = {
+        "format": "copy",
+        "dumped_at": datetime.now().isoformat(timespec="seconds"),
+        "compression": compression,
+        "tables": results,
+    }
+    with open(os.path.join(dump_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ===== Restore =====
+
+def _deferrable_definitions(conn, tables) -> tuple:
+    """
+    ({table: [CREATE INDEX ...]}, [(table, constraint, definition)]) of the non-unique indexes
+    of `tables` and of the foreign keys from or to them, as the database defines them
+    (change tracking and partitioned layouts included).
+    """
+    indexes = {}
+    for table in tables:
+        indexes[table] = [
+            # Indexes of a partitioned table are listed "ON ONLY" the parent: rebuild them on the partitions too
+            definition.replace(" ON ONLY ", " ON ")
+            for definition in conn.execute(text(
+                "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = to_regclass(:t) AND NOT indisunique"
+            ), {"t": table}).scalars()
+        ]
+    foreign_keys = conn.execute(text(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND conparentid = 0 "
+        "AND (conrelid::regclass::text = ANY(:tables) OR confrelid::regclass::text = ANY(:tables))"
+    ), {"tables": list(tables)}).all()
+    return indexes, foreign_keys
+
+
+def _drop_index_names(conn, table: str) -> list:
+    return list(conn.execute(text(
+        "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(:t) AND NOT indisunique"
+    ), {"t": table}).scalars())
+
+
+def _restore_table(engine, table: str, path: str, columns: list) -> dict:
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # A crash means restarting the restore anyway: no need to wait for WAL flushes
+        conn.execute(text("SET LOCAL synchronous_commit = off"))
+        cursor = conn.connection.cursor()
+        try:
+            with open_reader(path) as f:
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", f, size=COPY_BUFFER)
+            rows = cursor.rowcount
+        finally:
+            cursor.close()
+        conn.commit()
+    return {"rows": rows, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def _rebuild_indexes(engine, table: str, definitions: list) -> float:
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text(f"SET LOCAL maintenance_work_mem = '{INDEX_MEMORY}'"))
+        for definition in definitions:
+            conn.execute(text(definition))
+        conn.commit()
+        conn.execute(text(f"ANALYZE {table}"))
+        conn.commit()
+    return time.perf_counter() - started
+
+
+def _add_foreign_keys(engine, foreign_keys) -> list:
+    """
+    Add each foreign key back in its own transaction, NOT VALID (no scan of the loaded rows)
+    where Postgres allows it, so one bad constraint cannot take the others down with it.
+    Returns the (table, constraint) pairs left to validate.
+    """
+    pending = []
+    for table, name, definition in foreign_keys:
+        with engine.begin() as conn:
+            # NOT VALID is refused on partitioned tables: those are checked right away
+            partitioned = conn.execute(text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:t)"),
+                                       {"t": table}).scalar()
+            conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"
+                              + ("" if partitioned else " NOT VALID")))
+        if not partitioned:
+            pending.append((table, name))
+    return pending
+
+
+def _validate_foreign_keys(engine, pending) -> dict:
+    """VALIDATE each NOT VALID foreign key on its own. Returns {constraint: error} of those that fail."""
+    failed = {}
+    for table, name in pending:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+        except DBAPIError as error:
+            failed[name] = str(error.orig).splitlines()[0]
+    return failed
+
+
+def restore_tables(engine, dump_dir: str, jobs: int = JOBS, truncate: bool = False) -> dict:
+    """
+    Load a dump_tables() directory into the database of `engine`. Missing tables are
+    created from the models (e.g. the test database between two runs); existing ones
+    must be empty, or emptied first with `truncate` (TRUNCATE ... CASCADE).
+
+    Like pg_restore, constraints are deferred rather than loading tables in foreign key
+    order: foreign keys and secondary indexes are dropped, every table is copied at the
+    same time, then indexes are rebuilt (one table per connection) and foreign keys
+    added back NOT VALID, one at a time. The schema is put back even when a load fails
+    (its error is the one raised). Foreign keys are then validated one by one; if some
+    don't hold, RuntimeError names them (they stay NOT VALID: still enforced for new rows).
+    Returns {table: {"rows": n, "seconds": s}}.
+    """
+    with open(os.path.join(dump_dir, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    tables = manifest["tables"]
+    Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[t] for t in tables])
+
+    with engine.begin() as conn:
+        if truncate:
+            conn.execute(text(f"TRUNCATE {', '.join(tables)} CASCADE"))
+        else:
+            filled = [t for t in tables if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {t})")).scalar()]
+            if filled:
+                raise RuntimeError(f"❌ Tables not empty: {', '.join(filled)} (restore with truncate to replace them)")
+        indexes, foreign_keys = _deferrable_definitions(conn, tables)
+        for table, name, _ in foreign_keys:
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+        for table in tables:
+            for name in _drop_index_names(conn, table):
+                conn.execute(text(f"DROP INDEX {name}"))
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                table: pool.submit(_restore_table, engine, table, os.path.join(dump_dir, entry["file"]), entry["columns"])
+                for table, entry in tables.items()
+            }
+            results = {table: future.result() for table, future in futures.items()}
+    finally:
+        # Put the schema back even if a load failed
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for future in [pool.submit(_rebuild_indexes, engine, t, definitions) for t, definitions in indexes.items()]:
+                future.result()
+        pending = _add_foreign_keys(engine, foreign_keys)
+
+    failed = _validate_foreign_keys(engine, pending)
+    if failed:
+        raise RuntimeError("❌ Foreign keys not satisfied by the restored rows (left NOT VALID): "
+                           + "; ".join(f"{name}: {error}" for name, error in failed.items()))
+    return results
@@ -0,0 +1,425 @@
+"""
+Optional monthly range partitioning on `created` for the tables that grow without bound.
+
+A partitioned table keeps its columns and indexes, but Postgres requires the partition key
+in every unique key: the primary key becomes (id, created) and ON CONFLICT targets follow
+(`conflict_target`). Stripe never changes `created`, so ids stay unique in practice.
+Foreign keys to a partitioned table need its whole key: the referencing row also stores the
+referenced row's `created` (REFERENCE_CREATED, filled at ingest like the other referenced
+columns of app.utils.stripe_helpers) and the key becomes (id, created) MATCH FULL, deferrable
+so placeholders can be replaced (`replace_staged_placeholders`). Placeholder rows of a
+partitioned table get PLACEHOLDER_CREATED, as `created` cannot be NULL there.
+
+Partitions are named <table>_pYYYYMM, plus <table>_default for rows outside any of them.
+Ingestion creates the months it is about to write (`ensure_partitions`, on a separate
+connection), moving matching rows out of the default partition if some landed there.
+"""
+from datetime import datetime
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+import app.models  # noqa: F401 (fills Base.metadata)
+from app.db.base import Base
+from app.db.change_tracking import add_triggers, is_tracked
+
+PARTITIONED_TABLES = ("invoices", "payment_intents", "charges")  # referenced before referencing
+PARTITION_KEY = "created"
+MONTHS_AHEAD = 3
+PLACEHOLDER_CREATED = datetime(1970, 1, 1)  # `created` of placeholder rows in a partitioned table
+LOCK_TIMEOUT = "5s"  # wait at most this long for the locks attaching a partition takes
+
+# (referencing table, foreign key column) → column holding the referenced row's `created`
+REFERENCE_CREATED = {
+    ("charges", "invoice_id"): "invoice_created",
+    ("charges", "payment_intent"): "payment_intent_created",
+}
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+def _months(first: datetime, months_ahead: int) -> list:
+    """Month starts from `first`'s month to `months_ahead` months after the current one."""
+    last = month_start(datetime.now())
+    for _ in range(months_ahead):
+        last = next_month(last)
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+# ===== Introspection (cached on the Session / Connection) =====
+
+def is_partitioned(db, table: str) -> bool:
+    cache = db.info.setdefault("partitioned_tables", {})
+    if table not in cache:
+        cache[table] = db.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"), {"t": table}
+        ).scalar()
+    return cache[table]
+
+
+def conflict_target(db, table: str) -> str:
+    """ON CONFLICT columns matching the table's primary key."""
+    return f"(id, {PARTITION_KEY})" if is_partitioned(db, table) else "(id)"
+
+
+def partitions(db, table: str) -> set:
+    """Names of the current partitions of `table`."""
+    cache = db.info.setdefault("partitions", {})
+    if table not in cache:
+        cache[table] = set(db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ), {"t": table}).scalars())
+    return cache[table]
+
+
+def _forget(db, table: str):
+    db.info.get("partitioned_tables", {}).pop(table, None)
+    db.info.get("partitions", {}).pop(table, None)
+
+
+# ===== Partitions =====
+
+def _bounds(start: datetime) -> str:
+    return f"FROM ('{start:%Y-%m-%d}') TO ('{next_month(start):%Y-%m-%d}')"
+
+
+def _create_partition(db, table: str, start: datetime):
+    """Create and attach one month, moving its rows out of the default partition first."""
+    name, end = partition_name(table, start), next_month(start)
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)"))
+    in_month = f"{PARTITION_KEY} >= '{start:%Y-%m-%d}' AND {PARTITION_KEY} < '{end:%Y-%m-%d}'"
+    # A referenced row cannot leave the default partition (its foreign key check only looks
+    # there): the rows referencing it let go of it until it is attached in its month
+    released = _release_references(db, table, in_month)
+    # Not deletions for app.db.change_tracking: the rows keep their row_xid in the new partition
+    db.execute(text("SELECT set_config('change_tracking.moving_rows', 'on', true)"))
+    moved = db.execute(text(
+        f"WITH moved AS (DELETE FROM {default_partition(table)} WHERE {in_month} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )).rowcount
+    db.execute(text("SELECT set_config('change_tracking.moving_rows', 'off', true)"))
+    # Indexes, primary key and foreign keys of the parent are cloned on attach
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {_bounds(start)}"))
+    for source, column, created, kept in released:
+        db.execute(text(
+            f"UPDATE {source} r SET {column} = k.ref, {created} = k.ref_created FROM {kept} k WHERE r.id = k.id"
+        ))
+    print(f"🗓️  Created partition {name}" + (f" ({moved} row(s) moved from {default_partition(table)})" if moved else ""))
+
+
+def _release_references(db, table: str, in_month: str) -> list:
+    """
+    Clear the composite foreign key of the rows referencing rows of the default partition of
+    `table` matching `in_month`, keeping the references in temporary tables dropped on commit.
+    Returns [(referencing table, column, created column, temporary table)].
+    """
+    released = []
+    for source, column, created in _references_to(table):
+        kept = f"released_{source}_{column}"
+        db.execute(text(f"CREATE TEMPORARY TABLE {kept} (id varchar, ref varchar, ref_created timestamp) ON COMMIT DROP"))
+        db.execute(text(
+            f"WITH released AS (UPDATE {source} r SET {column} = NULL, {created} = NULL "
+            f"FROM (SELECT id, {PARTITION_KEY} FROM {default_partition(table)} WHERE {in_month}) d "
+            f"WHERE r.{column} = d.id AND r.{created} = d.{PARTITION_KEY} "
+            f"RETURNING r.id, d.id, d.{PARTITION_KEY}) "
+            f"INSERT INTO {kept} SELECT * FROM released"
+        ))
+        released.append((source, column, created, kept))
+    return released
+
+
+def _engine(db):
+    bind = db.get_bind() if isinstance(db, Session) else db
+    return getattr(bind, "engine", bind)
+
+
+def _create_partitions(engine, table: str, months: list) -> tuple:
+    """
+    Create each month on its own committed connection, serialized with concurrent creators
+    by an advisory lock. Stops at the first month whose locks are not granted within
+    LOCK_TIMEOUT. Returns (months now attached, number created).
+    """
+    attached, created = [], 0
+    for start in months:
+        name = partition_name(table, start)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"partitions:{table}"})
+                if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar() is None:
+                    _create_partition(conn, table, start)
+                    created += 1
+        except OperationalError as error:
+            if getattr(error.orig, "pgcode", None) != "55P03":  # lock_not_available
+                raise
+            print(f"⏳ {name} is busy, rows go to {default_partition(table)} for now")
+            break
+        attached.append(start)
+    return attached, created
+
+
+def _create_after_commit(db, table: str, months: list):
+    """Create `months` once the Session commits (rows written meanwhile go to the default partition)."""
+    print(f"⏳ {table}: {len(months)} month(s) without partition, rows go to {default_partition(table)} until commit")
+    if not isinstance(db, Session):
+        return  # a Connection has no commit hook: the next ensure_partitions of these months moves the rows
+    pending = db.info.setdefault("pending_partitions", {})
+    if not pending:
+        event.listen(db, "after_commit", _create_pending, once=True)
+    pending.setdefault(table, set()).update(months)
+
+
+def _create_pending(session):
+    pending = session.info.pop("pending_partitions", {})
+    for table, months in pending.items():
+        _create_partitions(_engine(session), table, sorted(months))
+        session.info.get("partitions", {}).pop(table, None)
+
+
+def _holds_conflicting_locks(db, table: str) -> bool:
+    """
+    Whether the caller's transaction holds a lock that attaching a partition of `table` waits
+    for: any lock on its default partition, or a write lock on a table linked to it by a
+    foreign key (cloning the key locks both sides).
+    """
+    meta = Base.metadata.tables[table]
+    linked = {fk.column.table.name for fk in meta.foreign_keys} | {
+        other.name for other in Base.metadata.sorted_tables
+        for fk in other.foreign_keys if fk.column.table.name == table
+    }
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE pid = pg_backend_pid() AND (relation = to_regclass(:d) "
+        "OR (relation IN (SELECT to_regclass(t) FROM unnest(CAST(:linked AS text[])) t) AND mode <> 'AccessShareLock')))"
+    ), {"d": default_partition(table), "linked": sorted(linked)}).scalar()
+
+
+def ensure_partitions(db, table: str, months) -> int:
+    """
+    Create the monthly partitions of `table` covering `months` (datetimes, any day of the
+    month) that do not exist yet. They are created and committed on separate connections
+    before the caller writes: attaching locks the parent and the default partition, which
+    the caller's (ingest) transaction would otherwise hold until it ends, and a rollback
+    of the caller cannot leave a partition cached that does not exist. Returns the number
+    of partitions created.
+
+    A separate connection cannot attach once the caller's transaction has read or written
+    the default partition, or written a table linked by a foreign key (it would wait for the
+    caller): the rows then go to the default partition and the months are created when the
+    Session commits, moving the rows.
+    """
+    existing = partitions(db, table)
+    starts = {month_start(m) for m in months if m is not None}
+    missing = sorted(start for start in starts if partition_name(table, start) not in existing)
+    if not missing:
+        return 0
+    if _holds_conflicting_locks(db, table):
+        _create_after_commit(db, table, missing)
+        return 0
+    attached, created = _create_partitions(_engine(db), table, missing)
+    existing.update(partition_name(table, start) for start in attached)
+    if len(attached) < len(missing):
+        _create_after_commit(db, table, missing[len(attached):])
+    return created
+
+
+def ensure_staged_partitions(db, staging_table: str, table: str) -> int:
+    """ensure_partitions for the months of the rows in a staging table (bulk loader)."""
+    months = db.execute(text(f"SELECT DISTINCT date_trunc('month', {PARTITION_KEY}) FROM {staging_table}")).scalars()
+    return ensure_partitions(db, table, list(months))
+
+
+def ensure_months_ahead(db, table: str, months_ahead: int = MONTHS_AHEAD) -> int:
+    """
+    Create the partitions from the current month to `months_ahead` months later (nothing
+    for a plain table). Ingest calls it before writing, so new objects have their month.
+    """
+    if not is_partitioned(db, table):
+        return 0
+    return ensure_partitions(db, table, _months(datetime.now(), months_ahead))
+
+
+# ===== Placeholders =====
+
+def _references_to(table: str) -> list:
+    """(referencing table, foreign key column, created column) of the composite keys to `table`."""
+    return [
+        (source, column, created) for (source, column), created in REFERENCE_CREATED.items()
+        if any(fk.column.table.name == table for fk in Base.metadata.tables[source].c[column].foreign_keys)
+    ]
+
+
+def replace_staged_placeholders(db, staging_table: str, table: str) -> int:
+    """
+    Make way for staged rows that replace placeholders of a partitioned `table`: a placeholder
+    has `created` = PLACEHOLDER_CREATED, so ON CONFLICT (id, created) cannot match it. Rows
+    referencing it get the real `created`, then it is deleted; the composite foreign keys are
+    deferred to the end of the transaction meanwhile. Returns the number of placeholders removed.
+    """
+    sentinel = {"sentinel": PLACEHOLDER_CREATED}
+    if not db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {staging_table} s JOIN {table} t ON t.id = s.id "
+        f"AND t.{PARTITION_KEY} = :sentinel WHERE s.{PARTITION_KEY} <> :sentinel)"
+    ), sentinel).scalar():
+        return 0
+    db.execute(text("SET CONSTRAINTS ALL DEFERRED"))
+    for source, column, created in _references_to(table):
+        db.execute(text(
+            f"UPDATE {source} r SET {created} = s.{PARTITION_KEY} FROM {staging_table} s "
+            f"WHERE r.{column} = s.id AND r.{created} = :sentinel AND s.{PARTITION_KEY} <> :sentinel"
+        ), sentinel)
+    # Replaced, not deleted, for app.db.change_tracking
+    db.execute(text("SELECT set_config('change_tracking.moving_rows', 'on', true)"))
+    removed = db.execute(text(
+        f"DELETE FROM {table} t USING {staging_table} s "
+        f"WHERE t.id = s.id AND t.{PARTITION_KEY} = :sentinel AND s.{PARTITION_KEY} <> :sentinel"
+    ), sentinel).rowcount
+    db.execute(text("SELECT set_config('change_tracking.moving_rows', 'off', true)"))
+    return removed
+
+
+# ===== Keys =====
+
+def _add_keys(db, table: str):
+    """Primary key, model indexes, foreign keys and change tracking triggers of a freshly (re)built table."""
+    meta = Base.metadata.tables[table]
+    pk = f"id, {PARTITION_KEY}" if is_partitioned(db, table) else "id"
+    db.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({pk})"))
+    for index in meta.indexes:
+        db.execute(CreateIndex(index, if_not_exists=True))
+    if is_tracked(db, table):  # the row_xid column came with LIKE, its triggers did not
+        add_triggers(db, table)
+    restore_foreign_keys(db)
+
+
+def _foreign_key_definition(db, fk) -> str:
+    source, target = fk.parent.table.name, fk.column.table.name
+    created = REFERENCE_CREATED.get((source, fk.parent.name))
+    if created and is_partitioned(db, target):
+        return (f"FOREIGN KEY ({fk.parent.name}, {created}) REFERENCES {target} ({fk.column.name}, {PARTITION_KEY}) "
+                f"MATCH FULL DEFERRABLE")
+    return f"FOREIGN KEY ({fk.parent.name}) REFERENCES {target} ({fk.column.name})"
+
+
+def restore_foreign_keys(db) -> int:
+    """
+    Add the foreign keys declared on the models that are missing from the database, named
+    <table>_<column>_fkey like create_all does, in the form the current layout needs: on
+    (id, created) when the referenced table is partitioned. Existing rows are checked.
+    """
+    added = 0
+    for source in Base.metadata.sorted_tables:
+        for fk in source.foreign_keys:
+            target = fk.column.table.name
+            if db.execute(text("SELECT to_regclass(:s) IS NULL OR to_regclass(:t) IS NULL"), {"s": source.name, "t": target}).scalar():
+                continue
+            name = f"{source.name}_{fk.parent.name}_fkey"
+            exists = db.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(:s) AND conname = :n)"
+            ), {"s": source.name, "n": name}).scalar()
+            if exists:
+                continue
+            db.execute(text(f"ALTER TABLE {source.name} ADD CONSTRAINT {name} {_foreign_key_definition(db, fk)}"))
+            added += 1
+    return added
+
+
+def _drop_foreign_keys_to(db, table: str):
+    """Drop the foreign keys referencing `table` (added back by restore_foreign_keys once it is rebuilt)."""
+    for name, source in db.execute(text(
+        "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:t) AND conparentid = 0"
+    ), {"t": table}).all():
+        db.execute(text(f"ALTER TABLE {source} DROP CONSTRAINT {name}"))
+
+
+def _sync_reference_created(db, table: str):
+    """Copy `created` of `table` into the REFERENCE_CREATED columns of the rows referencing it."""
+    for source, column, created in _references_to(table):
+        db.execute(text(
+            f"UPDATE {source} r SET {created} = t.{PARTITION_KEY} FROM {table} t "
+            f"WHERE t.id = r.{column} AND r.{created} IS DISTINCT FROM t.{PARTITION_KEY}"
+        ))
+
+
+# ===== Layout conversion (Alembic migration, scripts/partition_tables.py) =====
+
+def convert_to_partitioned(db, table: str, months_ahead: int = MONTHS_AHEAD) -> bool:
+    """
+    Rebuild `table` as a partitioned table: one partition per month from its oldest row to
+    `months_ahead` months from now, plus the default partition. Rows without `created`
+    (placeholders) get PLACEHOLDER_CREATED; foreign keys referencing the table are rebuilt on
+    (id, created). Runs in the caller's transaction; returns False if already partitioned.
+    """
+    if is_partitioned(db, table):
+        return False
+    placeholders = db.execute(text(
+        f"UPDATE {table} SET {PARTITION_KEY} = :sentinel WHERE {PARTITION_KEY} IS NULL"
+    ), {"sentinel": PLACEHOLDER_CREATED}).rowcount
+    _drop_foreign_keys_to(db, table)
+    _sync_reference_created(db, table)
+
+    old = f"{table}_unpartitioned"
+    db.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    db.execute(text(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE ({PARTITION_KEY})"
+    ))
+    db.execute(text(f"ALTER TABLE {table} ALTER COLUMN {PARTITION_KEY} SET NOT NULL"))
+    db.execute(text(f"CREATE TABLE {default_partition(table)} PARTITION OF {table} DEFAULT"))
+
+    _forget(db, table)
+    # Placeholders stay in the default partition
+    oldest = db.execute(text(f"SELECT min({PARTITION_KEY}) FROM {old} WHERE {PARTITION_KEY} > :sentinel"),
+                        {"sentinel": PLACEHOLDER_CREATED}).scalar()
+    now = datetime.now()
+    for start in _months(min(oldest, now) if oldest else now, months_ahead):
+        db.execute(text(f"CREATE TABLE {partition_name(table, start)} PARTITION OF {table} FOR VALUES {_bounds(start)}"))
+
+    rows = db.execute(text(f"INSERT INTO {table} SELECT * FROM {old}")).rowcount
+    db.execute(text(f"DROP TABLE {old}"))
+    _forget(db, table)
+    _add_keys(db, table)
+    print(f"🗂️  {table}: partitioned by month ({rows} row(s) moved" + (f", {placeholders} placeholder(s) dated {PLACEHOLDER_CREATED:%Y-%m-%d})" if placeholders else ")"))
+    return True
+
+
+def convert_to_plain(db, table: str) -> bool:
+    """
+    Rebuild a partitioned `table` as a plain table with its model keys (foreign keys referencing
+    it go back to `id` alone). Placeholders get their NULL `created` back. Returns False if not partitioned.
+    """
+    if not is_partitioned(db, table):
+        return False
+    _drop_foreign_keys_to(db, table)
+    old = f"{table}_partitioned"
+    db.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    db.execute(text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE)"))
+    db.execute(text(f"ALTER TABLE {table} ALTER COLUMN {PARTITION_KEY} DROP NOT NULL"))
+    rows = db.execute(text(f"INSERT INTO {table} SELECT * FROM {old}")).rowcount
+    db.execute(text(f"DROP TABLE {old}"))  # with its partitions
+    db.execute(text(
+        f"UPDATE {table} SET {PARTITION_KEY} = NULL "
+        f"WHERE {PARTITION_KEY} = :sentinel AND stripe_metadata ->> 'placeholder' = 'true'"
+    ), {"sentinel": PLACEHOLDER_CREATED})
+    _forget(db, table)
+    _add_keys(db, table)
+    print(f"🗂️  {table}: back to a plain table ({rows} row(s))")
+    return True
@@ -6,3 +6,5 @@ from .payment_intent import PaymentIntent
 from .payment_method import PaymentMethod
 from .products import Product
 from .subscription import Subscription
+from .sync_state import SyncState
+from .stripe_event import StripeEvent
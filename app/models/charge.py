@@ -20,10 +20,10 @@ class Charge(Base):
     disputed = Column(Boolean)
     refunded = Column(Boolean)
 
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     livemode = Column(Boolean, default=False)
 
-    payment_intent = Column(String, ForeignKey("payment_intents.id"), nullable=True)
+    payment_intent = Column(String, ForeignKey("payment_intents.id"), nullable=True, index=True)
     payment_method = Column(String)
     payment_intent_rel = relationship("PaymentIntent", backref="charges", foreign_keys=[payment_intent])
     receipt_url = Column(String)
@@ -42,9 +42,13 @@ class Charge(Base):
 
     balance_transaction = Column(String)
 
-    invoice_id = Column(String, ForeignKey("invoices.id"), nullable=True)
+    invoice_id = Column(String, ForeignKey("invoices.id"), nullable=True, index=True)
+
+    # created de la facture / du payment intent référencés : clé étrangère (id, created) quand ces tables sont partitionnées
+    invoice_created = Column(DateTime, nullable=True)
+    payment_intent_created = Column(DateTime, nullable=True)
 
     card_brand = Column(String, nullable=True)     # dans payment_method_details.card.brand
     card_funding = Column(String, nullable=True)
 
-
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
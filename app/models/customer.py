@@ -16,7 +16,7 @@ class Customer(Base):
     delinquent = Column(Boolean)
     livemode = Column(Boolean)
     deleted = Column(Boolean, default=False)  # ✅ NEW: allows deleted customers to exist
-    created = Column(DateTime)  # parsed from UNIX timestamp
+    created = Column(DateTime, index=True)  # parsed from UNIX timestamp
 
     invoice_prefix = Column(String)
     next_invoice_sequence = Column(Integer)
@@ -31,3 +31,5 @@ class Customer(Base):
     default_payment_method_id = Column(String, nullable=True)
 
     test_clock = Column(String, nullable=True)  # Optional Stripe test_clock reference
+
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
@@ -8,7 +8,7 @@ class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(String, primary_key=True, index=True)  # Stripe invoice ID
-    customer_id = Column(String, ForeignKey("customers.id"))
+    customer_id = Column(String, ForeignKey("customers.id"), index=True)
     customer = relationship("Customer", backref="invoices")
 
     charges = relationship("Charge", backref="invoice", foreign_keys="Charge.invoice_id")
@@ -25,7 +25,7 @@ class Invoice(Base):
     total = Column(Integer)
     subtotal = Column(Integer)
 
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     period_start = Column(DateTime)
     period_end = Column(DateTime)
 
@@ -50,3 +50,4 @@ class Invoice(Base):
     status_transitions_at = Column(DateTime(timezone=True), nullable=True)  # date du changement de statut
     default_payment_method_id = Column(String, nullable=True)               # via customer.invoice_settings
 
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
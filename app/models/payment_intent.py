@@ -18,16 +18,16 @@ class PaymentIntent(Base):
     confirmation_method = Column(String)
     client_secret = Column(String)  # Optional; might not be stored for security
 
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     canceled_at = Column(DateTime, nullable=True)
     cancellation_reason = Column(String, nullable=True)
 
     livemode = Column(Boolean, default=False)
 
-    customer_id = Column(String, ForeignKey("customers.id"), nullable=True)
+    customer_id = Column(String, ForeignKey("customers.id"), nullable=True, index=True)
     customer = relationship("Customer", backref="payment_intents")
 
-    payment_method = Column(String, ForeignKey("payment_methods.id"), nullable=True)
+    payment_method = Column(String, ForeignKey("payment_methods.id"), nullable=True, index=True)
     payment_method_entity = relationship("PaymentMethod", backref="payment_intents", foreign_keys=[payment_method])
 
     description = Column(String, nullable=True)
@@ -45,3 +45,4 @@ class PaymentIntent(Base):
     card_funding = Column(String, nullable=True)
     setup_future_usage = Column(String, nullable=True)
 
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
@@ -9,10 +9,10 @@ class PaymentMethod(Base):
 
     id = Column(String, primary_key=True, index=True)  # Stripe payment method ID
     type = Column(String)  # e.g. "us_bank_account", "card"
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     livemode = Column(Boolean, default=False)
 
-    customer_id = Column(String, ForeignKey("customers.id"), nullable=True)
+    customer_id = Column(String, ForeignKey("customers.id"), nullable=True, index=True)
     customer = relationship("Customer", backref="payment_methods")
 
     billing_details = Column(JSONB)
@@ -26,3 +26,4 @@ class PaymentMethod(Base):
     card_funding = Column(String, nullable=True)  # credit, debit
     card_last4 = Column(String, nullable=True)    # pour audit/debug
 
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
@@ -15,13 +15,13 @@ class Price(Base):
     unit_amount = Column(Integer)  # Stripe uses cents for USD, etc.
     unit_amount_decimal = Column(String)
 
-    product_id = Column(String, ForeignKey("products.id"))
+    product_id = Column(String, ForeignKey("products.id"), index=True)
     product = relationship("Product", backref="prices")
 
     recurring = Column(JSONB, nullable=True)  # contains interval, usage_type, etc.
 
     livemode = Column(Boolean, default=False)
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
 
     nickname = Column(String)
     lookup_key = Column(String)
@@ -34,3 +34,5 @@ class Price(Base):
 
     product_name = Column(String, nullable=True)  # pour jointure rapide analytique
     interval = Column(String, nullable=True)      # price.recurring["interval"]
+
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
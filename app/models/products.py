@@ -12,7 +12,7 @@ class Product(Base):
     active = Column(Boolean, default=True)
     livemode = Column(Boolean, default=False)
 
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     updated = Column(DateTime)
 
     default_price = Column(String)  # FK to prices.id (nullable if not expanded)
@@ -27,3 +27,5 @@ class Product(Base):
 
     package_dimensions = Column(JSONB, nullable=True)
     shippable = Column(Boolean)
+
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
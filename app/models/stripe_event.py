@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+from app.db.base import Base
+
+class StripeEvent(Base):
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)  # Stripe event ID (evt_...), clé d'idempotence
+    type = Column(String)                  # e.g. "invoice.paid"
+    created = Column(BigInteger)           # `created` de l'événement (UNIX timestamp)
+    object_id = Column(String, index=True) # id de data.object (dernier événement appliqué par objet)
+
+    processed_at = Column(DateTime, server_default=func.now())
@@ -11,14 +11,14 @@ class Subscription(Base):
     status = Column(String)
     currency = Column(String(10))
 
-    customer_id = Column(String, ForeignKey("customers.id"))
+    customer_id = Column(String, ForeignKey("customers.id"), index=True)
     customer = relationship("Customer", backref="subscriptions")
 
-    price_id = Column(String, ForeignKey("prices.id"))
+    price_id = Column(String, ForeignKey("prices.id"), index=True)
     price = relationship("Price", backref="subscriptions")
 
     start_date = Column(DateTime)
-    created = Column(DateTime)
+    created = Column(DateTime, index=True)
     cancel_at = Column(DateTime, nullable=True)
     canceled_at = Column(DateTime, nullable=True)
     ended_at = Column(DateTime, nullable=True)
@@ -38,3 +38,4 @@ class Subscription(Base):
     subscription_item_id = Column(String, nullable=True)  # extrait de items[0].id
     plan_interval = Column(String, nullable=True)          # extrait de price.recurring.interval
 
+    content_hash = Column(String(64), nullable=True)  # sha256 du payload Stripe normalisé (upsert)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+from app.db.base import Base
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    resource = Column(String, primary_key=True)  # ingest table key, e.g. "charge"
+
+    last_created = Column(BigInteger, nullable=True)  # max Stripe `created` (UNIX timestamp) already ingested
+
+    # Checkpoint of a run in progress (cleared when the run completes)
+    resume_after = Column(String, nullable=True)        # `starting_after` = last object of the last committed page
+    pending_created = Column(BigInteger, nullable=True)  # max `created` seen by the interrupted run
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,49 +1,39 @@
-import json
-from datetime import datetime
 from app.models.charge import Charge
+from app.transformers.spec import compile_spec, field, path, ref, required, timestamp
 
-def stripe_charge_to_model(data: dict) -> Charge:
-    """
-    Transforms a raw Stripe charge object into a SQLAlchemy Charge model.
-    Ensures all dict fields are JSON-serialized for storage.
-    """
+CHARGE_SPEC = {
+    "id": required(),
+    "amount": field(),
+    "amount_captured": field(),
+    "amount_refunded": field(),
+    "currency": field(),
+    "status": field(),
+    "paid": field(default=False),
+    "captured": field(default=False),
+    "disputed": field(default=False),
+    "refunded": field(default=False),
+    "created": timestamp(),
+    "livemode": field(default=False),
+    "payment_intent": ref(),  # string or embedded object
+    "payment_method": field(),
+    "receipt_url": field(),
+    "receipt_email": field(),
+    "receipt_number": field(),
+    "description": field(),
+    "statement_descriptor": field(),
+    "statement_descriptor_suffix": field(),
+    "balance_transaction": field(),
+    "invoice_id": field("invoice"),
+    "billing_details": field(default={}),
+    "outcome": field(),
+    "fraud_details": field(default={}),
+    "payment_method_details": field(),
+    "stripe_metadata": field("metadata", default={}),
+    "card_brand": path("payment_method_details", "card", "brand"),
+    "card_funding": path("payment_method_details", "card", "funding"),
+}
 
-    def serialize(value):
-        """Safely serialize dicts/lists to JSON strings."""
-        return json.dumps(value) if isinstance(value, (dict, list)) else value
+CHARGE = compile_spec(Charge, CHARGE_SPEC, name="stripe_charge")
 
-    def extract_payment_intent(obj):
-        """Handles payment_intent being a string or an embedded object."""
-        return obj.get("payment_intent", {}).get("id") if isinstance(obj.get("payment_intent"), dict) else obj.get("payment_intent")
-
-    return Charge(
-        id=data["id"],
-        amount=data.get("amount"),
-        amount_captured=data.get("amount_captured"),
-        amount_refunded=data.get("amount_refunded"),
-        currency=data.get("currency"),
-        status=data.get("status"),
-        paid=data.get("paid", False),
-        captured=data.get("captured", False),
-        disputed=data.get("disputed", False),
-        refunded=data.get("refunded", False),
-        created=datetime.fromtimestamp(data["created"]),
-        livemode=data.get("livemode", False),
-        payment_intent=extract_payment_intent(data),
-        payment_method=data.get("payment_method"),
-        receipt_url=data.get("receipt_url"),
-        receipt_email=data.get("receipt_email"),
-        receipt_number=data.get("receipt_number"),
-        description=data.get("description"),
-        statement_descriptor=data.get("statement_descriptor"),
-        statement_descriptor_suffix=data.get("statement_descriptor_suffix"),
-        balance_transaction=data.get("balance_transaction"),
-        invoice_id=data.get("invoice"),
-
-        # ✅ JSON fields, must be serialized to strings before insert
-        billing_details=serialize(data.get("billing_details", {})),
-        outcome=serialize(data.get("outcome")),
-        fraud_details=serialize(data.get("fraud_details", {})),
-        payment_method_details=serialize(data.get("payment_method_details")),
-        stripe_metadata=serialize(data.get("metadata", {})),
-    )
+# Raw Stripe charge → Charge (see app.transformers.spec)
+stripe_charge_to_model = CHARGE.to_model
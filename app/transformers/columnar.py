@@ -0,0 +1,176 @@
+"""
+Batch counterparts of the stripe_*_to_model transformers.
+
+Each function takes a list of Stripe dicts and returns a DataFrame with one column per
+field of the resource's spec (app.transformers.spec: same names, same values), without
+building ORM instances. The payloads are spread into columns once; defaults, nested paths,
+expanded references and timestamps are then resolved a whole column at a time. Only
+computed fields (content_hash, ...) still call their function per object. `to_rows()`
+turns a frame into tuples in table column order for COPY or Core inserts.
+"""
+from copy import copy
+import pandas as pd
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.payment_intent import PaymentIntent
+from app.models.payment_method import PaymentMethod
+from app.models.price import Price
+from app.models.products import Product
+from app.models.subscription import Subscription
+from app.transformers.charge import CHARGE
+from app.transformers.customer import CUSTOMER
+from app.transformers.invoice import INVOICE
+from app.transformers.payment_intent import PAYMENT_INTENT
+from app.transformers.payment_method import PAYMENT_METHOD
+from app.transformers.price import PRICE
+from app.transformers.products import PRODUCT
+from app.transformers.spec import OPTIONAL_TIMESTAMP, REF, TIMESTAMP
+from app.transformers.subscription import SUBSCRIPTION
+
+
+# ===== Column helpers =====
+
+def _timestamps(values: pd.Series) -> pd.Series:
+    """UNIX seconds → naive UTC datetimes, like spec.utc_datetime()."""
+    seconds = pd.to_numeric(values, errors="coerce")
+    return pd.to_datetime(seconds, unit="s")
+
+
+def _optional_timestamps(values: pd.Series) -> pd.Series:
+    """Same as _timestamps, with falsy values (None, 0) as NaT: `utc_datetime(x) if x else None`."""
+    return _timestamps(values.where(values.astype(bool), None))
+
+
+_TIMESTAMP_COLUMNS = {TIMESTAMP: _timestamps, OPTIONAL_TIMESTAMP: _optional_timestamps}
+
+
+def _absent(values: pd.Series) -> pd.Series:
+    """NaN marks a key missing from the payload (or a level that is not a dict/list); None is a JSON null."""
+    return values.isna() & (values.to_numpy() != None)  # noqa: E711 (elementwise)
+
+
+def _nulls(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(~values.isna(), None)
+
+
+def _payload_column(frame: pd.DataFrame, key) -> pd.Series:
+    if key in frame:
+        return frame[key]
+    return pd.Series(float("nan"), index=frame.index, dtype=object)
+
+
+def _get(values: pd.Series, key) -> pd.Series:
+    """`value[key]` for the dicts/lists of a column (`.str.get`); NaN for any other value."""
+    nested = values.map(type).isin((dict, list))
+    if not nested.any():
+        return pd.Series(float("nan"), index=values.index, dtype=object)
+    return values.where(nested, float("nan")).str.get(key)
+
+
+def _dig(values: pd.Series, keys: tuple) -> pd.Series:
+    """Column version of spec.dig(): ints index lists, other keys read dicts."""
+    for key in keys:
+        if isinstance(key, int):
+            values = values.where(values.map(type).eq(list), None)
+        values = _get(values, key)
+    return values
+
+
+def _refs(values: pd.Series) -> pd.Series:
+    """Expanded objects ({"id": ...}) → their id, ids (strings) kept as they are."""
+    ids = _get(values, "id")
+    return ids.where(~_absent(ids), values)
+
+
+def _column(frame: pd.DataFrame, objects: pd.Series, key: str, f) -> pd.Series:
+    source = key if f.source is None else f.source
+    if callable(source):
+        return objects.map(source)
+    if isinstance(source, tuple):
+        values = _dig(_payload_column(frame, source[0]), source[1:])
+    else:
+        values = _payload_column(frame, source)
+    missing = _absent(values)
+    if f.required and missing.any():
+        raise KeyError(source)
+    if f.default is not None and missing.any():
+        values = values.copy()
+        values[missing] = pd.Series([copy(f.default) for _ in range(missing.sum())], index=values.index[missing], dtype=object)
+    if f.convert == REF:
+        values = _refs(values)
+    return _nulls(values)
+
+
+def frame_converter(converters):
+    """Batch version of `converters.to_model`: same mapping, every column built from the payload column."""
+
+    def to_frame(objects: list) -> pd.DataFrame:
+        payloads = pd.DataFrame(objects, dtype=object)
+        series = pd.Series(objects, index=payloads.index, dtype=object)
+        frame = pd.DataFrame({
+            key: _column(payloads, series, key, f) for key, f in converters.spec.items()
+        }, index=payloads.index)
+        for key, kind in converters.timestamps.items():
+            frame[key] = _TIMESTAMP_COLUMNS[kind](frame[key])
+        return frame
+
+    to_frame.__name__ = f"{converters.model.__tablename__}_to_frame"
+    return to_frame
+
+
+# ===== Per resource =====
+
+stripe_customers_to_frame = frame_converter(CUSTOMER)
+stripe_products_to_frame = frame_converter(PRODUCT)
+stripe_prices_to_frame = frame_converter(PRICE)
+stripe_payment_methods_to_frame = frame_converter(PAYMENT_METHOD)
+stripe_subscriptions_to_frame = frame_converter(SUBSCRIPTION)
+stripe_invoices_to_frame = frame_converter(INVOICE)
+stripe_payment_intents_to_frame = frame_converter(PAYMENT_INTENT)
+stripe_charges_to_frame = frame_converter(CHARGE)
+
+
+FRAME_TRANSFORMERS = {
+    Customer: stripe_customers_to_frame,
+    Product: stripe_products_to_frame,
+    Price: stripe_prices_to_frame,
+    PaymentMethod: stripe_payment_methods_to_frame,
+    Subscription: stripe_subscriptions_to_frame,
+    Invoice: stripe_invoices_to_frame,
+    PaymentIntent: stripe_payment_intents_to_frame,
+    Charge: stripe_charges_to_frame,
+}
+
+
+# ===== Frame → rows =====
+
+def _column_default(column):
+    """Value the ORM would insert for a column the transformer does not set."""
+    if column.default is None:
+        return None
+    if column.default.is_scalar:
+        return column.default.arg
+    if column.default.is_callable:
+        return column.default.arg(None)
+    return None
+
+
+def to_rows(model, frame: pd.DataFrame) -> list:
+    """Rows in table column order (datetimes as `datetime`, NaT as None), ready for COPY or Core inserts."""
+    columns = []
+    for column in model.__table__.columns:
+        if column.key not in frame:
+            columns.append([_column_default(column) for _ in range(len(frame))])
+        elif pd.api.types.is_datetime64_any_dtype(frame[column.key]):
+            columns.append([None if pd.isna(v) else v.to_pydatetime() for v in frame[column.key]])
+        else:
+            columns.append(frame[column.key].tolist())
+    return list(zip(*columns))
+
+
+def transform_rows(model, objects: list) -> list:
+    """Batch transform of Stripe dicts straight to row tuples for `model`'s table."""
+    if not objects:
+        return []
+    return to_rows(model, FRAME_TRANSFORMERS[model](objects))
@@ -1,32 +1,29 @@
 from app.models.customer import Customer
-from datetime import datetime
+from app.transformers.spec import compile_spec, field, ref, required, timestamp
 
-def stripe_customer_to_model(data: dict) -> Customer:
-    return Customer(
-        id=data["id"],
-        email=data.get("email"),
-        name=data.get("name"),
-        description=data.get("description"),
-        phone=data.get("phone"),
-        balance=data.get("balance"),
-        currency=data.get("currency"),
-        delinquent=data.get("delinquent"),
-        livemode=data.get("livemode", False),
-        deleted=data.get("deleted", False),  # ✅ NEW: support deleted customers
-        created=datetime.fromtimestamp(data["created"]) if data.get("created") else None,
-        invoice_prefix=data.get("invoice_prefix"),
-        next_invoice_sequence=data.get("next_invoice_sequence"),
-        address=data.get("address"),
-        shipping=data.get("shipping"),
-        invoice_settings=data.get("invoice_settings"),
-        stripe_metadata=data.get("metadata", {}),
-        tax_exempt=data.get("tax_exempt"),
-        default_payment_method_id=(
-            data.get("invoice_settings", {})
-                .get("default_payment_method", {})
-                .get("id")
-            if isinstance(data.get("invoice_settings"), dict)
-            else None
-        ),
-        test_clock=data.get("test_clock")
-    )
+CUSTOMER_SPEC = {
+    "id": required(),
+    "email": field(),
+    "name": field(),
+    "description": field(),
+    "phone": field(),
+    "balance": field(),
+    "currency": field(),
+    "delinquent": field(),
+    "livemode": field(default=False),
+    "deleted": field(default=False),  # ✅ NEW: support deleted customers
+    "created": timestamp(optional=True),
+    "invoice_prefix": field(),
+    "next_invoice_sequence": field(),
+    "address": field(),
+    "shipping": field(),
+    "invoice_settings": field(),
+    "stripe_metadata": field("metadata", default={}),
+    "tax_exempt": field(),
+    "default_payment_method_id": ref(("invoice_settings", "default_payment_method")),
+    "test_clock": field(),
+}
+
+CUSTOMER = compile_spec(Customer, CUSTOMER_SPEC, name="stripe_customer")
+
+stripe_customer_to_model = CUSTOMER.to_model
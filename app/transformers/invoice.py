@@ -1,45 +1,58 @@
+from datetime import datetime, timezone
 from app.models.invoice import Invoice
-from datetime import datetime
-
-def stripe_invoice_to_model(data: dict) -> Invoice:
-    """
-    Convert Stripe invoice JSON data into a SQLAlchemy Invoice model.
-
-    Ensures customer_id is cast from dict if needed and supports optional fields.
-    """
-
-    # Normalize customer_id (can be a string or a full dict)
-    customer = data.get("customer")
-    customer_id = customer["id"] if isinstance(customer, dict) else customer
-
-    return Invoice(
-        id=data["id"],
-        customer_id=customer_id,
-        status=data.get("status"),
-        billing_reason=data.get("billing_reason"),
-        collection_method=data.get("collection_method"),
-        currency=data.get("currency"),
-        amount_due=data.get("amount_due"),
-        amount_paid=data.get("amount_paid"),
-        amount_remaining=data.get("amount_remaining"),
-        total=data.get("total"),
-        subtotal=data.get("subtotal"),
-        created=datetime.fromtimestamp(data["created"]),
-        period_start=datetime.fromtimestamp(data["period_start"]),
-        period_end=datetime.fromtimestamp(data["period_end"]),
-        livemode=data.get("livemode", False),
-        auto_advance=data.get("auto_advance", False),
-        attempted=data.get("attempted", False),
-        attempt_count=data.get("attempt_count", 0),
-        hosted_invoice_url=data.get("hosted_invoice_url"),
-        invoice_pdf=data.get("invoice_pdf"),
-        number=data.get("number"),
-        receipt_number=data.get("receipt_number"),
-        stripe_metadata=data.get("metadata", {}),
-        lines=data.get("lines", {}),
-        discounts=data.get("discounts", []),
-        automatic_tax=data.get("automatic_tax"),
-        payment_settings=data.get("payment_settings"),
-        shipping_cost=data.get("shipping_cost"),
-        status_transitions=data.get("status_transitions")
-    )
+from app.transformers.spec import computed, compile_spec, dig, field, ref, required, timestamp
+
+
+def latest_status_transition(data: dict):
+    """When the invoice last changed status (finalized, paid, voided, uncollectible), in UTC."""
+    times = [t for t in (data.get("status_transitions") or {}).values() if t]
+    return datetime.fromtimestamp(max(times), tz=timezone.utc) if times else None
+
+
+def default_payment_method_id(data: dict):
+    """The invoice's own default payment method, else the one of the (expanded) customer."""
+    for keys in (("default_payment_method",), ("customer", "invoice_settings", "default_payment_method")):
+        method = dig(data, keys)
+        if method:
+            return method.get("id") if isinstance(method, dict) else method
+    return None
+
+
+INVOICE_SPEC = {
+    "id": required(),
+    "customer_id": ref("customer"),  # string or full customer object
+    "status": field(),
+    "billing_reason": field(),
+    "collection_method": field(),
+    "currency": field(),
+    "amount_due": field(),
+    "amount_paid": field(),
+    "amount_remaining": field(),
+    "total": field(),
+    "subtotal": field(),
+    "created": timestamp(),
+    "period_start": timestamp(),
+    "period_end": timestamp(),
+    "livemode": field(default=False),
+    "auto_advance": field(default=False),
+    "attempted": field(default=False),
+    "attempt_count": field(default=0),
+    "hosted_invoice_url": field(),
+    "invoice_pdf": field(),
+    "number": field(),
+    "receipt_number": field(),
+    "stripe_metadata": field("metadata", default={}),
+    "lines": field(default={}),
+    "discounts": field(default=[]),
+    "automatic_tax": field(),
+    "payment_settings": field(),
+    "shipping_cost": field(),
+    "status_transitions": field(),
+    "status_transitions_at": computed(latest_status_transition),
+    "default_payment_method_id": computed(default_payment_method_id),
+}
+
+INVOICE = compile_spec(Invoice, INVOICE_SPEC, name="stripe_invoice")
+
+# Stripe invoice JSON → Invoice (see app.transformers.spec)
+stripe_invoice_to_model = INVOICE.to_model
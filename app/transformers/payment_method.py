@@ -1,15 +1,18 @@
 from app.models.payment_method import PaymentMethod
-from datetime import datetime
+from app.transformers.spec import compile_spec, field, required, timestamp
 
-def stripe_payment_method_to_model(data: dict) -> PaymentMethod:
-    return PaymentMethod(
-        id=data["id"],
-        type=data.get("type"),
-        created=datetime.fromtimestamp(data["created"]),
-        livemode=data.get("livemode", False),
-        customer_id=data.get("customer"),
-        billing_details=data.get("billing_details", {}),
-        stripe_metadata=data.get("metadata", {}),
-        us_bank_account=data.get("us_bank_account"),
-        card=data.get("card")
-    )
+PAYMENT_METHOD_SPEC = {
+    "id": required(),
+    "type": field(),
+    "created": timestamp(),
+    "livemode": field(default=False),
+    "customer_id": field("customer"),
+    "billing_details": field(default={}),
+    "stripe_metadata": field("metadata", default={}),
+    "us_bank_account": field(),
+    "card": field(),
+}
+
+PAYMENT_METHOD = compile_spec(PaymentMethod, PAYMENT_METHOD_SPEC, name="stripe_payment_method")
+
+stripe_payment_method_to_model = PAYMENT_METHOD.to_model
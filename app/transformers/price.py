@@ -1,29 +1,29 @@
 from app.models.price import Price
-from datetime import datetime
-import json
+from app.transformers.spec import compile_spec, field, path, ref, required, timestamp
 
-def stripe_price_to_model(data: dict) -> Price:
-    # product peut être une string ou un dict
-    product = data.get("product")
-    product_id = product.get("id") if isinstance(product, dict) else product
+PRICE_SPEC = {
+    "id": required(),
+    "active": field(default=True),
+    "currency": field(),
+    "billing_scheme": field(),
+    "type": field(),
+    "unit_amount": field(),
+    "unit_amount_decimal": field(),
+    "product_id": ref("product"),  # product peut être une string ou un dict
+    "recurring": field(),
+    "livemode": field(default=False),
+    "created": timestamp(),
+    "nickname": field(),
+    "lookup_key": field(),
+    "stripe_metadata": field("metadata", default={}),
+    "tax_behavior": field(),
+    "tiers_mode": field(),
+    "custom_unit_amount": field(),
+    "transform_quantity": field(),
+    "product_name": path("product", "name"),  # expanded product only, else copied from products at ingest
+    "interval": path("recurring", "interval"),
+}
 
-    return Price(
-        id=data["id"],
-        active=data.get("active", True),
-        currency=data.get("currency"),
-        billing_scheme=data.get("billing_scheme"),
-        type=data.get("type"),
-        unit_amount=data.get("unit_amount"),
-        unit_amount_decimal=data.get("unit_amount_decimal"),
-        product_id=product_id,
-        recurring=json.dumps(data.get("recurring")) if data.get("recurring") else None,
-        livemode=data.get("livemode", False),
-        created=datetime.fromtimestamp(data["created"]),
-        nickname=data.get("nickname"),
-        lookup_key=data.get("lookup_key"),
-        stripe_metadata=data.get("metadata", {}),
-        tax_behavior=data.get("tax_behavior"),
-        tiers_mode=data.get("tiers_mode"),
-        custom_unit_amount=json.dumps(data.get("custom_unit_amount")) if data.get("custom_unit_amount") else None,
-        transform_quantity=json.dumps(data.get("transform_quantity")) if data.get("transform_quantity") else None
-    )
+PRICE = compile_spec(Price, PRICE_SPEC, name="stripe_price")
+
+stripe_price_to_model = PRICE.to_model
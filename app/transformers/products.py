@@ -1,23 +1,26 @@
 from app.models.products import Product
-from datetime import datetime
+from app.transformers.spec import compile_spec, field, required, timestamp
 
-def stripe_product_to_model(data: dict) -> Product:
-    return Product(
-        id=data["id"],
-        name=data.get("name"),
-        description=data.get("description"),
-        active=data.get("active", True),
-        livemode=data.get("livemode", False),
-        created=datetime.fromtimestamp(data["created"]),
-        updated=datetime.fromtimestamp(data["updated"]),
-        default_price=data.get("default_price"),
-        tax_code=data.get("tax_code"),
-        unit_label=data.get("unit_label"),
-        statement_descriptor=data.get("statement_descriptor"),
-        url=data.get("url"),
-        images=data.get("images", []),
-        marketing_features=data.get("marketing_features", []),
-        stripe_metadata=data.get("metadata", {}),
-        package_dimensions=data.get("package_dimensions"),
-        shippable=data.get("shippable")
-    )
+PRODUCT_SPEC = {
+    "id": required(),
+    "name": field(),
+    "description": field(),
+    "active": field(default=True),
+    "livemode": field(default=False),
+    "created": timestamp(),
+    "updated": timestamp(),
+    "default_price": field(),
+    "tax_code": field(),
+    "unit_label": field(),
+    "statement_descriptor": field(),
+    "url": field(),
+    "images": field(default=[]),
+    "marketing_features": field(default=[]),
+    "stripe_metadata": field("metadata", default={}),
+    "package_dimensions": field(),
+    "shippable": field(),
+}
+
+PRODUCT = compile_spec(Product, PRODUCT_SPEC, name="stripe_product")
+
+stripe_product_to_model = PRODUCT.to_model
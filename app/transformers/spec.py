@@ -0,0 +1,195 @@
+"""
+Declarative Stripe → table mappings, compiled once into converter functions.
+
+A spec maps each column key to a Field saying where the value comes from in the Stripe
+payload and how it is converted. compile_spec() generates, for one model:
+
+- `to_model(data)`: the ORM instance (what the stripe_*_to_model transformers return),
+- `to_row(data)`: a tuple in table column order, Python-side defaults applied, for COPY.
+
+The columnar (pandas) transformers read the same spec, one column at a time.
+
+JSON sub-objects are kept as native dicts/lists: JSONB encoding happens once, in the
+engine's codec (app/db/json_codec.py). Stripe timestamps (UNIX seconds) are stored as naive
+UTC datetimes, whatever the host's timezone (utc_datetime).
+"""
+from datetime import datetime, timezone
+from operator import attrgetter
+from app.utils.content_hash import payload_hash
+
+# Conversions applied after reading the value
+TIMESTAMP = "timestamp"                    # utc_datetime(value), value required
+OPTIONAL_TIMESTAMP = "optional_timestamp"  # same, None when the value is falsy
+REF = "ref"                                # expanded object ({"id": ...}) → its id
+
+_CONVERSIONS = {
+    None: None,
+    TIMESTAMP: "{v} = _fromtimestamp({v})",
+    OPTIONAL_TIMESTAMP: "{v} = _fromtimestamp({v}) if {v} else None",
+    REF: '{v} = {v}.get("id") if isinstance({v}, dict) else {v}',
+}
+
+
+class Field:
+    """
+    Where one column comes from. `source` is a payload key (the column key by default),
+    a tuple path into nested objects (ints index lists), or a function of the payload.
+    """
+
+    __slots__ = ("source", "convert", "default", "required")
+
+    def __init__(self, source=None, convert=None, default=None, required=False):
+        if convert not in _CONVERSIONS:
+            raise ValueError(f"Unknown conversion: {convert}")
+        self.source = source
+        self.convert = convert
+        self.default = default
+        self.required = required
+
+
+def field(source=None, default=None) -> Field:
+    return Field(source, default=default)
+
+
+def required(source=None) -> Field:
+    return Field(source, required=True)
+
+
+def timestamp(source=None, optional: bool = False) -> Field:
+    if optional:
+        return Field(source, OPTIONAL_TIMESTAMP)
+    return Field(source, TIMESTAMP, required=True)
+
+
+def ref(source=None) -> Field:
+    return Field(source, REF)
+
+
+def path(*keys) -> Field:
+    return Field(tuple(keys))
+
+
+def computed(func) -> Field:
+    return Field(func)
+
+
+def utc_datetime(seconds) -> datetime:
+    """UNIX seconds → naive UTC datetime, the zone of every TIMESTAMP column."""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def dig(data, keys):
+    """Follow `keys` into nested dicts/lists; None as soon as a level is missing."""
+    value = data
+    for key in keys:
+        if isinstance(key, int):
+            value = value[key] if isinstance(value, list) and len(value) > key else None
+        else:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            return None
+    return value
+
+
+# ===== Compilation =====
+
+class Converters:
+    """The compiled converters of one model, plus what the columnar path needs to know."""
+
+    def __init__(self, model, spec, to_model, to_row):
+        self.model = model
+        self.spec = spec
+        self.columns = list(spec)
+        self.to_model = to_model
+        self.to_row = to_row
+        # Row positions holding a value (mapped or defaulted) rather than a plain NULL
+        self.set_in_row = [c.key in spec or c.default is not None for c in model.__table__.columns]
+        # Timestamp columns and their conversion, converted per column by the columnar path
+        self.timestamps = {key: f.convert for key, f in spec.items() if f.convert in (TIMESTAMP, OPTIONAL_TIMESTAMP)}
+
+    def __repr__(self):
+        return f"Converters({self.model.__name__})"
+
+
+def _read_expr(key, f: Field, namespace: dict) -> str:
+    source = key if f.source is None else f.source
+    if callable(source):
+        name = f"_compute_{key}"
+        namespace[name] = source
+        return f"{name}(data)"
+    if isinstance(source, tuple):
+        return f"_dig(data, {source!r})"
+    if f.required:
+        return f"data[{source!r}]"
+    if f.default is None:
+        return f"data.get({source!r})"
+    # repr() of a literal default ({}, [], False, ...) builds a fresh object per call
+    return f"data.get({source!r}, {f.default!r})"
+
+
+def _compile(name: str, body: list, namespace: dict):
+    source = f"def {name}(data):\n" + "".join(f"    {line}\n" for line in body)
+    exec(compile(source, f"<spec {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
+
+
+def compile_spec(model, spec: dict, name: str = None) -> Converters:
+    """
+    Compile `spec` (column key → Field) for `model`. A `content_hash` column is
+    filled with payload_hash(data) unless the spec maps it.
+    """
+    spec = dict(spec)
+    column_keys = [c.key for c in model.__table__.columns]
+    if "content_hash" in column_keys and "content_hash" not in spec:
+        spec["content_hash"] = computed(payload_hash)
+    unknown = set(spec) - set(column_keys)
+    if unknown:
+        raise ValueError(f"{model.__name__} spec maps unknown columns: {sorted(unknown)}")
+
+    namespace = {
+        "_fromtimestamp": utc_datetime,
+        "_dig": dig,
+        model.__name__: model,
+    }
+    read, convert = [], []
+    for i, (key, f) in enumerate(spec.items()):
+        read.append(f"v{i} = {_read_expr(key, f, namespace)}")
+        line = _CONVERSIONS[f.convert]
+        if line is not None:
+            convert.append(line.format(v=f"v{i}"))
+    variables = {key: f"v{i}" for i, (key, f) in enumerate(spec.items())}
+
+    # Columns the spec leaves out get their Python-side default, like db.add() would
+    row_values = []
+    for column in model.__table__.columns:
+        if column.key in variables:
+            row_values.append(variables[column.key])
+        elif column.default is not None and column.default.is_callable:
+            namespace[f"_default_{column.key}"] = column.default.arg
+            row_values.append(f"_default_{column.key}(None)")
+        elif column.default is not None and column.default.is_scalar:
+            namespace[f"_default_{column.key}"] = column.default.arg
+            row_values.append(f"_default_{column.key}")
+        else:
+            row_values.append("None")
+
+    name = name or model.__tablename__
+    to_model = _compile(
+        f"{name}_to_model", read + convert + [f"return {model.__name__}({', '.join(f'{k}={v}' for k, v in variables.items())})"], namespace,
+    )
+    to_row = _compile(f"{name}_to_row", read + convert + [f"return ({', '.join(row_values)},)"], namespace)
+
+    converters = Converters(model, spec, to_model, to_row)
+    to_model.converters = converters  # lets the bulk loader skip ORM instances
+    return converters
+
+
+def compile_serializer(model):
+    """Table row (ORM instance) → {column name: value}, e.g. for JSON dumps."""
+    names = [c.name for c in model.__table__.columns]
+    getter = attrgetter(*[c.key for c in model.__table__.columns])
+    if len(names) == 1:
+        return lambda instance: {names[0]: getter(instance)}
+    return lambda instance: dict(zip(names, getter(instance)))
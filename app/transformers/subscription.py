@@ -1,43 +1,31 @@
 from app.models.subscription import Subscription
-from datetime import datetime
+from app.transformers.spec import compile_spec, field, path, ref, required, timestamp
 
-def stripe_subscription_to_model(data: dict) -> Subscription:
-    """
-    Transform Stripe subscription API data into a Subscription ORM object.
+SUBSCRIPTION_SPEC = {
+    "id": required(),
+    "status": field(),
+    "currency": field(),
+    "customer_id": ref("customer"),  # can be a dict or a string (ID)
+    "price_id": ref(("items", "data", 0, "price")),
+    "start_date": timestamp(),
+    "created": timestamp(),
+    "cancel_at": timestamp(optional=True),
+    "canceled_at": timestamp(optional=True),
+    "ended_at": timestamp(optional=True),
+    "cancel_at_period_end": field(default=False),
+    "livemode": field(default=False),
+    "stripe_metadata": field("metadata", default={}),
+    "items": field(default={}),
+    "invoice_settings": field(),
+    "automatic_tax": field(),
+    "payment_settings": field(),
+    "trial_settings": field(),
+    "latest_invoice": field(),
+    # Defensive extraction of the first subscription item and its recurring plan
+    "subscription_item_id": path("items", "data", 0, "id"),
+    "plan_interval": path("items", "data", 0, "price", "recurring", "interval"),
+}
 
-    Handles nested structures and optional fields safely.
-    """
-    # Handle customer: can be a dict or a string (ID)
-    customer = data.get("customer")
-    customer_id = customer["id"] if isinstance(customer, dict) else customer
+SUBSCRIPTION = compile_spec(Subscription, SUBSCRIPTION_SPEC, name="stripe_subscription")
 
-    # Defensive extraction of subscription item and recurring plan info
-    items = data.get("items", {}).get("data", [])
-    first_item = items[0] if items else {}
-    price = first_item.get("price", {}) if first_item else {}
-    subscription_item_id = first_item.get("id")
-    plan_interval = price.get("recurring", {}).get("interval")
-
-    return Subscription(
-        id=data["id"],
-        status=data.get("status"),
-        currency=data.get("currency"),
-        customer_id=customer_id,
-        price_id=price.get("id"),
-        start_date=datetime.fromtimestamp(data["start_date"]),
-        created=datetime.fromtimestamp(data["created"]),
-        cancel_at=datetime.fromtimestamp(data["cancel_at"]) if data.get("cancel_at") else None,
-        canceled_at=datetime.fromtimestamp(data["canceled_at"]) if data.get("canceled_at") else None,
-        ended_at=datetime.fromtimestamp(data["ended_at"]) if data.get("ended_at") else None,
-        cancel_at_period_end=data.get("cancel_at_period_end", False),
-        livemode=data.get("livemode", False),
-        stripe_metadata=data.get("metadata", {}),
-        items=data.get("items", {}),
-        invoice_settings=data.get("invoice_settings"),
-        automatic_tax=data.get("automatic_tax"),
-        payment_settings=data.get("payment_settings"),
-        trial_settings=data.get("trial_settings"),
-        latest_invoice=data.get("latest_invoice"),
-        subscription_item_id=subscription_item_id,
-        plan_interval=plan_interval
-    )
+stripe_subscription_to_model = SUBSCRIPTION.to_model
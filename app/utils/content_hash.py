@@ -0,0 +1,11 @@
+# app/utils/content_hash.py
+import hashlib
+import json
+
+def payload_hash(data: dict) -> str:
+    """
+    SHA-256 of a Stripe object in canonical form (sorted keys, compact separators),
+    stored in each table's `content_hash` so upserts only rewrite rows that changed.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,144 @@
+# app/utils/json_stream.py
+import json
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Incremental JSON tokenizer over a text file: keeps only the current chunk in memory."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_size: int) -> bool:
+        """Read more data, dropping the consumed prefix. Returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(0):
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"❌ Invalid JSON: expected '{char}' but got '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more of the file until it fits in the buffer."""
+        self.peek()
+        wanted = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A scalar touching the end of the buffer may be truncated ("12" of "1234")
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            wanted *= 2
+            if not self._fill(wanted):
+                if self.eof and self.pos < len(self.buf):
+                    continue
+                raise ValueError("❌ Invalid JSON: unexpected end of file")
+
+
+def _iter_array(reader: _Reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        sep = reader.peek()
+        reader.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"❌ Invalid JSON: expected ',' or ']' in array but got '{sep or 'EOF'}'")
+
+
+def _iter_records(reader: _Reader):
+    """Yield records from a top-level array, a {"data": [...]} list envelope, or a single object."""
+    first = reader.peek()
+    if first == "[":
+        yield from _iter_array(reader)
+        return
+    if first != "{":
+        raise ValueError("❌ Unrecognized JSON structure")
+
+    reader.pos += 1
+    envelope = {}
+    found_data = False
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "data" and reader.peek() == "[":
+                found_data = True
+                yield from _iter_array(reader)
+            else:
+                envelope[key] = reader.value()
+            sep = reader.peek()
+            reader.pos += 1
+            if sep == "}":
+                break
+            if sep != ",":
+                raise ValueError(f"❌ Invalid JSON: expected ',' or '}}' in object but got '{sep or 'EOF'}'")
+
+    # A single exported object rather than a list
+    if not found_data and "id" in envelope:
+        yield envelope
+
+
+def iter_stripe_objects(filepath: str, expected_type: str = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Stream Stripe objects one at a time from an export file, without loading it whole.
+
+    Accepts the `{"object": "list", "data": [...]}` envelope, a top-level array, or a
+    single object. When `expected_type` is given, the `object` field of every record is
+    checked as it is read.
+    """
+    count = 0
+    with open(filepath, "r") as f:
+        for obj in _iter_records(_Reader(f, chunk_size)):
+            if expected_type is not None:
+                obj_type = obj.get("object") if isinstance(obj, dict) else None
+                if obj_type != expected_type:
+                    raise ValueError(f"❌ Expected object type '{expected_type}', but got '{obj_type}' (record #{count + 1}).")
+            count += 1
+            yield obj
+
+    if expected_type is not None:
+        if not count:
+            raise ValueError("❌ No objects found in 'data' array.")
+        print(f"🔒 File validation passed: {count} object(s) of type '{expected_type}' ✔️")
+
+
+def count_stripe_objects(filepath: str) -> int:
+    """Count records in an export file in constant memory."""
+    return sum(1 for _ in iter_stripe_objects(filepath))
@@ -0,0 +1,203 @@
+# app/utils/metrics.py
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# Stages timed by the ingest pipeline
+STAGES = ("fetch", "transform", "exists", "write", "commit")
+REPORT_EVERY = 10.0  # seconds between two progress lines
+
+_current = ContextVar("pipeline_metrics", default=None)
+_debug = False
+
+
+class PipelineMetrics:
+    """
+    Counters and per-stage timers for the ingestion of one table.
+
+    Stage times are exclusive: a commit triggered while fetching the next page counts
+    as "commit", not "fetch". Progress (rows/s) is printed every `report_every` seconds.
+    """
+
+    def __init__(self, name: str, report_every: float = REPORT_EVERY):
+        self.name = name
+        self.report_every = report_every
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+        self.started = time.perf_counter()
+        self.finished = None
+        self._stack = []  # [stage, start, time spent in nested stages]
+        self._next_report = self.started + report_every
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @contextmanager
+    def stage(self, name: str):
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.timings[name] += elapsed - frame[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def add_time(self, name: str, seconds: float):
+        """Record an already measured duration as a stage nested in the current one."""
+        self.timings[name] += seconds
+        if self._stack:
+            self._stack[-1][2] += seconds
+
+    def timed_iter(self, name: str, iterable):
+        """Iterate, timing each next() call (e.g. API paging or file parsing) as stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+        if name == "rows":
+            now = time.perf_counter()
+            if now >= self._next_report:
+                self._next_report = now + self.report_every
+                print(f"📈 {self.name}: {self.counters['rows']} rows ({self.counters['rows'] / (now - self.started):.0f} rows/s)")
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "table": self.name,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.counters["rows"] / elapsed, 1) if elapsed else 0.0,
+            "counters": dict(self.counters),
+            "stages_s": {stage: round(self.timings.get(stage, 0.0), 3) for stage in STAGES},
+        }
+
+
+# ===== Current table (set by track(), read by the helpers below) =====
+
+@contextmanager
+def track(name: str, report_every: float = REPORT_EVERY):
+    """Collect the metrics of everything ingested in this block (and thread)."""
+    metrics = PipelineMetrics(name, report_every)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def stage(name: str):
+    metrics = _current.get()
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def add_time(name: str, seconds: float):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_time(name, seconds)
+
+
+def timed_iter(name: str, iterable):
+    metrics = _current.get()
+    return metrics.timed_iter(name, iterable) if metrics is not None else iterable
+
+
+def count(name: str, n: int = 1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+# ===== Per-object logging =====
+
+def set_debug(enabled: bool):
+    global _debug
+    _debug = enabled
+
+
+def debug_enabled() -> bool:
+    return _debug
+
+
+def debug(message: str):
+    if _debug:
+        print(message)
+
+
+# ===== Summaries =====
+
+def to_json(all_metrics) -> str:
+    return json.dumps([m.summary() for m in all_metrics], indent=2)
+
+
+def to_prometheus(all_metrics) -> str:
+    """Prometheus text exposition format (e.g. for the node_exporter textfile collector)."""
+    lines = [
+        "# HELP stripe_ingest_objects_total Objects processed per table and outcome.",
+        "# TYPE stripe_ingest_objects_total counter",
+    ]
+    for m in all_metrics:
+        for name, value in sorted(m.counters.items()):
+            lines.append(f'stripe_ingest_objects_total{{table="{m.name}",outcome="{name}"}} {value}')
+    lines += [
+        "# HELP stripe_ingest_stage_seconds Time spent per pipeline stage.",
+        "# TYPE stripe_ingest_stage_seconds gauge",
+    ]
+    for m in all_metrics:
+        for stage_name in STAGES:
+            lines.append(f'stripe_ingest_stage_seconds{{table="{m.name}",stage="{stage_name}"}} {m.timings.get(stage_name, 0.0):.6f}')
+    lines += [
+        "# HELP stripe_ingest_duration_seconds Wall time of the table ingestion.",
+        "# TYPE stripe_ingest_duration_seconds gauge",
+    ]
+    for m in all_metrics:
+        lines.append(f'stripe_ingest_duration_seconds{{table="{m.name}"}} {m.elapsed:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def print_table_summary(m: PipelineMetrics):
+    summary = m.summary()
+    stages = " · ".join(f"{name} {seconds:.2f}s" for name, seconds in summary["stages_s"].items())
+    print(f"⏱️  {m.name}: {m.counters['rows']} rows in {summary['elapsed_s']:.2f}s ({summary['rows_per_s']:.0f} rows/s) — {stages}")
+
+
+def write_summary(path: str, all_metrics):
+    """Write the summary as Prometheus text for *.prom files, JSON otherwise."""
+    content = to_prometheus(all_metrics) if path.endswith(".prom") else to_json(all_metrics)
+    with open(path, "w") as f:
+        f.write(content)
+    print(f"📝 Metrics written to {path}")
+
+
+# ===== CLI =====
+
+def add_arguments(parser):
+    parser.add_argument("--verbose", action="store_true", help="Log every object (debug)")
+    parser.add_argument("--metrics-out", help="Write a metrics summary: Prometheus text for *.prom, JSON otherwise")
+
+
+def report(all_metrics, path: str = None):
+    """Print one stage breakdown line per table, and write the summary file if asked."""
+    for m in all_metrics:
+        print_table_summary(m)
+    if path:
+        write_summary(path, all_metrics)
@@ -0,0 +1,163 @@
+# app/utils/object_store.py
+"""
+Folder → object storage sync: only files whose content differs from the remote
+object are uploaded, several at a time.
+
+Backends expose three calls, so the sync can run against GCS or a local directory
+(tests, dry runs, a mounted fake-GCS volume):
+  - list(prefix) → {object name: {"size", "md5", "crc32c"}} in one listing
+  - upload(local_path, name) → store the file under `name`
+  - download(name, local_path) → fetch the object into `local_path`
+Checksums are base64 strings, as GCS reports them in blob.md5_hash / blob.crc32c.
+"""
+import base64
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import google_crc32c
+except ImportError:  # optional: installed with google-cloud-storage
+    google_crc32c = None
+
+WORKERS = 8
+READ_CHUNK = 1024 * 1024
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024  # above this size, resumable upload in chunks
+CHUNK_SIZE = 32 * 1024 * 1024  # resumable chunk (a multiple of 256 KB, as GCS requires)
+
+
+def file_checksums(path: str) -> dict:
+    md5 = hashlib.md5()
+    crc = google_crc32c.Checksum() if google_crc32c is not None else None
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            md5.update(chunk)
+            if crc is not None:
+                crc.update(chunk)
+    return {
+        "size": os.path.getsize(path),
+        "md5": base64.b64encode(md5.digest()).decode(),
+        "crc32c": base64.b64encode(crc.digest()).decode() if crc is not None else None,
+    }
+
+
+def same_content(local: dict, remote: dict | None) -> bool:
+    """MD5 when the remote has one (composite objects don't), CRC32C otherwise."""
+    if remote is None or remote["size"] != local["size"]:
+        return False
+    if remote.get("md5"):
+        return remote["md5"] == local["md5"]
+    return bool(remote.get("crc32c")) and remote["crc32c"] == local["crc32c"]
+
+
+class GCSBackend:
+    def __init__(self, bucket_name: str, client_factory=None):
+        self.bucket_name = bucket_name
+        self._client_factory = client_factory
+        self._local = threading.local()
+
+    def _bucket(self):
+        # One client per thread: its HTTP session is not meant to be shared
+        if not hasattr(self._local, "bucket"):
+            if self._client_factory is None:
+                from google.cloud import storage
+                self._client_factory = storage.Client
+            self._local.bucket = self._client_factory().bucket(self.bucket_name)
+        return self._local.bucket
+
+    def url(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+    def list(self, prefix: str) -> dict:
+        return {
+            blob.name: {"size": blob.size, "md5": blob.md5_hash, "crc32c": blob.crc32c}
+            for blob in self._bucket().list_blobs(prefix=prefix)
+        }
+
+    def upload(self, local_path: str, name: str):
+        # chunk_size switches the client to a resumable upload: a dropped connection
+        # resumes from the last chunk instead of restarting a large dump
+        chunk_size = CHUNK_SIZE if os.path.getsize(local_path) > RESUMABLE_THRESHOLD else None
+        blob = self._bucket().blob(name, chunk_size=chunk_size)
+        blob.upload_from_filename(local_path, checksum="crc32c" if google_crc32c is not None else "md5")
+
+    def download(self, name: str, local_path: str):
+        self._bucket().blob(name).download_to_filename(local_path)
+
+
+class LocalBackend:
+    """A directory standing in for a bucket: object names are paths under `root`."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def url(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def list(self, prefix: str) -> dict:
+        objects = {}
+        for dirpath, _, files in os.walk(self.root):
+            for file in files:
+                if file.endswith(".part"):
+                    continue
+                name = os.path.relpath(os.path.join(dirpath, file), self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    objects[name] = file_checksums(os.path.join(dirpath, file))
+        return objects
+
+    def upload(self, local_path: str, name: str):
+        target = self.url(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target + ".part")
+        os.replace(target + ".part", target)
+
+    def download(self, name: str, local_path: str):
+        shutil.copyfile(self.url(name), local_path)
+
+
+def _sync_file(backend, local_path: str, name: str, remote: dict | None) -> tuple:
+    checksums = file_checksums(local_path)
+    if same_content(checksums, remote):
+        return False, 0
+    backend.upload(local_path, name)
+    return True, checksums["size"]
+
+
+def upload_folder(backend, source_folder: str, destination_folder: str = "", workers: int = WORKERS) -> dict:
+    """
+    Upload every file of `source_folder` under `destination_folder`, skipping those whose
+    remote object already has the same checksum. Returns
+    {"uploaded", "skipped", "bytes", "seconds", "mb_per_s"} (throughput of uploaded bytes).
+    """
+    started = time.perf_counter()
+    prefix = destination_folder.strip("/") + "/" if destination_folder.strip("/") else ""
+    remote = backend.list(prefix)
+
+    files = []
+    for root, _, names in os.walk(source_folder):
+        for file in sorted(names):
+            local_path = os.path.join(root, file)
+            # '/' even on Windows: object names are not OS paths
+            files.append((local_path, prefix + os.path.relpath(local_path, source_folder).replace(os.sep, "/")))
+
+    uploaded = skipped = total_bytes = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(local_path, name, pool.submit(_sync_file, backend, local_path, name, remote.get(name)))
+                   for local_path, name in files]
+        for local_path, name, future in futures:
+            sent, size = future.result()
+            if sent:
+                uploaded += 1
+                total_bytes += size
+                print(f"✅ Uploaded {local_path} to {backend.url(name)}")
+            else:
+                skipped += 1
+
+    seconds = time.perf_counter() - started
+    return {
+        "uploaded": uploaded, "skipped": skipped, "bytes": total_bytes, "seconds": round(seconds, 3),
+        "mb_per_s": round(total_bytes / 1e6 / seconds, 2) if seconds else 0.0,
+    }
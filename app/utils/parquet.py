@@ -0,0 +1,122 @@
+# app/utils/parquet.py
+"""
+Typed Parquet files from table rows, one directory per month of a date column
+(Hive layout: <table>/created_month=YYYY-MM/part-00000.parquet).
+
+Column types come from the SQLAlchemy table, not from the values, so every file of a
+table has the same schema whatever its rows contain. JSONB columns are stored as JSON
+text (field metadata {"encoding": "json"}): Stripe objects do not share one struct shape.
+"""
+import os
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer, Numeric
+from sqlalchemy.dialects.postgresql import JSONB
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: `parquet` extra (uv sync --extra parquet)
+    pa = pq = None
+
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"  # rows without a date (placeholders)
+ROW_GROUP_SIZE = 20000
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("❌ Parquet export needs the 'pyarrow' package (uv sync --extra parquet)")
+
+
+def arrow_type(column):
+    sql_type = column.type
+    if isinstance(sql_type, JSONB):
+        return pa.string()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, (BigInteger, Integer)):  # BigInteger subclasses Integer
+        return pa.int64()
+    if isinstance(sql_type, DateTime):
+        # timestamptz values are aware datetimes: a naive type would silently drop their zone
+        return pa.timestamp("us", tz="UTC") if sql_type.timezone else pa.timestamp("us")
+    if isinstance(sql_type, Float):  # before Numeric, its parent class
+        return pa.float64()
+    if isinstance(sql_type, Numeric):
+        return pa.decimal128(sql_type.precision or 38, sql_type.scale or 0)
+    return pa.string()
+
+
+def arrow_schema(table):
+    """pyarrow schema of a SQLAlchemy Table, JSONB columns as JSON text."""
+    _require_pyarrow()
+    return pa.schema([
+        pa.field(c.name, arrow_type(c), nullable=c.nullable,
+                 metadata={"encoding": "json"} if isinstance(c.type, JSONB) else None)
+        for c in table.columns
+    ])
+
+
+def month_partition(value) -> str:
+    return f"{value:%Y-%m}" if value is not None else NULL_PARTITION
+
+
+class MonthlyParquetWriter:
+    """
+    Writes rows sorted by `partition_column` into one Parquet file per month, holding at
+    most `row_group_size` rows in memory. Returns the written files from close().
+    """
+
+    def __init__(self, directory: str, schema, partition_column: str, row_group_size: int = ROW_GROUP_SIZE,
+                 compression: str = "snappy"):
+        _require_pyarrow()
+        self.directory = directory
+        self.schema = schema
+        self.partition_column = partition_column
+        self.partition_dir = f"{partition_column}_month"
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.files = []
+        self._writer = None
+        self._month = None
+        self._buffer = []
+        self._done = set()
+
+    def write(self, row: dict):
+        month = month_partition(row[self.partition_column])
+        if month != self._month:
+            self._close_file()
+            if month in self._done:
+                raise ValueError(f"❌ Rows are not sorted by {self.partition_column}: {month} seen twice")
+            self._open_file(month)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> list:
+        self._close_file()
+        return self.files
+
+    def _open_file(self, month: str):
+        relative = os.path.join(f"{self.partition_dir}={month}", "part-00000.parquet")
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = pq.ParquetWriter(f"{path}.part", self.schema, compression=self.compression)
+        self._month = month
+        self.files.append({"path": relative, "partition": month, "rows": 0})
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = {name: [row[name] for row in self._buffer] for name in self.schema.names}
+        self._writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        self.files[-1]["rows"] += len(self._buffer)
+        self._buffer = []
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        path = os.path.join(self.directory, self.files[-1]["path"])
+        os.replace(f"{path}.part", path)
+        self.files[-1]["bytes"] = os.path.getsize(path)
+        self._done.add(self._month)
+        self._writer = self._month = None
@@ -0,0 +1,121 @@
+# app/utils/snapshot_archive.py
+"""
+Content-addressed archive of a folder (data/imported_stripe_data) in object storage.
+
+    <prefix>/blobs/<sha256[:2]>/<sha256>    each distinct file content, stored once
+    <prefix>/snapshots/<name>.json          {"files": {relative path: {"sha256", "size"}}}
+
+A push hashes the local files, uploads only the blobs the bucket doesn't have yet and
+writes one small manifest, so pushing identical data again costs one manifest.
+materialize_snapshot() rebuilds any snapshot as a local folder. Works with any
+app.utils.object_store backend.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.utils.object_store import READ_CHUNK, WORKERS
+
+PREFIX = "imported_data"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(prefix: str, sha256: str) -> str:
+    return f"{prefix}/blobs/{sha256[:2]}/{sha256}"
+
+
+def snapshot_name(prefix: str, snapshot: str) -> str:
+    return f"{prefix}/snapshots/{snapshot}.json"
+
+
+def list_snapshots(backend, prefix: str = PREFIX) -> list:
+    """Snapshot names, oldest first (names are UTC timestamps)."""
+    start = f"{prefix}/snapshots/"
+    return sorted(name[len(start):-len(".json")] for name in backend.list(start) if name.endswith(".json"))
+
+
+def read_snapshot(backend, snapshot: str, prefix: str = PREFIX) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manifest.json")
+        backend.download(snapshot_name(prefix, snapshot), path)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def archive_folder(backend, source_folder: str, prefix: str = PREFIX, snapshot: str | None = None,
+                   workers: int = WORKERS) -> dict:
+    """
+    Store `source_folder` as a new snapshot (default name: UTC timestamp). Returns
+    {"snapshot", "files", "uploaded", "bytes", "seconds"}, bytes being what was actually sent.
+    """
+    started = time.perf_counter()
+    snapshot = snapshot or datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    paths = {}
+    for root, _, names in os.walk(source_folder):
+        for file in names:
+            local_path = os.path.join(root, file)
+            paths[os.path.relpath(local_path, source_folder).replace(os.sep, "/")] = local_path
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = dict(zip(paths, pool.map(file_sha256, paths.values())))
+        files = {rel: {"sha256": hashes[rel], "size": os.path.getsize(paths[rel])} for rel in sorted(paths)}
+
+        # A blob name is its content: existing means identical, no checksum to compare
+        stored = backend.list(f"{prefix}/blobs/")
+        missing = {}
+        for rel, entry in files.items():
+            if blob_name(prefix, entry["sha256"]) not in stored:
+                missing.setdefault(entry["sha256"], paths[rel])
+        for future in [pool.submit(backend.upload, path, blob_name(prefix, sha)) for sha, path in missing.items()]:
+            future.result()
+
+    manifest = {"snapshot": snapshot, "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "files": files}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manifest.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        # Written last: a snapshot only exists once all its blobs do
+        backend.upload(path, snapshot_name(prefix, snapshot))
+
+    return {
+        "snapshot": snapshot, "files": len(files), "uploaded": len(missing),
+        "bytes": sum(os.path.getsize(path) for path in missing.values()),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _materialize_file(backend, prefix: str, entry: dict, target: str) -> bool:
+    if os.path.exists(target) and os.path.getsize(target) == entry["size"] and file_sha256(target) == entry["sha256"]:
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    backend.download(blob_name(prefix, entry["sha256"]), target + ".part")
+    if file_sha256(target + ".part") != entry["sha256"]:
+        os.remove(target + ".part")
+        raise ValueError(f"❌ Corrupted blob {entry['sha256']} for {target}")
+    os.replace(target + ".part", target)
+    return True
+
+
+def materialize_snapshot(backend, snapshot: str, dest: str, prefix: str = PREFIX, workers: int = WORKERS) -> dict:
+    """
+    Rebuild `snapshot` under `dest`. Files already there with the right content are kept;
+    other files in `dest` are left alone. Returns {"files", "downloaded"}.
+    """
+    files = read_snapshot(backend, snapshot, prefix)["files"]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        downloaded = sum(pool.map(
+            lambda item: _materialize_file(backend, prefix, item[1], os.path.join(dest, *item[0].split("/"))),
+            files.items(),
+        ))
+    return {"files": len(files), "downloaded": downloaded}
@@ -0,0 +1,131 @@
+# app/utils/stripe_events.py
+from collections import Counter
+from sqlalchemy import bindparam, delete, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.types import String
+from app.db.bulk_loader import bulk_upsert
+from app.db.lookup import missing_ids
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.payment_intent import PaymentIntent
+from app.models.payment_method import PaymentMethod
+from app.models.price import Price
+from app.models.products import Product
+from app.models.stripe_event import StripeEvent
+from app.models.subscription import Subscription
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.payment_intent import stripe_payment_intent_to_model
+from app.transformers.payment_method import stripe_payment_method_to_model
+from app.transformers.price import stripe_price_to_model
+from app.transformers.products import stripe_product_to_model
+from app.transformers.subscription import stripe_subscription_to_model
+from app.utils import metrics
+from app.utils.stripe_helpers import references_before_merge
+
+# data.object["object"] → (model, transformer), in foreign-key order
+EVENT_RESOURCES = {
+    "customer": (Customer, stripe_customer_to_model),
+    "product": (Product, stripe_product_to_model),
+    "price": (Price, stripe_price_to_model),
+    "payment_method": (PaymentMethod, stripe_payment_method_to_model),
+    "subscription": (Subscription, stripe_subscription_to_model),
+    "invoice": (Invoice, stripe_invoice_to_model),
+    "payment_intent": (PaymentIntent, stripe_payment_intent_to_model),
+    "charge": (Charge, stripe_charge_to_model),
+}
+
+# `*.deleted` events of these resources keep the row (it is referenced) with these values
+SOFT_DELETES = {
+    "customer": {"deleted": True},
+    "product": {"active": False},
+    "price": {"active": False},
+}
+
+
+def _is_deletion(event: dict) -> bool:
+    return event["type"].endswith(".deleted") and event["data"]["object"].get("object") != "subscription"
+
+
+def last_applied(db: Session, object_ids) -> dict:
+    """{object id: `created` of the newest event recorded for it} (ids without events are left out)."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return {}
+    stmt = text(
+        "SELECT object_id, max(created) FROM stripe_events WHERE object_id = ANY(:ids) GROUP BY object_id"
+    ).bindparams(bindparam("ids", type_=ARRAY(String)))
+    with metrics.stage("exists"):
+        return dict(db.execute(stmt, {"ids": object_ids}).all())
+
+
+def apply_events(db: Session, events) -> Counter:
+    """
+    Apply Stripe events (webhook payloads or Event.list items) to the tables.
+
+    Events already in stripe_events are skipped, so redeliveries are harmless. The others
+    are applied in `created` order: only the last event per object counts, upserted with
+    its transformer (content-hash check, placeholders for unknown references), or deleted
+    for `*.deleted` events. Stripe does not deliver in order: an event older than the last
+    one recorded for its object (in an earlier batch) is recorded but not applied. Subscriptions are never deleted (`customer.subscription.deleted`
+    carries the canceled subscription). The caller commits, which records the events in
+    the same transaction as their effects.
+    """
+    by_id = {}
+    for event in events:
+        by_id.setdefault(event["id"], event)
+    new_ids = missing_ids(db, StripeEvent, by_id)
+    fresh = sorted((e for i, e in by_id.items() if i in new_ids), key=lambda e: e["created"])
+
+    counts = Counter(duplicates=len(by_id) - len(fresh))
+    latest = {}  # (object type, object id) → event; later events win
+    for event in fresh:
+        obj = event["data"]["object"]
+        if obj.get("object") not in EVENT_RESOURCES:
+            counts["ignored"] += 1
+            continue
+        latest[(obj["object"], obj["id"])] = event
+
+    applied = last_applied(db, {object_id for _, object_id in latest})
+    for key, event in list(latest.items()):
+        if event["created"] < applied.get(key[1], event["created"]):
+            del latest[key]
+            counts["stale"] += 1
+
+    for kind, (model, transform) in EVENT_RESOURCES.items():
+        upserts, deletions = [], []
+        for (event_kind, object_id), event in latest.items():
+            if event_kind != kind:
+                continue
+            obj = event["data"]["object"]
+            if not _is_deletion(event):
+                upserts.append(obj)
+            elif kind in SOFT_DELETES and "created" in obj:
+                upserts.append({**obj, **SOFT_DELETES[kind]})
+            else:
+                deletions.append(object_id)
+
+        if upserts:
+            result = bulk_upsert(db, model, upserts, transform, before_merge=references_before_merge(model))
+            counts["inserted"] += result.inserted
+            counts["updated"] += result.updated
+            counts["unchanged"] += result.unchanged
+        if deletions and kind in SOFT_DELETES:
+            # Deleted object without its payload: flag the row if we have it
+            db.execute(update(model).where(model.id.in_(deletions)).values(**SOFT_DELETES[kind]))
+            counts["deleted"] += len(deletions)
+        elif deletions:
+            counts["deleted"] += db.execute(delete(model).where(model.id.in_(deletions))).rowcount
+
+    if fresh:
+        db.execute(pg_insert(StripeEvent).values([
+            {"id": e["id"], "type": e["type"], "created": e["created"], "object_id": e["data"]["object"].get("id")}
+            for e in fresh
+        ]).on_conflict_do_nothing())
+    counts["events"] = len(fresh)
+    metrics.count("events", len(fresh))
+    return counts
@@ -1,17 +1,154 @@
 # app/utils/stripe_helpers.py
-from app.models.customer import Customer
-
-def ensure_customer_exists(db, customer_id: str):
-    """Create a placeholder customer in DB if it doesn't exist (e.g. deleted Stripe customer)"""
-    if customer_id and not db.get(Customer, customer_id):
-        print(f"👻 Creating placeholder for deleted customer: {customer_id}")
-        ghost = Customer(
-            id=customer_id,
-            deleted=True,
-            email=None,
-            name=None,
-            livemode=False,
-            created=None,
-            stripe_metadata={"placeholder": True},
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.db.lookup import missing_ids, referenced_values
+from app.db.partitioning import PARTITION_KEY, PLACEHOLDER_CREATED, REFERENCE_CREATED, ensure_partitions, is_partitioned
+from app.transformers.spec import utc_datetime
+from app.utils import metrics
+from app.models.invoice import Invoice
+from app.models.payment_intent import PaymentIntent
+from app.models.products import Product
+
+# Rows created for ids referenced by a foreign key but unknown to the DB (deleted or not yet
+# ingested Stripe objects), per referenced table. Other foreign keys are left to the FK check.
+PLACEHOLDERS = {
+    "customers": {"deleted": True, "livemode": False, "stripe_metadata": {"placeholder": True}},
+    "prices": {"active": False, "livemode": False, "stripe_metadata": {"placeholder": True}},
+    "invoices": {"livemode": False, "stripe_metadata": {"placeholder": True}},
+}
+
+def placeholder_references(model) -> list:
+    """(column, referenced table) for each foreign key of `model` that gets placeholders."""
+    return sorted(
+        ((fk.parent.key, fk.column.table) for fk in model.__table__.foreign_keys if fk.column.table.name in PLACEHOLDERS),
+        key=lambda ref: ref[0],
+    )
+
+def _insert_placeholders(db, table, ids) -> int:
+    """
+    Insert placeholder rows in their own short transaction. Tables ingested in parallel
+    reference the same missing customers; holding those row locks until the end of a
+    table's transaction could deadlock them. A committed placeholder is harmless if the
+    ingestion that needed it fails later.
+    """
+    ids = sorted(ids)  # one lock order for every caller
+    if not ids:
+        return 0
+    values = PLACEHOLDERS[table.name]
+    if is_partitioned(db, table.name):
+        values = {**values, PARTITION_KEY: PLACEHOLDER_CREATED}  # see app.db.partitioning
+    bind = db.get_bind()
+    with getattr(bind, "engine", bind).begin() as conn:
+        result = conn.execute(
+            pg_insert(table).values([{"id": i, **values} for i in ids]).on_conflict_do_nothing()
         )
-        db.add(ghost)
+    if result.rowcount:
+        print(f"👻 Created {result.rowcount} placeholder(s) in {table.name}")
+        metrics.count("placeholders", result.rowcount)
+    return result.rowcount
+
+def create_placeholders(db, table, ids) -> int:
+    """Placeholders for the unknown ids among `ids` (any table of PLACEHOLDERS): one anti-join, then one INSERT."""
+    return _insert_placeholders(db, table, missing_ids(db, table, {i for i in ids if i}))
+
+def ensure_references_exist(db, instances) -> int:
+    """Create placeholders for every unknown id referenced by a batch of ORM instances of one model."""
+    instances = list(instances)
+    if not instances:
+        return 0
+    return sum(
+        create_placeholders(db, table, (getattr(obj, column) for obj in instances))
+        for column, table in placeholder_references(type(instances[0]))
+    )
+
+# Promoted columns copied from the referenced row when the payload does not carry them
+# (reference not expanded): table → [(column, foreign key column, referenced column)]
+REFERENCED_COLUMNS = {
+    "prices": [("product_name", "product_id", Product.__table__.c.name)],
+    # Second half of the (id, created) foreign keys to partitioned tables (app.db.partitioning),
+    # left NULL while the target is a plain table: convert_to_partitioned fills them
+    "charges": [
+        ("invoice_created", "invoice_id", Invoice.__table__.c.created),
+        ("payment_intent_created", "payment_intent", PaymentIntent.__table__.c.created),
+    ],
+}
+
+def referenced_columns(db, table: str) -> list:
+    """REFERENCED_COLUMNS of `table`, the `created` halves of foreign keys only while their target is partitioned."""
+    return [
+        (column, key, source) for column, key, source in REFERENCED_COLUMNS.get(table, [])
+        if (table, key) not in REFERENCE_CREATED or is_partitioned(db, source.table.name)
+    ]
+
+def copy_referenced_columns(db, instances):
+    """Fill REFERENCED_COLUMNS of a batch of ORM instances of one model (session-cached lookups)."""
+    instances = list(instances)
+    if not instances:
+        return
+    for column, key, source in referenced_columns(db, type(instances[0]).__tablename__):
+        pending = [obj for obj in instances if getattr(obj, column) is None and getattr(obj, key)]
+        values = referenced_values(db, source, (getattr(obj, key) for obj in pending))
+        for obj in pending:
+            setattr(obj, column, values.get(getattr(obj, key)))
+
+def add_new_objects(db, model, objects, transform) -> int:
+    """
+    ORM path for one batch of Stripe objects (a page, or a chunk of a file): skip ids
+    already in the table, create placeholders for unknown references, add and flush
+    the rest. Returns the number of rows added.
+    """
+    objects = list(objects)
+    metrics.count("rows", len(objects))
+    if is_partitioned(db, model.__tablename__):
+        # Before reading the table: the lookup locks its default partition until commit
+        ensure_partitions(db, model.__tablename__, [utc_datetime(obj["created"]) for obj in objects if obj.get("created")])
+    new_ids = missing_ids(db, model, (obj["id"] for obj in objects))
+    with metrics.stage("transform"):
+        rows = [transform(obj) for obj in objects if obj["id"] in new_ids]
+    ensure_references_exist(db, rows)
+    copy_referenced_columns(db, rows)
+    with metrics.stage("write"):
+        db.add_all(rows)
+        db.flush()
+
+    metrics.count("inserted", len(rows))
+    metrics.count("skipped", len(objects) - len(rows))
+    if metrics.debug_enabled():
+        for obj in objects:
+            metrics.debug(f"➕ Added {model.__tablename__}: {obj['id']}" if obj["id"] in new_ids else f"✅ Skipped existing object: {obj['id']}")
+    return len(rows)
+
+def create_staged_placeholders(db, staging_table: str, table, column: str) -> int:
+    """Staging-table counterpart of create_placeholders: the anti-join runs against the staged rows."""
+    missing = db.execute(text(
+        f"SELECT DISTINCT s.{column} FROM {staging_table} s "
+        f"WHERE s.{column} IS NOT NULL "
+        f"AND NOT EXISTS (SELECT 1 FROM {table.name} t WHERE t.id = s.{column})"
+    )).scalars()
+    return _insert_placeholders(db, table, missing)
+
+def placeholders_before_merge(model):
+    """`before_merge` hook for bulk_insert/bulk_upsert creating placeholders for all references of `model`."""
+    def before_merge(db, staging_table: str) -> int:
+        return sum(
+            create_staged_placeholders(db, staging_table, table, column)
+            for column, table in placeholder_references(model)
+        )
+    return before_merge
+
+def copy_staged_referenced_columns(db, staging_table: str, model):
+    """Staging-table counterpart of copy_referenced_columns: one UPDATE ... FROM per column."""
+    for column, key, source in referenced_columns(db, model.__tablename__):
+        db.execute(text(
+            f"UPDATE {staging_table} s SET {column} = r.{source.name} FROM {source.table.name} r "
+            f"WHERE r.id = s.{key} AND s.{column} IS NULL"
+        ))
+
+def references_before_merge(model):
+    """placeholders_before_merge, then copy the REFERENCED_COLUMNS of `model` into the staged rows."""
+    create_placeholders = placeholders_before_merge(model)
+    def before_merge(db, staging_table: str) -> int:
+        created = create_placeholders(db, staging_table)
+        copy_staged_referenced_columns(db, staging_table, model)
+        return created
+    return before_merge
@@ -0,0 +1,134 @@
+# app/utils/sync_state.py
+from app.models.sync_state import SyncState
+from app.utils import metrics
+from app.utils.stripe_fetch import PAGE_SIZE, PageEnd
+
+class CreatedCursor:
+    """
+    High-water mark on Stripe's `created` field for one resource, persisted in sync_state.
+
+    The next run only asks Stripe for objects created at or after the cursor. `gte`
+    (rather than `gt`) re-reads the boundary second, so objects created in the same
+    second as the last run are not missed; they are dropped by the existence check
+    (or left unchanged by the content-hash check in upsert mode).
+
+    With `batch_size`, the session is committed and expunged every `batch_size` objects
+    (at the next page boundary) and the last committed page is recorded, so an
+    interrupted run resumes from there instead of from the first page.
+    """
+
+    def __init__(self, db, resource: str, full_resync: bool = False, batch_size: int = None):
+        self.db = db
+        self.resource = resource
+        self.batch_size = batch_size
+        self.pending = 0
+
+        state = db.get(SyncState, resource)
+        self.start = None if full_resync or state is None else state.last_created
+        self.max_created = state.last_created if state is not None else None
+
+        # Interrupted run: same `created` filter, continue after its last committed page
+        self.resume_after = None
+        if state is not None and state.resume_after and not full_resync:
+            self.resume_after = state.resume_after
+            if state.pending_created is not None:
+                self.max_created = max(self.max_created or 0, state.pending_created)
+            print(f"⏯️  Resuming {resource} after {self.resume_after}")
+
+    def list_params(self) -> dict:
+        """Extra params for stripe.<Resource>.list()."""
+        return {"created": {"gte": self.start}} if self.start is not None else {}
+
+    def resume_params(self) -> dict:
+        """`starting_after` of an interrupted run (serial paging only)."""
+        return {"starting_after": self.resume_after} if self.resume_after else {}
+
+    def observe(self, obj):
+        created = obj.get("created")
+        if created is not None and (self.max_created is None or created > self.max_created):
+            self.max_created = created
+
+    def _walk(self, listing):
+        """Objects newer than the cursor, with PageEnd markers passed through."""
+        objects = listing.auto_paging_iter() if hasattr(listing, "auto_paging_iter") else listing
+        for obj in objects:
+            if isinstance(obj, PageEnd):
+                yield obj
+                continue
+            if self.start is not None and obj.get("created", self.start) < self.start:
+                break
+            self.observe(obj)
+            self.pending += 1
+            yield obj
+
+    def _page_done(self, marker: PageEnd, before_commit=None):
+        if self.batch_size and self.pending >= self.batch_size:
+            if before_commit is not None:
+                before_commit()
+            self.checkpoint(marker.last_id)
+
+    def iter_new(self, listing, before_commit=None):
+        """
+        Iterate a list result (auto-paged) or any iterable of objects, recording `created`
+        of every object and checkpointing on PageEnd markers (see list_objects).
+        `before_commit()` runs before each checkpoint, e.g. to write buffered objects.
+
+        Stripe lists are sorted newest first, so paging stops at the first object older
+        than the cursor. This also covers endpoints without a `created` filter.
+        """
+        for obj in self._walk(listing):
+            if isinstance(obj, PageEnd):
+                # The consumer has processed the whole page when it asks for the next object
+                self._page_done(obj, before_commit)
+                continue
+            yield obj
+
+    def iter_pages(self, listing, max_size: int = PAGE_SIZE):
+        """
+        Same as iter_new() but yields lists of objects (one per page, at most `max_size`),
+        so the consumer can look up a whole page in one query. Checkpoints happen when
+        the next page is requested.
+        """
+        page = []
+        for obj in self._walk(listing):
+            if isinstance(obj, PageEnd):
+                if page:
+                    yield page
+                    page = []
+                self._page_done(obj)
+                continue
+            page.append(obj)
+            if len(page) >= max_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _state(self) -> SyncState:
+        state = self.db.get(SyncState, self.resource)
+        if state is None:
+            state = SyncState(resource=self.resource)
+            self.db.add(state)
+        return state
+
+    def checkpoint(self, last_id):
+        """Commit the current batch with its resume point, then empty the identity map."""
+        state = self._state()
+        state.resume_after = last_id
+        state.pending_created = self.max_created
+        with metrics.stage("commit"):
+            self.db.commit()
+        self.db.expunge_all()
+        print(f"💾 Checkpoint {self.resource}: {self.pending} object(s) committed" + (f" (resume after {last_id})" if last_id else ""))
+        self.pending = 0
+
+    def save(self):
+        """Store the new high-water mark and clear the resume point, in the caller's transaction."""
+        state = self.db.get(SyncState, self.resource)
+        if self.max_created is None and state is None:
+            return
+        state = state or self._state()
+        state.last_created = self.max_created
+        state.resume_after = None
+        state.pending_created = None
+        print(f"🔖 Sync cursor for {self.resource}: created >= {self.max_created}")
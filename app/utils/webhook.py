@@ -0,0 +1,176 @@
+# app/utils/webhook.py
+import hashlib
+import hmac
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import stripe
+from app.utils.stripe_events import apply_events
+
+WEBHOOK_PATH = "/webhook"
+SIGNATURE_TOLERANCE = 300  # seconds, same default as the Stripe libraries
+
+_STOP = object()
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: int = None) -> str:
+    """`Stripe-Signature` header for `payload`, as Stripe computes it (replays and tests)."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class WebhookReceiver:
+    """
+    Verifies Stripe webhook deliveries, queues them (bounded) and applies them in
+    micro-batches from one worker thread: up to `batch_size` events, or whatever
+    arrived within `max_wait` seconds of the first one, in one transaction.
+
+    A full queue answers 503 so Stripe retries later. An accepted event that fails
+    to apply is logged; redelivering it (or an Events API sync) is safe since
+    events are idempotent on their ID.
+    """
+
+    def __init__(self, session_factory, secret: str, queue_size: int = 1000, batch_size: int = 100,
+                 max_wait: float = 1.0, tolerance: int = SIGNATURE_TOLERANCE):
+        self.session_factory = session_factory
+        self.secret = secret
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.tolerance = tolerance
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counts = Counter()
+        self.server = None
+        self._worker = None
+
+    # ===== Receiving =====
+
+    def receive(self, payload: bytes, signature: str) -> int:
+        """Handle one delivery; returns the HTTP status to answer."""
+        try:
+            stripe.WebhookSignature.verify_header(payload.decode("utf-8"), signature, self.secret, self.tolerance)
+            event = json.loads(payload)
+            if not (isinstance(event, dict) and all(k in event for k in ("id", "type", "created"))
+                    and isinstance(event.get("data"), dict) and "object" in event["data"]):
+                raise ValueError("not a Stripe event")
+        except (stripe.SignatureVerificationError, UnicodeDecodeError, ValueError) as e:
+            print(f"🚫 Rejected webhook: {e}")
+            self.counts["rejected"] += 1
+            return 400
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            print(f"⏳ Queue full, Stripe will retry {event['id']}")
+            self.counts["throttled"] += 1
+            return 503
+        self.counts["received"] += 1
+        return 200
+
+    # ===== Applying =====
+
+    def _next_batch(self):
+        """Block for one event, then collect more for up to `max_wait` seconds. None once stopped."""
+        first = self.queue.get()
+        if first is _STOP:
+            self.queue.task_done()
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                event = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if event is _STOP:
+                # Apply what we have, stop on the next call
+                self.queue.task_done()
+                self.queue.put(_STOP)
+                break
+            batch.append(event)
+        return batch
+
+    def apply(self, batch) -> Counter:
+        """Apply a batch in one transaction; on failure, retry its events one by one to isolate the bad one."""
+        db = self.session_factory()
+        try:
+            counts = apply_events(db, batch)
+            db.commit()
+            self.counts.update(counts)
+            print(f"📬 Applied {counts['events']} event(s): "
+                  f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['deleted']} deleted, "
+                  f"{counts['duplicates']} duplicate(s)")
+            return counts
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                print(f"❌ Event {batch[0]['id']} ({batch[0]['type']}) failed: {e}")
+                self.counts["failed"] += 1
+                return Counter(failed=1)
+            print(f"⚠️  Batch of {len(batch)} events failed ({e}), applying them one by one")
+        finally:
+            db.close()
+        return sum((self.apply([event]) for event in batch), Counter())
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.apply(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    # ===== Lifecycle =====
+
+    def start(self, host: str = "127.0.0.1", port: int = 8787):
+        """Start the worker and the HTTP server (in background threads)."""
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != WEBHOOK_PATH:
+                    return self._answer(404, {"error": "not found"})
+                payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status = receiver.receive(payload, self.headers.get("Stripe-Signature"))
+                self._answer(status, {"received": status == 200})
+
+            def do_GET(self):
+                if self.path != "/health":
+                    return self._answer(404, {"error": "not found"})
+                self._answer(200, {"queued": receiver.queue.qsize(), **receiver.counts})
+
+            def _answer(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._worker = threading.Thread(target=self._run, name="webhook-worker", daemon=True)
+        self._worker.start()
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="webhook-http", daemon=True).start()
+        return self.server
+
+    def wait_idle(self):
+        """Block until every queued event has been applied."""
+        self.queue.join()
+
+    def stop(self):
+        """Stop accepting deliveries, apply what is queued, stop the worker."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self._worker is not None:
+            self.queue.put(_STOP)
+            self._worker.join()
@@ -0,0 +1,98 @@
+import argparse
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import String
+from app.db.session import SessionLocal
+from app.utils.env_loader import load_project_env
+from app.utils.stripe_helpers import REFERENCED_COLUMNS, referenced_columns
+
+ENV = load_project_env()
+
+# Promoted column → SQL recomputing it from the stored JSONB, same rules as the transformer specs
+JSON_COLUMNS = {
+    "charges": {
+        "card_brand": "payment_method_details #>> '{card,brand}'",
+        "card_funding": "payment_method_details #>> '{card,funding}'",
+    },
+    "prices": {
+        "interval": "recurring ->> 'interval'",
+    },
+    "subscriptions": {
+        "subscription_item_id": "items #>> '{data,0,id}'",
+        "plan_interval": "items #>> '{data,0,price,recurring,interval}'",
+    },
+    "invoices": {
+        # Latest non-zero timestamp of status_transitions (latest_status_transition)
+        "status_transitions_at": (
+            "CASE WHEN jsonb_typeof(status_transitions) = 'object' THEN "
+            "(SELECT to_timestamp(max(v::bigint)) FROM jsonb_each_text(status_transitions) AS st(k, v) "
+            "WHERE v IS NOT NULL AND v <> '0') END"
+        ),
+    },
+}
+
+TABLES = sorted(set(JSON_COLUMNS) | set(REFERENCED_COLUMNS))
+
+
+def _id_batch(db, table: str, after: str, batch_size: int) -> list:
+    return db.execute(
+        text(f"SELECT id FROM {table} WHERE id > :after ORDER BY id LIMIT :n"),
+        {"after": after, "n": batch_size},
+    ).scalars().all()
+
+
+def backfill_table(db, table: str, batch_size: int = 5000) -> int:
+    """
+    Recompute the promoted columns of `table` for existing rows, `batch_size` ids per
+    transaction (keyset on id). JSON-derived columns are only rewritten when they differ;
+    columns copied from a referenced row are only filled where still NULL, like at ingest.
+    Returns the number of row updates.
+    """
+    ids_param = bindparam("ids", type_=ARRAY(String))
+    statements = []
+    derived = JSON_COLUMNS.get(table, {})
+    if derived:
+        statements.append(text(
+            f"UPDATE {table} SET {', '.join(f'{c} = {e}' for c, e in derived.items())} "
+            f"WHERE id = ANY(:ids) AND ({' OR '.join(f'{c} IS DISTINCT FROM {e}' for c, e in derived.items())})"
+        ).bindparams(ids_param))
+    for column, key, source in referenced_columns(db, table):
+        statements.append(text(
+            f"UPDATE {table} t SET {column} = r.{source.name} FROM {source.table.name} r "
+            f"WHERE t.id = ANY(:ids) AND r.id = t.{key} AND t.{column} IS NULL AND r.{source.name} IS NOT NULL"
+        ).bindparams(ids_param))
+
+    updated, after = 0, ""
+    while ids := _id_batch(db, table, after, batch_size):
+        for statement in statements:
+            updated += db.execute(statement, {"ids": ids}).rowcount
+        db.commit()
+        after = ids[-1]
+    return updated
+
+
+def backfill(db, tables=TABLES, batch_size: int = 5000) -> dict:
+    """{table: row updates} for every table with promoted columns (or the given ones)."""
+    results = {}
+    for table in tables:
+        results[table] = backfill_table(db, table, batch_size)
+        print(f"🧮 {table}: {results[table]} row update(s)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the promoted analytic columns of rows ingested before they were populated.")
+    parser.add_argument("--table", choices=TABLES, action="append", help="Only this table (repeatable, default: all)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows updated per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        results = backfill(db, args.table or TABLES, args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ Backfill done: {sum(results.values())} row update(s)")
+
+
+if __name__ == "__main__":
+    main()
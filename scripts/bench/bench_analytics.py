@@ -0,0 +1,116 @@
+# scripts/bench/bench_analytics.py
+import argparse
+import time
+from sqlalchemy import text
+from app.db.bulk_loader import bulk_insert
+from app.models.charge import Charge
+from app.models.invoice import Invoice
+from app.models.price import Price
+from app.models.products import Product
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.price import stripe_price_to_model
+from app.transformers.products import stripe_product_to_model
+from app.utils.stripe_helpers import references_before_merge
+from scripts.bench.common import BenchSessionLocal, reset_schema, synthetic_objects
+
+PRODUCTS = 50
+BRANDS = ("visa", "mastercard", "amex", "discover")
+FUNDINGS = ("credit", "debit", "prepaid")
+INTERVALS = ("month", "year", "week")
+
+# Common analytics queries: (label, reading the JSONB payloads, reading the promoted columns)
+QUERIES = [
+    (
+        "revenue by card brand/funding",
+        "SELECT payment_method_details #>> '{card,brand}', payment_method_details #>> '{card,funding}', sum(amount) "
+        "FROM charges GROUP BY 1, 2",
+        "SELECT card_brand, card_funding, sum(amount) FROM charges GROUP BY 1, 2",
+    ),
+    (
+        "prices per product/interval",
+        "SELECT p.name, r.recurring ->> 'interval', count(*) FROM prices r JOIN products p ON p.id = r.product_id GROUP BY 1, 2",
+        "SELECT product_name, interval, count(*) FROM prices GROUP BY 1, 2",
+    ),
+    (
+        "invoices settled per month",
+        "SELECT date_trunc('month', (SELECT to_timestamp(max(v::bigint)) FROM jsonb_each_text(status_transitions) AS st(k, v) "
+        "WHERE v IS NOT NULL AND v <> '0')), count(*) FROM invoices GROUP BY 1",
+        "SELECT date_trunc('month', status_transitions_at), count(*) FROM invoices GROUP BY 1",
+    ),
+]
+
+
+def vary_charges(objects):
+    for i, obj in enumerate(objects):
+        # Synthetic charges must not reference payment intents / invoices that are not loaded
+        obj["payment_intent"] = None
+        obj["invoice"] = None
+        card = obj.setdefault("payment_method_details", {}).setdefault("card", {})
+        card["brand"] = BRANDS[i % len(BRANDS)]
+        card["funding"] = FUNDINGS[i % len(FUNDINGS)]
+    return objects
+
+
+def vary_prices(objects):
+    for i, obj in enumerate(objects):
+        obj["product"] = f"prod_bench_{i % PRODUCTS}"  # not expanded: product_name comes from products
+        obj["recurring"] = {**(obj.get("recurring") or {}), "interval": INTERVALS[i % len(INTERVALS)]}
+    return objects
+
+
+def load(rows: int):
+    products = synthetic_objects("products.json", PRODUCTS)
+    for i, obj in enumerate(products):
+        obj["id"] = f"prod_bench_{i}"
+    loads = [
+        (Product, stripe_product_to_model, products),
+        (Price, stripe_price_to_model, vary_prices(synthetic_objects("prices.json", rows))),
+        (Charge, stripe_charge_to_model, vary_charges(synthetic_objects("charges.json", rows))),
+        (Invoice, stripe_invoice_to_model, synthetic_objects("invoices.json", rows)),
+    ]
+    db = BenchSessionLocal()
+    try:
+        for model, transform, objects in loads:
+            bulk_insert(db, model, objects, transform, before_merge=references_before_merge(model))
+        db.commit()
+        db.execute(text("ANALYZE"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def best_ms(db, sql: str, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = sorted(db.execute(text(sql)).all(), key=repr)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics queries on JSONB payloads vs promoted columns (test DB).")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query, best time kept")
+    args = parser.parse_args()
+
+    print(f"🏁 Analytics benchmark: {args.rows} rows per table, best of {args.repeat}\n")
+    reset_schema()
+    load(args.rows)
+
+    db = BenchSessionLocal()
+    try:
+        for label, json_sql, promoted_sql in QUERIES:
+            json_ms, json_rows = best_ms(db, json_sql, args.repeat)
+            promoted_ms, promoted_rows = best_ms(db, promoted_sql, args.repeat)
+            assert json_rows == promoted_rows, label
+            print(f"⏱️  {label:<30} JSONB {json_ms:8.1f} ms · promoted {promoted_ms:8.1f} ms → x{json_ms / promoted_ms:.1f}")
+    finally:
+        db.close()
+    reset_schema()
+
+
+if __name__ == "__main__":
+    main()
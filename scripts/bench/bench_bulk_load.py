@@ -0,0 +1,74 @@
+# scripts/bench/bench_bulk_load.py
+import argparse
+from app.db.bulk_loader import bulk_insert
+from itertools import batched
+from app.db.lookup import LOOKUP_BATCH_SIZE
+from app.models.customer import Customer
+from app.models.charge import Charge
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.charge import stripe_charge_to_model
+from app.utils.stripe_helpers import add_new_objects
+from scripts.bench.common import BenchSessionLocal, reset_schema, synthetic_objects, timed
+
+
+def detach_charge(obj):
+    # Synthetic charges must not reference payment intents / invoices that are not loaded
+    obj["payment_intent"] = None
+    obj["invoice"] = None
+
+
+CASES = [
+    ("customers", Customer, stripe_customer_to_model, "customers.json", None),
+    ("charges", Charge, stripe_charge_to_model, "charges.json", detach_charge),
+]
+
+
+def orm_load(model, transform, objects):
+    """Same loop as ingest_from_file, without per-object printing."""
+    db = BenchSessionLocal()
+    try:
+        count = 0
+        for batch in batched(objects, LOOKUP_BATCH_SIZE):
+            count += add_new_objects(db, model, batch, transform)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def copy_load(model, transform, objects, columnar=False):
+    db = BenchSessionLocal()
+    try:
+        count = bulk_insert(db, model, objects, transform, columnar=columnar)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM vs COPY (per-object or columnar transforms) ingestion throughput (test DB).")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"🏁 Bulk load benchmark: {args.rows} rows per table\n")
+    for label, model, transform, filename, mutate in CASES:
+        objects = synthetic_objects(filename, args.rows, mutate)
+
+        reset_schema()
+        orm_count, orm_time = timed(f"{label} / ORM", args.rows, lambda: orm_load(model, transform, objects))
+
+        reset_schema()
+        copy_count, copy_time = timed(f"{label} / COPY", args.rows, lambda: copy_load(model, transform, objects))
+
+        reset_schema()
+        columnar_count, columnar_time = timed(f"{label} / COPY + columnar", args.rows, lambda: copy_load(model, transform, objects, columnar=True))
+
+        assert orm_count == copy_count == columnar_count == args.rows, (orm_count, copy_count, columnar_count)
+        print(f"🚀 {label}: COPY is x{orm_time / copy_time:.1f} faster, x{orm_time / columnar_time:.1f} with columnar transforms\n")
+
+    reset_schema()
+
+
+if __name__ == "__main__":
+    main()
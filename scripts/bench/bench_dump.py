@@ -0,0 +1,75 @@
+# scripts/bench/bench_dump.py
+import argparse
+import json
+import os
+import tempfile
+from app.db.parallel_copy import dump_tables, restore_tables
+from app.transformers.spec import compile_serializer
+from scripts.bench.bench_queries import load
+from scripts.bench.common import BenchSessionLocal, engine, reset_schema, timed
+from scripts.dump_all_tables import MODELS, dump_to_ndjson
+from scripts.restore_dump import TABLES, upsert_rows
+from app.utils.ndjson import iter_ndjson
+
+NAMES = [m.__tablename__ for m in MODELS]
+
+
+def orm_dump(path: str):
+    """The former dump_to_json: every row through the ORM, one dict in memory, one JSON file."""
+    db = BenchSessionLocal()
+    try:
+        data = {m.__tablename__: [compile_serializer(m)(r) for r in db.query(m).all()] for m in MODELS}
+    finally:
+        db.close()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def ndjson_dump(out_dir: str) -> str:
+    db = BenchSessionLocal()
+    try:
+        return dump_to_ndjson(db, out_dir, "gzip")
+    finally:
+        db.close()
+
+
+def insert_restore(dump_dir: str):
+    """Row inserts from the NDJSON dump (scripts/restore_dump.py path), in foreign key order."""
+    db = BenchSessionLocal()
+    try:
+        for table in TABLES:
+            upsert_rows(db, table, iter_ndjson(os.path.join(dump_dir, f"{table.name}.ndjson.gz")))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full dump / restore paths: ORM, NDJSON stream, parallel COPY (test DB).")
+    parser.add_argument("--rows", type=int, default=50000, help="Invoices (charges: 2x, subscriptions: /2)")
+    parser.add_argument("--jobs", type=int, default=4)
+    args = parser.parse_args()
+
+    reset_schema()
+    load(args.rows)
+    total = args.rows * 3 + args.rows // 2 + 2000
+    print(f"🏁 Dump / restore benchmark: ~{total} rows over {len(NAMES)} tables\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timed("dump / ORM + json.dump", total, lambda: orm_dump(os.path.join(tmp, "legacy.json")))
+        ndjson_dir, _ = timed("dump / NDJSON stream (gzip)", total, lambda: ndjson_dump(tmp))
+        timed("dump / COPY, 1 job (gzip)", total, lambda: dump_tables(engine, os.path.join(tmp, "copy1"), NAMES, jobs=1))
+        timed(f"dump / COPY, {args.jobs} jobs (gzip)", total,
+              lambda: dump_tables(engine, os.path.join(tmp, "copy"), NAMES, jobs=args.jobs))
+
+        print()
+        reset_schema()
+        timed("restore / INSERT batches", total, lambda: insert_restore(ndjson_dir))
+        timed("restore / COPY, 1 job", total, lambda: restore_tables(engine, os.path.join(tmp, "copy"), jobs=1, truncate=True))
+        timed(f"restore / COPY, {args.jobs} jobs", total,
+              lambda: restore_tables(engine, os.path.join(tmp, "copy"), jobs=args.jobs, truncate=True))
+    reset_schema()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# scripts/bench/bench_json_codec.py
+import argparse
+import json
+import time
+from app.db.json_codec import CODECS
+from scripts.bench.common import synthetic_objects
+
+# Hottest JSONB columns per export, and whether the old transformer json.dumps()'d them first
+CASES = [
+    ("charges", "charges.json", ("billing_details", "outcome", "fraud_details", "payment_method_details", "metadata"), True),
+    ("invoices", "invoices.json", ("lines", "status_transitions", "automatic_tax", "metadata"), False),
+    ("subscriptions", "subscriptions.json", ("items", "invoice_settings", "payment_settings", "metadata"), False),
+]
+
+
+def per_row_us(rows: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / rows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONB encode cost per row: previous encoding vs the engine codecs.")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"🏁 JSON encode benchmark: {args.rows} rows per table, codecs: {', '.join(CODECS)}\n")
+    for label, filename, keys, text_first in CASES:
+        values = [[obj.get(key) for key in keys] for obj in synthetic_objects(filename, args.rows)]
+
+        def before():
+            # Transformer json.dumps() (charges), then SQLAlchemy's default json.dumps() on the result
+            for row in values:
+                for value in row:
+                    json.dumps(json.dumps(value) if text_first and isinstance(value, (dict, list)) else value)
+
+        results = {"before": per_row_us(args.rows, before)}
+        for name, (dumps, _) in CODECS.items():
+            results[name] = per_row_us(args.rows, lambda: [dumps(value) for row in values for value in row])
+
+        timings = " · ".join(f"{name} {us:.1f} µs/row" for name, us in results.items())
+        best = min(results, key=results.get)
+        print(f"⏱️  {label:<14} {timings} → {best} x{results['before'] / results[best]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# scripts/bench/bench_queries.py
+import argparse
+import time
+from sqlalchemy import text
+from app.db.base import Base
+from app.db.bulk_loader import bulk_insert
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.subscription import Subscription
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.spec import utc_datetime
+from app.transformers.subscription import stripe_subscription_to_model
+from app.utils.stripe_helpers import references_before_merge
+from scripts.bench.common import BenchSessionLocal, engine, reset_schema, synthetic_objects
+
+START = 1700000000
+SPACING = 60  # seconds between two synthetic objects: one day ≈ 1440 rows per table
+CUSTOMERS = 2000
+PRICES = 20
+
+# Typical join and range workloads: (label, SQL, parameters)
+QUERIES = [
+    ("invoices of a customer", "SELECT id, total FROM invoices WHERE customer_id = :customer", {"customer": "cus_bench_42"}),
+    ("customers ⋈ invoices (10 ids)",
+     "SELECT c.id, sum(i.amount_paid) FROM customers c JOIN invoices i ON i.customer_id = c.id WHERE c.id = ANY(:ids) GROUP BY c.id",
+     {"ids": [f"cus_bench_{i}" for i in range(0, CUSTOMERS, CUSTOMERS // 10)]}),
+    ("subscriptions of a customer", "SELECT id, status FROM subscriptions WHERE customer_id = :customer", {"customer": "cus_bench_42"}),
+    ("subscriptions of a price", "SELECT count(*) FROM subscriptions WHERE price_id = :price", {"price": "price_bench_3"}),
+    ("charges of an invoice", "SELECT id, amount FROM charges WHERE invoice_id = :invoice", {"invoice": "in_bench_42"}),
+    ("invoices ⋈ charges (one day)",
+     "SELECT i.id, sum(ch.amount) FROM invoices i JOIN charges ch ON ch.invoice_id = i.id "
+     "WHERE i.created >= :start AND i.created < :end GROUP BY i.id",
+     {"start": utc_datetime(START + 86400), "end": utc_datetime(START + 2 * 86400)}),
+    ("charges created in one hour", "SELECT count(*), sum(amount) FROM charges WHERE created >= :start AND created < :end",
+     {"start": utc_datetime(START + 3600), "end": utc_datetime(START + 7200)}),
+]
+
+
+def secondary_indexes():
+    """(table, index name) of the indexes declared on models, primary key ones excepted."""
+    return [
+        (table.name, index.name)
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if not all(c.primary_key for c in index.columns)
+    ]
+
+
+def spread(objects, prefix: str, mutate=None):
+    for i, obj in enumerate(objects):
+        obj["id"] = f"{prefix}_{i}"
+        obj["created"] = START + i * SPACING
+        if mutate:
+            mutate(i, obj)
+    return objects
+
+
+def load(rows: int):
+    def invoice(i, obj):
+        obj["customer"] = f"cus_bench_{i % CUSTOMERS}"
+        obj["subscription"] = None
+
+    def charge(i, obj):
+        obj["invoice"] = f"in_bench_{i // 2}"  # two charges per invoice
+        obj["payment_intent"] = None
+
+    def subscription(i, obj):
+        obj["customer"] = f"cus_bench_{i % CUSTOMERS}"
+        obj["items"]["data"][0]["price"]["id"] = f"price_bench_{i % PRICES}"
+
+    loads = [
+        (Customer, stripe_customer_to_model, spread(synthetic_objects("customers.json", CUSTOMERS), "cus_bench")),
+        (Subscription, stripe_subscription_to_model, spread(synthetic_objects("subscriptions.json", rows // 2), "sub_bench", subscription)),
+        (Invoice, stripe_invoice_to_model, spread(synthetic_objects("invoices.json", rows), "in_bench", invoice)),
+        (Charge, stripe_charge_to_model, spread(synthetic_objects("charges.json", rows * 2), "ch_bench", charge)),
+    ]
+    db = BenchSessionLocal()
+    try:
+        for model, transform, objects in loads:
+            bulk_insert(db, model, objects, transform, before_merge=references_before_merge(model))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_queries(repeat: int) -> dict:
+    """{label: (best time in ms, plan uses an index)}."""
+    results = {}
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for label, sql, params in QUERIES:
+            plan = conn.execute(text(f"EXPLAIN {sql}"), params).scalars().all()
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(text(sql), params).all()
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = (best, any("Index" in line for line in plan))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join and created-range queries with vs without the foreign key / created indexes (test DB).")
+    parser.add_argument("--rows", type=int, default=50000, help="Invoices (charges: 2x, subscriptions: /2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query, best time kept")
+    args = parser.parse_args()
+
+    print(f"🏁 Query benchmark: {args.rows} invoices, {args.rows * 2} charges, best of {args.repeat}\n")
+    reset_schema()
+    load(args.rows)
+
+    indexed = run_queries(args.repeat)
+    with engine.begin() as conn:
+        for _, name in secondary_indexes():
+            conn.execute(text(f"DROP INDEX {name}"))
+    scanned = run_queries(args.repeat)
+
+    for label, _, _ in QUERIES:
+        (with_ms, uses_index), (without_ms, _) = indexed[label], scanned[label]
+        plan = "index" if uses_index else "seq scan"
+        print(f"⏱️  {label:<32} no index {without_ms:8.2f} ms · indexed {with_ms:8.2f} ms ({plan}) → x{without_ms / with_ms:.1f}")
+    reset_schema()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# scripts/bench/bench_transform.py
+import argparse
+from app.db.bulk_loader import _column_values
+from app.transformers.charge import CHARGE
+from app.transformers.columnar import transform_rows
+from app.transformers.customer import CUSTOMER
+from app.transformers.invoice import INVOICE
+from scripts.bench.common import synthetic_objects, timed
+
+CASES = [
+    ("customers", CUSTOMER, "customers.json"),
+    ("invoices", INVOICE, "invoices.json"),
+    ("charges", CHARGE, "charges.json"),
+]
+
+
+def orm_rows(converters, objects):
+    """What the bulk loader did before the specs: one ORM instance per object, read back as a row."""
+    columns = list(converters.model.__table__.columns)
+    no_processing = {c.key: None for c in columns}
+    return [_column_values(converters.to_model(obj), columns, no_processing) for obj in objects]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Stripe → row conversion: ORM instances, compiled rows, columnar.")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"🏁 Transform benchmark: {args.rows} objects per resource\n")
+    for label, converters, filename in CASES:
+        objects = synthetic_objects(filename, args.rows)
+        _, orm_time = timed(f"{label} / ORM instances", args.rows, lambda: orm_rows(converters, objects))
+        _, row_time = timed(f"{label} / compiled rows", args.rows, lambda: [converters.to_row(obj) for obj in objects])
+        _, columnar_time = timed(f"{label} / columnar", args.rows, lambda: transform_rows(converters.model, objects))
+        print(f"🚀 {label}: compiled rows x{orm_time / row_time:.1f}, columnar x{orm_time / columnar_time:.1f} vs ORM instances\n")
+
+
+if __name__ == "__main__":
+    main()
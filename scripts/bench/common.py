@@ -0,0 +1,51 @@
+# scripts/bench/common.py
+import copy
+import json
+import os
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.db.json_codec import engine_options
+from app.utils.env_loader import load_project_env
+from app.utils.db_url import get_database_url
+import app.models  # loads models
+
+JSON_DIR = "data/imported_stripe_data"
+
+# Benchmarks drop and recreate tables: always run them against the test database
+ENV = load_project_env()
+POSTGRES_TEST_DB = os.getenv("POSTGRES_TEST_DB", "stripe_db_test")
+POSTGRES_TEST_PORT = os.getenv("POSTGRES_TEST_PORT", "5435")
+
+engine = create_engine(get_database_url(db_override=POSTGRES_TEST_DB, port_override=POSTGRES_TEST_PORT), **engine_options())
+BenchSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def reset_schema():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def synthetic_objects(filename: str, n: int, mutate=None) -> list:
+    """Clone the first record of a Stripe export `n` times with unique IDs."""
+    with open(os.path.join(JSON_DIR, filename), "r") as f:
+        template = json.load(f)["data"][0]
+
+    objects = []
+    for i in range(n):
+        obj = copy.deepcopy(template)
+        obj["id"] = f"{template['id']}_{i:08d}"
+        obj["created"] = template["created"] + i
+        if mutate:
+            mutate(obj)
+        objects.append(obj)
+    return objects
+
+
+def timed(label: str, rows: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {label:<28} {rows:>8} rows in {elapsed:7.2f}s → {rows / elapsed:>10.0f} rows/s")
+    return result, elapsed
@@ -1,8 +1,8 @@
 import os
-import json
 from sqlalchemy import create_engine, text
 from app.utils.env_loader import load_project_env
 from app.utils.db_url import get_database_url
+from app.utils.json_stream import count_stripe_objects
 
 # Load correct .env (DEV or PROD)
 ENV = load_project_env()
@@ -23,15 +23,7 @@ TABLE_JSON_MAPPING = {
 JSON_DIR = "data/imported_stripe_data"
 
 def get_json_object_count(filepath: str) -> int:
-    with open(filepath, "r") as f:
-        data = json.load(f)
-        if isinstance(data, list):
-            return len(data)
-        elif isinstance(data, dict):
-            if "data" in data and isinstance(data["data"], list):
-                return len(data["data"])
-            return 1 if "id" in data else 0
-        return 0
+    return count_stripe_objects(filepath)
 
 def get_db_table_count(conn, table: str) -> int:
     result = conn.execute(text(f"SELECT COUNT(*) FROM {table}"))
@@ -0,0 +1,52 @@
+import argparse
+import os
+import time
+from datetime import datetime
+from sqlalchemy import create_engine
+from app.db.json_codec import engine_options
+from app.db.parallel_copy import JOBS, dump_tables, restore_tables
+from app.utils.db_url import get_database_url
+from app.utils.env_loader import load_project_env
+from app.utils.ndjson import available_compressions
+from scripts.dump_all_tables import DUMP_DIR, MODELS
+
+ENV = load_project_env()
+TABLES = [model.__tablename__ for model in MODELS]
+
+def target_engine(target: str, jobs: int):
+    """`dev`: the database of the loaded .env; `test`: POSTGRES_TEST_DB/PORT, like tests/conftest.py."""
+    if target == "test":
+        url = get_database_url(db_override=os.getenv("POSTGRES_TEST_DB", "stripe_db_test"),
+                               port_override=os.getenv("POSTGRES_TEST_PORT", "5435"))
+    else:
+        url = get_database_url()
+    # One connection per job, plus the snapshot holder
+    return create_engine(url, pool_size=jobs + 1, **engine_options())
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel COPY dump / restore of every table (clone an environment).")
+    parser.add_argument("command", choices=["dump", "restore"])
+    parser.add_argument("--dir", help="restore: dump directory (with manifest.json); dump: parent directory")
+    parser.add_argument("--target", choices=["dev", "test"], default="dev", help="Database to dump from / restore into")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="Tables copied at the same time")
+    parser.add_argument("--compression", choices=available_compressions(), default="gzip", help="dump: on-the-fly compression")
+    parser.add_argument("--truncate", action="store_true", help="restore: empty the tables first (TRUNCATE ... CASCADE)")
+    args = parser.parse_args()
+
+    engine = target_engine(args.target, args.jobs)
+    started = time.perf_counter()
+    if args.command == "dump":
+        dump_dir = os.path.join(args.dir or DUMP_DIR, f"copy_{ENV.lower()}_{datetime.now():%Y-%m-%d_%H-%M-%S}")
+        tables = dump_tables(engine, dump_dir, TABLES, args.compression, args.jobs)["tables"]
+        for table, entry in tables.items():
+            print(f"💾 {table}: {entry['rows']} row(s), {entry['bytes'] / 1e6:.1f} MB in {entry['seconds']:.2f}s")
+        print(f"✅ Dump saved to: {dump_dir} ({time.perf_counter() - started:.1f}s)")
+    else:
+        if not args.dir:
+            parser.error("restore needs --dir")
+        for table, entry in restore_tables(engine, args.dir, args.jobs, args.truncate).items():
+            print(f"♻️  {table}: {entry['rows']} row(s) in {entry['seconds']:.2f}s")
+        print(f"✅ Restored {args.dir} into the {args.target} database ({time.perf_counter() - started:.1f}s)")
+
+if __name__ == "__main__":
+    main()
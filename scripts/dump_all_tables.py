@@ -1,11 +1,14 @@
-import os
+import argparse
 import json
+import os
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import Text, cast, create_engine, select
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
 from app.db.base import Base
+from app.db.change_tracking import TRACKED_TABLES, changed_since, current_snapshot, deleted_since, is_tracked
+from app.db.json_codec import engine_options
 from app.models import (
     customer,
     invoice,
@@ -17,6 +20,8 @@ from app.models import (
     subscription
 )
 
+from app.utils.ndjson import EXTENSIONS, available_compressions, write_ndjson
+from app.utils.parquet import ROW_GROUP_SIZE, MonthlyParquetWriter, arrow_schema
 from app.utils.env_loader import load_project_env
 from app.utils.db_url import get_database_url
 
@@ -26,8 +31,9 @@ ENV = os.getenv("ENV", "DEV").upper()
 
 # ============ DATABASE SETUP ============
 db_url = get_database_url()
-engine = create_engine(db_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(db_url, **engine_options())
+# One snapshot for every table, even while ingestion keeps writing
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine.execution_options(isolation_level="REPEATABLE READ"))
 
 # ============ MODELS ============
 MODELS = [
@@ -41,37 +47,180 @@ MODELS = [
     subscription.Subscription
 ]
 
-# ============ SERIALIZATION ============
-def serialize(model_obj):
-    return {
-        c.name: getattr(model_obj, c.name)
-        for c in model_obj.__table__.columns
-    }
+DUMP_DIR = os.path.join("data", "db_dump")
+INCREMENTAL_DIR = os.path.join(DUMP_DIR, "incremental")
+MANIFEST = "manifest.json"
+BATCH_SIZE = 1000
 
-# ============ DUMP FUNCTION ============
-def dump_to_json():
-    session = SessionLocal()
-    dump_data = {}
-    try:
-        for model in MODELS:
-            table_name = model.__tablename__
-            records = session.query(model).all()
-            dump_data[table_name] = [serialize(r) for r in records]
-    finally:
-        session.close()
+# ============ DUMP FUNCTIONS ============
+def iter_rows(session, model, batch_size: int = BATCH_SIZE, order_by=(), json_as_text: bool = False, where=None):
+    """
+    Yield the rows of `model`'s table as {column name: value}, ordered by `order_by` then
+    the primary key, through a server-side cursor: only `batch_size` rows are held in
+    memory at a time. With `json_as_text`, JSONB columns come back as Postgres' JSON text.
+    """
+    table = model.__table__
+    columns = [cast(c, Text).label(c.name) if json_as_text and isinstance(c.type, JSONB) else c for c in table.columns]
+    stmt = select(*columns).order_by(*order_by, *table.primary_key.columns).execution_options(yield_per=batch_size)
+    if where is not None:
+        stmt = stmt.where(where)
+    for row in session.execute(stmt).mappings():
+        yield dict(row)
 
-    dump_dir = os.path.join("data", "db_dump")
-    os.makedirs(dump_dir, exist_ok=True)
+def dump_table(session, model, dump_dir: str, compression: str = "none", batch_size: int = BATCH_SIZE) -> int:
+    """Write one table to <dump_dir>/<table>.ndjson[.gz|.zst], streaming. Returns the row count."""
+    path = os.path.join(dump_dir, model.__tablename__ + EXTENSIONS[compression])
+    count = write_ndjson(path, iter_rows(session, model, batch_size), compression)
+    print(f"💾 {model.__tablename__}: {count} row(s) → {path}")
+    return count
 
+def new_dump_dir(out_dir: str) -> str:
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = os.path.join(dump_dir, f"db_dump_{ENV.lower()}_{timestamp}.json")
+    dump_dir = os.path.join(out_dir, f"db_dump_{ENV.lower()}_{timestamp}")
+    os.makedirs(dump_dir, exist_ok=True)
+    return dump_dir
+
+def dump_to_ndjson(session, out_dir: str = DUMP_DIR, compression: str = "none", batch_size: int = BATCH_SIZE) -> str:
+    """Dump every table as one NDJSON file each into a new timestamped directory. Returns its path."""
+    dump_dir = new_dump_dir(out_dir)
+    for model in MODELS:
+        dump_table(session, model, dump_dir, compression, batch_size)
+    return dump_dir
+
+def export_table_parquet(session, model, dump_dir: str, compression: str = "snappy", batch_size: int = BATCH_SIZE,
+                         row_group_size: int = ROW_GROUP_SIZE) -> dict:
+    """
+    Write one table as typed Parquet, one file per `created` month under <dump_dir>/<table>/.
+    Rows are read in `created` order so only one file is open at a time.
+    Returns the table's manifest entry: {"rows": n, "files": [...]}.
+    """
+    table = model.__table__
+    writer = MonthlyParquetWriter(os.path.join(dump_dir, table.name), arrow_schema(table), "created",
+                                  row_group_size, compression)
+    for row in iter_rows(session, model, batch_size, order_by=[table.c.created], json_as_text=True):
+        writer.write(row)
+    files = [{**f, "path": f"{table.name}/{f['path']}"} for f in writer.close()]
+    rows = sum(f["rows"] for f in files)
+    print(f"🧱 {table.name}: {rows} row(s) in {len(files)} Parquet file(s)")
+    return {"rows": rows, "files": files}
+
+def export_to_parquet(session, out_dir: str = DUMP_DIR, compression: str = "snappy", batch_size: int = BATCH_SIZE,
+                      row_group_size: int = ROW_GROUP_SIZE) -> str:
+    """Export every table as Parquet partitioned by `created` month, plus manifest.json. Returns the directory."""
+    dump_dir = new_dump_dir(out_dir)
+    manifest = {
+        "format": "parquet",
+        "env": ENV.lower(),
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "partitioned_by": "created_month",
+        "json_columns": {m.__tablename__: [c.name for c in m.__table__.columns if isinstance(c.type, JSONB)] for m in MODELS},
+        "tables": {},
+    }
+    for model in MODELS:
+        manifest["tables"][model.__tablename__] = export_table_parquet(session, model, dump_dir, compression, batch_size, row_group_size)
+    with open(os.path.join(dump_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return dump_dir
+
+def read_manifest(chain_dir: str) -> dict:
+    path = os.path.join(chain_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"chain": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_manifest(chain_dir: str, manifest: dict):
+    """Replace the manifest atomically: an interrupted dump leaves the previous chain intact."""
+    path = os.path.join(chain_dir, MANIFEST)
+    with open(f"{path}.part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.part", path)
+
+def dump_incremental(session, chain_dir: str = INCREMENTAL_DIR, compression: str = "gzip", batch_size: int = BATCH_SIZE,
+                     full: bool = False) -> dict:
+    """
+    Append one link to the dump chain in `chain_dir`: a full dump when the chain is empty
+    (or `full`), otherwise a delta with the rows written and the ids hard-deleted since the
+    previous link's snapshot (app.db.change_tracking). Tables without changes get no file.
+    The manifest lists every link in order with its snapshot (the watermark of the next
+    delta) and per-table counts; scripts/restore_dump.py replays it. Returns the new link.
+    """
+    untracked = [t for t in TRACKED_TABLES if not is_tracked(session, t)]
+    if untracked:
+        raise RuntimeError(f"❌ Change tracking is not enabled on {', '.join(untracked)} (run `alembic upgrade head`)")
+    snapshot = current_snapshot(session)
+
+    manifest = read_manifest(chain_dir)
+    since = None if full or not manifest["chain"] else manifest["chain"][-1]["snapshot"]
+    kind = "full" if since is None else "delta"
+    seq = len(manifest["chain"])
+    link = {
+        "seq": seq,
+        "kind": kind,
+        "dir": f"{seq:05d}_{kind}_{datetime.now():%Y-%m-%d_%H-%M-%S}",
+        "dumped_at": datetime.now().isoformat(timespec="seconds"),
+        "since": since,
+        "snapshot": snapshot,
+        "compression": compression,
+        "tables": {},
+    }
+    link_dir = os.path.join(chain_dir, link["dir"])
+    os.makedirs(link_dir, exist_ok=True)
 
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(dump_data, f, indent=2, default=str)
+    extension = EXTENSIONS[compression]
+    for model in MODELS:
+        table = model.__tablename__
+        where = changed_since(table, since) if since else None
+        entry = {"rows": write_ndjson(os.path.join(link_dir, table + extension),
+                                      iter_rows(session, model, batch_size, where=where), compression)}
+        entry["file"] = table + extension
+        if since:
+            entry["deleted"] = write_ndjson(os.path.join(link_dir, f"{table}.deleted{extension}"),
+                                            ({"id": i} for i in deleted_since(session, table, since)), compression)
+            entry["deleted_file"] = f"{table}.deleted{extension}"
+            # An unchanged table leaves nothing behind in a delta
+            for key, count in (("file", entry["rows"]), ("deleted_file", entry["deleted"])):
+                if not count:
+                    os.remove(os.path.join(link_dir, entry.pop(key)))
+        link["tables"][table] = entry
+        print(f"💾 {table}: {entry['rows']} row(s)" + (f", {entry['deleted']} deletion(s)" if since else ""))
 
-    print(f"✅ Dump saved to: {filename}")
+    manifest["chain"].append(link)
+    write_manifest(chain_dir, manifest)
+    return link
 
 # ============ ENTRYPOINT ============
+def main():
+    parser = argparse.ArgumentParser(description="Stream every table to NDJSON files, or to Parquet by `created` month (constant memory).")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson", help="Output format")
+    parser.add_argument("--out-dir", default=DUMP_DIR, help="Parent directory of the timestamped dump")
+    parser.add_argument("--compression", choices=[*available_compressions(), "snappy"],
+                        help="On-the-fly compression (NDJSON default: none, Parquet default: snappy)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows fetched per server-side cursor round trip")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE, help="Parquet: rows buffered per row group")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"NDJSON: add a delta of the changes since the last dump to the chain in {INCREMENTAL_DIR}")
+    parser.add_argument("--full", action="store_true", help="With --incremental: start the chain again with a full dump")
+    args = parser.parse_args()
+    if args.format == "ndjson" and args.compression == "snappy":
+        parser.error("snappy is only available for --format parquet")
+    if args.incremental and args.format != "ndjson":
+        parser.error("--incremental is only available for --format ndjson")
+
+    print(f"🚀 Running database dump in ENV={ENV} ({args.format})")
+    session = SessionLocal()
+    try:
+        if args.incremental:
+            chain_dir = INCREMENTAL_DIR if args.out_dir == DUMP_DIR else args.out_dir
+            link = dump_incremental(session, chain_dir, args.compression or "gzip", args.batch_size, args.full)
+            dump_dir = os.path.join(chain_dir, link["dir"])
+        elif args.format == "parquet":
+            dump_dir = export_to_parquet(session, args.out_dir, args.compression or "snappy", args.batch_size, args.row_group_size)
+        else:
+            dump_dir = dump_to_ndjson(session, args.out_dir, args.compression or "none", args.batch_size)
+    finally:
+        session.close()
+    print(f"✅ Dump saved to: {dump_dir}")
+
 if __name__ == "__main__":
-    print(f"🚀 Running database dump in ENV={ENV}")
-    dump_to_json()
+    main()
@@ -1,21 +1,40 @@
 # scripts/ingest/ingest_all.py
 
 import argparse
+import importlib
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.db.session import SessionLocal
+from app.utils import metrics
 
-# Tables to ingest in dependency-safe order
+# Tables to ingest in dependency-safe order (used as tie-break when scheduling)
 TABLES = [
     "customer",
     "payment_method",      # referenced by payment_intents
     "products",
     "price",
     "subscription",        # depends on customers + prices
-    "invoice",             # depends on subscriptions
+    "invoice",             # depends on customers
     "payment_intent",      # depends on customers + payment_methods
     "charge"               # depends on payment_intents/invoices
 ]
 
+# Parents that must be fully ingested before a table can start (foreign keys)
+TABLE_DEPENDENCIES = {
+    "customer": [],
+    "products": [],
+    "payment_method": ["customer"],            # payment_methods.customer_id
+    "price": ["products"],                     # prices.product_id
+    "subscription": ["customer", "price"],     # subscriptions.customer_id / price_id
+    "invoice": ["customer"],                   # invoices.customer_id
+    # Placeholder rows are inserted with ON CONFLICT DO NOTHING, so tables creating
+    # the same placeholder customers can run concurrently
+    "payment_intent": ["customer", "payment_method"],  # payment_intents.customer_id / payment_method
+    "charge": ["invoice", "payment_intent"],   # charges.invoice_id / payment_intent
+}
+
 # Explicit map from table name to JSON filename
 TABLE_FILE_MAP = {
     "customer": "customers.json",
@@ -28,36 +47,131 @@ TABLE_FILE_MAP = {
     "charge": "charges.json"
 }
 
-def run_ingestion(table, source, json_dir=None):
-    script_path = f"scripts/ingest/ingest_{table}.py"
-    if not os.path.exists(script_path):
-        print(f"❌ Script not found: {script_path}")
-        return
+def load_ingest_modules(tables):
+    """Import every ingest_<table> module once, before touching the database."""
+    return {table: importlib.import_module(f"scripts.ingest.ingest_{table}") for table in tables}
 
-    cmd = f"python {script_path} --source {source}"
+def run_ingestion(module, table, source, json_dir=None, **options):
+    """
+    Ingest one table in its own transaction. Returns the row count, or None if skipped.
+    `options` are passed through to ingest_from_api / ingest_from_file.
+    """
+    file_path = None
     if source == "json":
         json_filename = TABLE_FILE_MAP.get(table)
         file_path = os.path.join(json_dir, json_filename)
         if not os.path.isfile(file_path):
             print(f"⚠️  File missing for {table}: {file_path}")
-            return
-        cmd += f" --file {file_path}"
+            return None
 
     print(f"\n🚀 Ingesting {table} from {source}...")
-    os.system(cmd)
+    db = SessionLocal()
+    try:
+        if source == "api":
+            count = module.ingest_from_api(db, **options)
+        else:
+            count = module.ingest_from_file(db, file_path, **options)
+        with metrics.stage("commit"):
+            db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def timed_ingestion(module, table, source, json_dir=None, options=None):
+    """run_ingestion() with its metrics collected; returns (count, PipelineMetrics)."""
+    with metrics.track(table) as tracked:
+        count = run_ingestion(module, table, source, json_dir, **(options or {}))
+    return count, tracked
+
+def run_all(modules, source, json_dir=None, options=None, workers=1, dependencies=TABLE_DEPENDENCIES):
+    """
+    Ingest tables as soon as all their parents are done, up to `workers` at a time.
+    Each table runs in its own session. After a failure no new table is started.
+    Returns (results, failed_table), results being (table, count, PipelineMetrics) tuples.
+    """
+    pending = [table for table in TABLES if table in modules]
+    done = set()
+    running = {}
+    results = []
+    failed = None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            if not failed:
+                ready = [t for t in pending if all(parent in done for parent in dependencies[t])]
+                for table in ready:
+                    pending.remove(table)
+                    future = pool.submit(timed_ingestion, modules[table], table, source, json_dir, options)
+                    running[future] = table
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    count, tracked = future.result()
+                except Exception as e:
+                    print(f"❌ Ingestion of {table} failed: {e}")
+                    failed = failed or table
+                    continue
+                done.add(table)
+                results.append((table, count, tracked))
+
+    return results, failed
+
+def print_summary(results, failed=None, wall_time=None):
+    print("\n📊 Ingestion summary")
+    for table, count, tracked in results:
+        elapsed = tracked.elapsed
+        if count is None:
+            rows = "skipped"
+        elif isinstance(count, int):
+            rows = f"{count} rows"
+        else:
+            rows = str(count)  # UpsertCounts
+        print(f"   {table:<16} {rows:>12}  {elapsed:7.2f}s")
+    if wall_time is not None:
+        print(f"⏱️  Wall time: {wall_time:.2f}s")
+    if failed:
+        print(f"❌ Stopped at '{failed}': remaining tables were not ingested")
 
 def main():
-    parser = argparse.ArgumentParser(description="Ingest all Stripe tables in order.")
+    parser = argparse.ArgumentParser(description="Ingest all Stripe tables, independent tables in parallel.")
     parser.add_argument("--source", choices=["api", "json"], required=True)
     parser.add_argument("--json-dir", help="Directory with JSON exports (required if source is json)")
+    parser.add_argument("--bulk", action="store_true", help="Use COPY-based bulk loading for JSON sources")
+    parser.add_argument("--columnar", action="store_true", help="With --bulk/--upsert, transform JSON sources in pandas batches")
+    parser.add_argument("--upsert", action="store_true", help="Update rows whose content hash changed instead of skipping existing ids")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore saved sync cursors for API sources")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent time-sharded requests per table for API sources")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Commit (and checkpoint) every N objects for API sources, 0 = one transaction per table")
+    parser.add_argument("--workers", type=int, default=4, help="Tables ingested concurrently (1 = serial)")
+    metrics.add_arguments(parser)
     args = parser.parse_args()
+    metrics.set_debug(args.verbose)
 
     if args.source == "json" and not args.json_dir:
         print("❌ --json-dir is required when source is json")
         sys.exit(1)
 
-    for table in TABLES:
-        run_ingestion(table, args.source, args.json_dir)
+    if args.source == "api":
+        options = {"full_resync": args.full_resync, "concurrency": args.concurrency, "batch_size": args.batch_size, "upsert": args.upsert}
+    else:
+        options = {"bulk": args.bulk, "upsert": args.upsert, "columnar": args.columnar}
+
+    modules = load_ingest_modules(TABLES)
+
+    start = time.perf_counter()
+    results, failed = run_all(modules, args.source, args.json_dir, options, workers=max(1, args.workers))
+
+    print_summary(results, failed, wall_time=time.perf_counter() - start)
+    metrics.report([tracked for _, _, tracked in results], args.metrics_out)
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     main()
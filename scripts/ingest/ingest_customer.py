@@ -1,85 +1,83 @@
 import argparse
-import json
 import os
 import stripe
+from itertools import batched
 from dotenv import load_dotenv
 from app.db.session import SessionLocal
+from app.db.bulk_loader import bulk_insert, bulk_upsert, UpsertWriter
+from app.db.lookup import LOOKUP_BATCH_SIZE
 from app.models.customer import Customer
 from app.transformers.customer import stripe_customer_to_model
+from app.utils.stripe_helpers import add_new_objects
 from sqlalchemy.orm import Session
+from app.utils import metrics
 from app.utils.env_loader import load_project_env
+from app.utils.json_stream import iter_stripe_objects
+from app.utils.sync_state import CreatedCursor
+from app.utils.stripe_fetch import list_objects
 
 ENV = load_project_env()
 stripe.api_key = os.getenv("STRIPE_API_KEY")
 
-def validate_json_type(data, expected_type: str):
-    if not data:
-        raise ValueError("❌ JSON file is empty or invalid format")
+def ingest_from_api(db: Session, full_resync: bool = False, concurrency: int = 1, batch_size: int = None, upsert: bool = False):
+    cursor = CreatedCursor(db, "customer", full_resync, batch_size)
+    if upsert:
+        writer = UpsertWriter(db, Customer, stripe_customer_to_model, batch_size=batch_size)
+        for obj in metrics.timed_iter("fetch", cursor.iter_new(list_objects(stripe.Customer, cursor, concurrency), before_commit=writer.flush)):
+            writer.add(obj)
+        writer.flush()
+        cursor.save()
+        return writer.counts
 
-    if isinstance(data, dict):
-        objects = data.get("data", [])
-    elif isinstance(data, list):
-        objects = data
-    else:
-        raise ValueError("❌ Unrecognized JSON structure")
-
-    if not objects:
-        raise ValueError("❌ No objects found in 'data' array.")
-
-    obj_type = objects[0].get("object")
-    if obj_type != expected_type:
-        raise ValueError(f"❌ Expected object type '{expected_type}', but got '{obj_type}'.")
-
-    print(f"🔒 File validation passed: {len(objects)} object(s) of type '{expected_type}' ✔️")
-    return objects
-
-def ingest_from_api(db: Session):
-    existing_ids = {x.id for x in db.query(Customer.id).all()}
     count = 0
-    for obj in stripe.Customer.list(limit=100).auto_paging_iter():
-        if obj["id"] not in existing_ids:
-            model = stripe_customer_to_model(obj)
-            db.add(model)
-            print(f"➕ Added customer: {model.id}")
-            count += 1
-        else:
-            print(f"✅ Skipped existing customer: {obj['id']}")
+    for page in metrics.timed_iter("fetch", cursor.iter_pages(list_objects(stripe.Customer, cursor, concurrency))):
+        count += add_new_objects(db, Customer, page, stripe_customer_to_model)
+    cursor.save()
     return count
 
-def ingest_from_file(db: Session, filepath: str):
-    with open(filepath, "r") as f:
-        raw = json.load(f)
-    objects = validate_json_type(raw, expected_type="customer")
+def ingest_from_file(db: Session, filepath: str, bulk: bool = False, upsert: bool = False, columnar: bool = False):
+    objects = metrics.timed_iter("fetch", iter_stripe_objects(filepath, expected_type="customer"))
+
+    if upsert:
+        return bulk_upsert(db, Customer, objects, stripe_customer_to_model, columnar=columnar)
+
+    if bulk:
+        return bulk_insert(db, Customer, objects, stripe_customer_to_model, columnar=columnar)
 
-    existing_ids = {x.id for x in db.query(Customer.id).all()}
     count = 0
-    for obj in objects:
-        if obj["id"] not in existing_ids:
-            db.add(stripe_customer_to_model(obj))
-            print(f"📄 Added from file: {obj['id']}")
-            count += 1
-        else:
-            print(f"✅ Skipped existing object: {obj['id']}")
+    for batch in batched(objects, LOOKUP_BATCH_SIZE):
+        count += add_new_objects(db, Customer, batch, stripe_customer_to_model)
     return count
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest Stripe customers.")
     parser.add_argument("--source", choices=["api", "json"], required=True)
     parser.add_argument("--file", help="Path to JSON file if source is 'json'")
+    parser.add_argument("--bulk", action="store_true", help="Load JSON with COPY + INSERT ... ON CONFLICT instead of the ORM")
+    parser.add_argument("--columnar", action="store_true", help="With --bulk/--upsert, transform JSON in pandas batches instead of one ORM object per row")
+    parser.add_argument("--upsert", action="store_true", help="Insert new rows and update rows whose content hash changed (COPY + INSERT ... ON CONFLICT DO UPDATE)")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore the saved sync cursor and list the whole history (source=api)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent time-sharded API requests (source=api)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Commit (and checkpoint) every N objects, 0 = single transaction (source=api)")
+    metrics.add_arguments(parser)
     args = parser.parse_args()
+    metrics.set_debug(args.verbose)
 
-    db = SessionLocal()
-    if args.source == "api":
-        print("📡 Fetching from Stripe API...")
-        count = ingest_from_api(db)
-    elif args.source == "json":
-        if not args.file:
-            raise ValueError("--file is required when source is 'json'")
-        print(f"📂 Ingesting from local file: {args.file}")
-        count = ingest_from_file(db, args.file)
-    db.commit()
-    db.close()
-    print(f"✅ Ingested {count} new customers")
+    with metrics.track("customer") as tracked:
+        db = SessionLocal()
+        if args.source == "api":
+            print("📡 Fetching from Stripe API...")
+            count = ingest_from_api(db, full_resync=args.full_resync, concurrency=args.concurrency, batch_size=args.batch_size, upsert=args.upsert)
+        elif args.source == "json":
+            if not args.file:
+                raise ValueError("--file is required when source is 'json'")
+            print(f"📂 Ingesting from local file: {args.file}")
+            count = ingest_from_file(db, args.file, bulk=args.bulk, upsert=args.upsert, columnar=args.columnar)
+        with metrics.stage("commit"):
+            db.commit()
+        db.close()
+    print(f"✅ Upserted customers: {count}" if args.upsert else f"✅ Ingested {count} new customers")
+    metrics.report([tracked], args.metrics_out)
 
 if __name__ == "__main__":
     main()
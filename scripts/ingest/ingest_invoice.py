@@ -1,78 +1,77 @@
 # scripts/ingest/ingest_invoice.py
-import argparse, json, os, stripe
+import argparse, os, stripe
+from itertools import batched
 from dotenv import load_dotenv
 from app.db.session import SessionLocal
+from app.db.bulk_loader import bulk_insert, bulk_upsert, UpsertWriter
+from app.db.lookup import LOOKUP_BATCH_SIZE
+from app.db.partitioning import ensure_months_ahead
 from app.models.invoice import Invoice
 from app.transformers.invoice import stripe_invoice_to_model
-from app.utils.stripe_helpers import ensure_customer_exists
+from app.utils.stripe_helpers import add_new_objects, references_before_merge
 from sqlalchemy.orm import Session
+from app.utils import metrics
 from app.utils.env_loader import load_project_env
+from app.utils.json_stream import iter_stripe_objects
+from app.utils.sync_state import CreatedCursor
+from app.utils.stripe_fetch import list_objects
 
 ENV = load_project_env()
 stripe.api_key = os.getenv("STRIPE_API_KEY")
 
-def validate_json_type(data, expected_type: str):
-    if not data:
-        raise ValueError("❌ JSON file is empty or invalid format")
+def ingest_from_api(db: Session, full_resync: bool = False, concurrency: int = 1, batch_size: int = None, upsert: bool = False):
+    ensure_months_ahead(db, Invoice.__tablename__)
+    cursor = CreatedCursor(db, "invoice", full_resync, batch_size)
+    if upsert:
+        writer = UpsertWriter(db, Invoice, stripe_invoice_to_model, before_merge=references_before_merge(Invoice), batch_size=batch_size)
+        for obj in metrics.timed_iter("fetch", cursor.iter_new(list_objects(stripe.Invoice, cursor, concurrency), before_commit=writer.flush)):
+            writer.add(obj)
+        writer.flush()
+        cursor.save()
+        return writer.counts
 
-    if isinstance(data, dict):
-        objects = data.get("data", [])
-    elif isinstance(data, list):
-        objects = data
-    else:
-        raise ValueError("❌ Unrecognized JSON structure")
-
-    if not objects:
-        raise ValueError("❌ No objects found in 'data' array.")
-
-    obj_type = objects[0].get("object")
-    if obj_type != expected_type:
-        raise ValueError(f"❌ Expected object type '{expected_type}', but got '{obj_type}'.")
-
-    print(f"🔒 File validation passed: {len(objects)} object(s) of type '{expected_type}' ✔️")
-    return objects
-
-def ingest_from_api(db: Session):
-    existing_ids = {x.id for x in db.query(Invoice.id).all()}
     count = 0
-    for obj in stripe.Invoice.list(limit=100).auto_paging_iter():
-        if obj["id"] not in existing_ids:
-            db.add(stripe_invoice_to_model(obj))
-            print(f"➕ Added invoice: {obj['id']}")
-            count += 1
+    for page in metrics.timed_iter("fetch", cursor.iter_pages(list_objects(stripe.Invoice, cursor, concurrency))):
+        count += add_new_objects(db, Invoice, page, stripe_invoice_to_model)
+    cursor.save()
     return count
 
-def ingest_from_file(db: Session, filepath: str):
-    with open(filepath, "r") as f:
-        raw = json.load(f)
-    objects = validate_json_type(raw, expected_type="invoice")
+def ingest_from_file(db: Session, filepath: str, bulk: bool = False, upsert: bool = False, columnar: bool = False):
+    ensure_months_ahead(db, Invoice.__tablename__)
+    objects = metrics.timed_iter("fetch", iter_stripe_objects(filepath, expected_type="invoice"))
 
-    existing_ids = {x.id for x in db.query(Invoice.id).all()}
-    count = 0
-    for obj in objects:
-        if obj["id"] in existing_ids:
-            print(f"✅ Skipped existing object: {obj['id']}")
-            continue
+    if upsert:
+        return bulk_upsert(db, Invoice, objects, stripe_invoice_to_model, before_merge=references_before_merge(Invoice), columnar=columnar)
 
-        customer_id = obj.get("customer")
-        if isinstance(customer_id, dict):
-            customer_id = customer_id.get("id")
-        ensure_customer_exists(db, customer_id)
+    if bulk:
+        return bulk_insert(db, Invoice, objects, stripe_invoice_to_model, before_merge=references_before_merge(Invoice), columnar=columnar)
 
-        db.add(stripe_invoice_to_model(obj))
-        print(f"📄 Added from file: {obj['id']}")
-        count += 1
+    count = 0
+    for batch in batched(objects, LOOKUP_BATCH_SIZE):
+        count += add_new_objects(db, Invoice, batch, stripe_invoice_to_model)
     return count
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--source", choices=["api", "json"], required=True)
     parser.add_argument("--file", help="Path to JSON if source=json")
+    parser.add_argument("--bulk", action="store_true", help="Load JSON with COPY + INSERT ... ON CONFLICT instead of the ORM")
+    parser.add_argument("--columnar", action="store_true", help="With --bulk/--upsert, transform JSON in pandas batches instead of one ORM object per row")
+    parser.add_argument("--upsert", action="store_true", help="Insert new rows and update rows whose content hash changed (COPY + INSERT ... ON CONFLICT DO UPDATE)")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore the saved sync cursor and list the whole history (source=api)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent time-sharded API requests (source=api)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Commit (and checkpoint) every N objects, 0 = single transaction (source=api)")
+    metrics.add_arguments(parser)
     args = parser.parse_args()
-    db = SessionLocal()
-    count = ingest_from_api(db) if args.source == "api" else ingest_from_file(db, args.file)
-    db.commit(); db.close()
-    print(f"✅ Ingested {count} invoices")
+    metrics.set_debug(args.verbose)
+    with metrics.track("invoice") as tracked:
+        db = SessionLocal()
+        count = ingest_from_api(db, full_resync=args.full_resync, concurrency=args.concurrency, batch_size=args.batch_size, upsert=args.upsert) if args.source == "api" else ingest_from_file(db, args.file, bulk=args.bulk, upsert=args.upsert, columnar=args.columnar)
+        with metrics.stage("commit"):
+            db.commit()
+        db.close()
+    print(f"✅ Upserted invoices: {count}" if args.upsert else f"✅ Ingested {count} invoices")
+    metrics.report([tracked], args.metrics_out)
 
 if __name__ == "__main__":
     main()
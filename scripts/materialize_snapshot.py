@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+from app.utils.object_store import WORKERS, GCSBackend, LocalBackend
+from app.utils.snapshot_archive import PREFIX, list_snapshots, materialize_snapshot
+
+BUCKET_NAME = "stripe-oltp-bucket-prod"
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild an archived imported_data snapshot as a local folder.")
+    parser.add_argument("--snapshot", help="Snapshot name (default: the latest)")
+    parser.add_argument("--dest", default="data/imported_stripe_data", help="Folder to write the files into")
+    parser.add_argument("--list", action="store_true", help="Only list the archived snapshots")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--local-root", help="Read from this directory instead of GCS (see push_to_gcs.py --local-root)")
+    args = parser.parse_args()
+
+    if args.local_root:
+        backend = LocalBackend(os.path.join(args.local_root, BUCKET_NAME))
+    else:
+        os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "./infra/gcp/gcp_service_account.json")
+        backend = GCSBackend(BUCKET_NAME)
+
+    snapshots = list_snapshots(backend, PREFIX)
+    if args.list:
+        for name in snapshots:
+            print(f"🗂️  {name}")
+        return
+    if not snapshots:
+        print(f"❌ No snapshot under {backend.url(PREFIX)}/snapshots/")
+        sys.exit(1)
+    snapshot = args.snapshot or snapshots[-1]
+    if snapshot not in snapshots:
+        print(f"❌ Unknown snapshot: {snapshot}")
+        sys.exit(1)
+
+    stats = materialize_snapshot(backend, snapshot, args.dest, PREFIX, args.workers)
+    print(f"✅ Snapshot {snapshot} materialized in {args.dest}: {stats['files']} file(s), "
+          f"{stats['downloaded']} downloaded, {stats['files'] - stats['downloaded']} already up to date")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+from sqlalchemy import text
+from app.db.partitioning import (
+    MONTHS_AHEAD, PARTITIONED_TABLES, convert_to_partitioned, convert_to_plain, ensure_months_ahead, is_partitioned, partitions,
+)
+from app.db.session import SessionLocal
+from app.utils.env_loader import load_project_env
+
+ENV = load_project_env()
+
+def status(db, tables):
+    for table in tables:
+        if not is_partitioned(db, table):
+            print(f"📄 {table}: plain table")
+            continue
+        names = sorted(partitions(db, table))
+        rows = db.execute(text(f"SELECT count(*) FROM {table}_default")).scalar()
+        months = [n for n in names if not n.endswith("_default")]
+        print(f"🗂️  {table}: {len(months)} month(s) {months[0].rsplit('_p', 1)[1]}..{months[-1].rsplit('_p', 1)[1]}, "
+              f"{rows} row(s) in the default partition")
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly `created` partitioning of invoices, payment_intents and charges.")
+    parser.add_argument("command", choices=["status", "convert", "revert", "ensure"],
+                        help="convert/revert the layout (one transaction), ensure = create the next months' partitions")
+    parser.add_argument("--table", choices=PARTITIONED_TABLES, action="append", help="Only this table (repeatable, default: all)")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD, help="Future months to create (convert, ensure)")
+    args = parser.parse_args()
+    tables = [t for t in PARTITIONED_TABLES if not args.table or t in args.table]
+
+    db = SessionLocal()
+    try:
+        if args.command == "convert":
+            for table in tables:
+                if not convert_to_partitioned(db, table, args.months_ahead):
+                    print(f"✔️ {table} is already partitioned")
+        elif args.command == "revert":
+            for table in reversed(tables):
+                if not convert_to_plain(db, table):
+                    print(f"✔️ {table} is already a plain table")
+        elif args.command == "ensure":
+            for table in tables:
+                if is_partitioned(db, table):
+                    print(f"🗓️  {table}: {ensure_months_ahead(db, table, args.months_ahead)} partition(s) created")
+        db.commit()
+        status(db, tables)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
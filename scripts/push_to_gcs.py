@@ -1,41 +1,42 @@
+import argparse
 import os
 import sys
-from google.cloud import storage
-from datetime import datetime, timezone
-
-def upload_folder_to_bucket(bucket_name, source_folder, destination_folder=""):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-
-    for root, _, files in os.walk(source_folder):
-        for file in files:
-            local_path = os.path.join(root, file)
-            relative_path = os.path.relpath(local_path, source_folder)
-            
-            # Utilise '/' même sur Windows pour avoir des chemins valides GCS
-            blob_path = os.path.join(destination_folder, relative_path).replace(os.sep, "/")
-            
-            blob = bucket.blob(blob_path)
-            blob.upload_from_filename(local_path)
-            print(f"✅ Uploaded {local_path} to gs://{bucket_name}/{blob_path}")
+from app.utils.object_store import WORKERS, GCSBackend, LocalBackend, upload_folder
+from app.utils.snapshot_archive import PREFIX, archive_folder
+
+def upload_folder_to_bucket(bucket_name, source_folder, destination_folder="", workers=WORKERS, backend=None):
+    """Sync `source_folder` to gs://bucket_name/destination_folder, skipping unchanged files."""
+    backend = backend or GCSBackend(bucket_name)
+    stats = upload_folder(backend, source_folder, destination_folder, workers)
+    print(f"📦 {source_folder}: {stats['uploaded']} uploaded, {stats['skipped']} unchanged, "
+          f"{stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s ({stats['mb_per_s']} MB/s)")
+    return stats
 
 if __name__ == "__main__":
-    creds_path = "./infra/gcp/gcp_service_account.json"
+    parser = argparse.ArgumentParser(description="Upload the local data folders to the GCS bucket.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Files uploaded at the same time")
+    parser.add_argument("--local-root", help="Copy into this directory instead of GCS (dry run / fake bucket)")
+    args = parser.parse_args()
 
-    if not os.path.exists(creds_path):
-        print(f"❌ Credential file not found: {creds_path}")
-        sys.exit(1)
+    BUCKET_NAME = "stripe-oltp-bucket-prod"
+    backend = None
+    if args.local_root:
+        backend = LocalBackend(os.path.join(args.local_root, BUCKET_NAME))
+    else:
+        creds_path = "./infra/gcp/gcp_service_account.json"
 
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = creds_path
+        if not os.path.exists(creds_path):
+            print(f"❌ Credential file not found: {creds_path}")
+            sys.exit(1)
 
-    BUCKET_NAME = "stripe-oltp-bucket-prod"
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = creds_path
 
     print("🚀 Uploading local data folders to GCS bucket...")
 
     # ➤ Uploader les dumps dans: dump/
-    upload_folder_to_bucket(BUCKET_NAME, "data/db_dump", destination_folder="dump")
+    upload_folder_to_bucket(BUCKET_NAME, "data/db_dump", destination_folder="dump", workers=args.workers, backend=backend)
 
-    # ➤ Uploader les données importées dans: imported_data/{timestamp}/
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    gcs_imported_prefix = f"imported_data/{timestamp}"
-    upload_folder_to_bucket(BUCKET_NAME, "data/imported_stripe_data", destination_folder=gcs_imported_prefix)
+    # ➤ Archiver les données importées dans: imported_data/ (blobs par contenu + un manifest par snapshot)
+    stats = archive_folder(backend or GCSBackend(BUCKET_NAME), "data/imported_stripe_data", PREFIX, workers=args.workers)
+    print(f"📦 data/imported_stripe_data: snapshot {stats['snapshot']}, {stats['files']} file(s), "
+          f"{stats['uploaded']} new blob(s), {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s")
@@ -0,0 +1,50 @@
+import argparse
+import json
+import os
+import urllib.error
+import urllib.request
+from app.utils.env_loader import load_project_env
+from app.utils.webhook import WEBHOOK_PATH, sign_payload
+
+load_project_env()
+
+def load_events(path: str) -> list:
+    """Recorded events: a JSON list, a Stripe list object ({"data": [...]}) or one event."""
+    with open(path, "r") as f:
+        content = json.load(f)
+    if isinstance(content, dict):
+        return content["data"] if content.get("object") == "list" else [content]
+    return content
+
+def post_event(url: str, event: dict, secret: str) -> int:
+    payload = json.dumps(event).encode()
+    request = urllib.request.Request(url, data=payload, method="POST", headers={
+        "Content-Type": "application/json",
+        "Stripe-Signature": sign_payload(payload, secret),
+    })
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def main():
+    parser = argparse.ArgumentParser(description="Sign and post recorded Stripe events to a local webhook server.")
+    parser.add_argument("--file", required=True, help="JSON file of recorded events")
+    parser.add_argument("--url", default=f"http://127.0.0.1:8787{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=os.getenv("STRIPE_WEBHOOK_SECRET"), help="Signing secret (default: $STRIPE_WEBHOOK_SECRET)")
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("a signing secret is required (--secret or STRIPE_WEBHOOK_SECRET)")
+
+    statuses = {}
+    for event in load_events(args.file):
+        status = post_event(args.url, event, args.secret)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != 200:
+            print(f"⚠️  {event.get('id')} → HTTP {status}")
+    print(f"✅ Posted events: {statuses}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+from itertools import batched
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.db.base import Base
+from app.db.partitioning import PARTITION_KEY, is_partitioned
+from app.db.session import SessionLocal
+from app.utils.env_loader import load_project_env
+from app.utils.ndjson import iter_ndjson
+from scripts.dump_all_tables import INCREMENTAL_DIR, MODELS, read_manifest
+
+ENV = load_project_env()
+BATCH_SIZE = 1000
+
+# Referenced tables first; deletions go the other way
+TABLES = [t for t in Base.metadata.sorted_tables if t.name in {m.__tablename__ for m in MODELS}]
+
+def upsert_rows(db, table, records, batch_size: int = BATCH_SIZE) -> int:
+    """Insert dumped rows, replacing the ones already there (same id). Returns the row count."""
+    keys = ["id", PARTITION_KEY] if is_partitioned(db, table.name) else ["id"]
+    count = 0
+    for batch in batched(records, batch_size):
+        stmt = pg_insert(table).values(list(batch))
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=keys, set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in keys}
+        ))
+        count += len(batch)
+    return count
+
+def delete_rows(db, table, ids, batch_size: int = BATCH_SIZE) -> int:
+    count = 0
+    for batch in batched(ids, batch_size):
+        count += db.execute(delete(table).where(table.c.id.in_(batch))).rowcount
+    return count
+
+def links_to_replay(chain: list, until: int = None) -> list:
+    """The last full dump up to `until` (default: the end of the chain) and the deltas after it."""
+    links = [link for link in chain if until is None or link["seq"] <= until]
+    fulls = [i for i, link in enumerate(links) if link["kind"] == "full"]
+    if not fulls:
+        raise ValueError("❌ No full dump to start from in this chain")
+    return links[fulls[-1]:]
+
+def restore_link(db, chain_dir: str, link: dict, batch_size: int = BATCH_SIZE):
+    """Apply one link: its deletions (referencing tables first), then its rows. The caller commits."""
+    link_dir = os.path.join(chain_dir, link["dir"])
+    for table in reversed(TABLES):
+        entry = link["tables"].get(table.name, {})
+        if entry.get("deleted_file"):
+            ids = (record["id"] for record in iter_ndjson(os.path.join(link_dir, entry["deleted_file"])))
+            delete_rows(db, table, ids, batch_size)
+    for table in TABLES:
+        entry = link["tables"].get(table.name, {})
+        if entry.get("file"):
+            upsert_rows(db, table, iter_ndjson(os.path.join(link_dir, entry["file"])), batch_size)
+
+def restore_chain(db, chain_dir: str = INCREMENTAL_DIR, until: int = None, batch_size: int = BATCH_SIZE) -> list:
+    """
+    Rebuild the database state of a dump chain (scripts/dump_all_tables.py --incremental)
+    into an empty schema, committing after each link. Returns the replayed sequence numbers.
+    """
+    replayed = []
+    for link in links_to_replay(read_manifest(chain_dir)["chain"], until):
+        restore_link(db, chain_dir, link, batch_size)
+        db.commit()
+        changed = sum(e["rows"] for e in link["tables"].values())
+        deleted = sum(e.get("deleted", 0) for e in link["tables"].values())
+        print(f"♻️  {link['dir']}: {changed} row(s) restored" + (f", {deleted} deleted" if deleted else ""))
+        replayed.append(link["seq"])
+    return replayed
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an incremental dump chain (last full dump + deltas) into the database.")
+    parser.add_argument("--chain-dir", default=INCREMENTAL_DIR, help="Directory holding manifest.json")
+    parser.add_argument("--until", type=int, help="Stop after this link (seq in the manifest)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per INSERT")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        replayed = restore_chain(db, args.chain_dir, args.until, args.batch_size)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"✅ Restored links {replayed[0]}..{replayed[-1]} from {args.chain_dir}")
+
+if __name__ == "__main__":
+    main()
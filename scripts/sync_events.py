@@ -0,0 +1,31 @@
+import argparse
+import os
+import stripe
+from app.db.session import SessionLocal
+from app.utils import metrics
+from app.utils.env_loader import load_project_env
+from app.utils.event_sync import sync_events
+
+ENV = load_project_env()
+stripe.api_key = os.getenv("STRIPE_API_KEY")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync all tables from the Stripe Events API, from the saved event cursor.")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore the saved cursor and apply every event Stripe still keeps (30 days)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Events applied per transaction (committed with a resume point), 0 = single transaction")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.set_debug(args.verbose)
+
+    with metrics.track("event") as tracked:
+        db = SessionLocal()
+        try:
+            counts = sync_events(db, full_resync=args.full_resync, batch_size=args.batch_size)
+        finally:
+            db.close()
+    print(f"✅ Applied {counts['events']} event(s): {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['deleted']} deleted, {counts['duplicates']} already applied, {counts['ignored']} ignored")
+    metrics.report([tracked], args.metrics_out)
+
+if __name__ == "__main__":
+    main()
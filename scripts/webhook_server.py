@@ -0,0 +1,39 @@
+import argparse
+import os
+import signal
+import threading
+from app.db.session import SessionLocal
+from app.utils.env_loader import load_project_env
+from app.utils.webhook import WEBHOOK_PATH, WebhookReceiver
+
+ENV = load_project_env()
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive Stripe webhooks and apply them to the database in micro-batches.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--secret", default=os.getenv("STRIPE_WEBHOOK_SECRET"), help="Signing secret (default: $STRIPE_WEBHOOK_SECRET)")
+    parser.add_argument("--queue-size", type=int, default=1000, help="Events waiting to be applied before answering 503")
+    parser.add_argument("--batch-size", type=int, default=100, help="Max events applied per transaction")
+    parser.add_argument("--max-wait", type=float, default=1.0, help="Seconds to wait for more events before applying a batch")
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("a signing secret is required (--secret or STRIPE_WEBHOOK_SECRET)")
+
+    receiver = WebhookReceiver(SessionLocal, args.secret, queue_size=args.queue_size, batch_size=args.batch_size, max_wait=args.max_wait)
+    receiver.start(args.host, args.port)
+    print(f"🪝 Listening for Stripe webhooks on http://{args.host}:{args.port}{WEBHOOK_PATH} (ENV={ENV})")
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    try:
+        stopping.wait()
+    except KeyboardInterrupt:
+        pass
+    print("🛑 Stopping: applying queued events...")
+    receiver.stop()
+    print(f"✅ Webhook server stopped: {dict(receiver.counts)}")
+
+if __name__ == "__main__":
+    main()
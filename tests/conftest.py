@@ -4,6 +4,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.db.base import Base
+from app.db.json_codec import engine_options
 from app.utils.env_loader import load_project_env
 from app.utils.db_url import get_database_url
 
@@ -19,7 +20,7 @@ POSTGRES_TEST_PORT = os.getenv("POSTGRES_TEST_PORT", "5435")
 
 # Connexion SQLAlchemy vers DB de test
 TEST_DB_URL = get_database_url(db_override=POSTGRES_TEST_DB, port_override=POSTGRES_TEST_PORT)
-engine = create_engine(TEST_DB_URL, echo=(ENV == "DEV"))
+engine = create_engine(TEST_DB_URL, echo=(ENV == "DEV"), **engine_options())
 TestingSessionLocal = sessionmaker(bind=engine)
 
 # Crée/Détruit les tables avant chaque test
@@ -38,3 +39,82 @@ def db():
         yield session
     finally:
         session.close()
+
+# ===== Stand-in Stripe API (list endpoints only) =====
+
+class StripeStandIn:
+    """Serves Stripe-style list pages (created filters, starting_after, limit) from in-memory objects."""
+
+    def __init__(self):
+        self.resources = {}   # e.g. {"charges": [ {...}, ... ]}
+        self.requests = []    # (path, params) of every GET received
+        self.fail_after = None  # answer HTTP 500 once this many requests were served
+
+    def list_page(self, resource, params):
+        objects = self.resources.get(resource, [])
+        for op in ("gt", "gte", "lt", "lte"):
+            bound = params.get(f"created[{op}]")
+            if bound is not None:
+                bound = int(bound)
+                objects = [o for o in objects if {
+                    "gt": o["created"] > bound, "gte": o["created"] >= bound,
+                    "lt": o["created"] < bound, "lte": o["created"] <= bound,
+                }[op]]
+
+        # Stripe lists are newest first
+        objects = sorted(objects, key=lambda o: (o["created"], o["id"]), reverse=True)
+        if "starting_after" in params:
+            ids = [o["id"] for o in objects]
+            objects = objects[ids.index(params["starting_after"]) + 1:]
+
+        limit = int(params.get("limit", 10))
+        return {
+            "object": "list",
+            "url": f"/v1/{resource}",
+            "has_more": len(objects) > limit,
+            "data": objects[:limit],
+        }
+
+@pytest.fixture()
+def stripe_standin():
+    import json
+    import threading
+    import stripe
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qsl
+
+    standin = StripeStandIn()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = dict(parse_qsl(url.query))
+            if standin.fail_after is not None and len(standin.requests) >= standin.fail_after:
+                status, payload = 500, {"error": {"type": "api_error", "message": "stand-in failure"}}
+            else:
+                standin.requests.append((url.path, params))
+                status, payload = 200, standin.list_page(url.path.removeprefix("/v1/"), params)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    previous = (stripe.api_base, stripe.api_key, stripe.max_network_retries)
+    stripe.api_base = f"http://127.0.0.1:{server.server_port}"
+    stripe.api_key = "sk_test_standin"
+    stripe.max_network_retries = 0
+    try:
+        yield standin
+    finally:
+        stripe.api_base, stripe.api_key, stripe.max_network_retries = previous
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.utils.stripe_helpers import references_before_merge
+from datetime import datetime, timezone
+
+NOW = int(datetime.now(timezone.utc).timestamp())
+
+def fake_customer(customer_id, email):
+    return {
+        "id": customer_id,
+        "object": "customer",
+        "email": email,
+        "name": "Tab\tand\nnewline \\ name",
+        "created": NOW,
+        "invoice_settings": {},
+        "metadata": {"plan": "gold"},
+    }
+
+def fake_invoice(invoice_id, customer_id):
+    return {
+        "id": invoice_id,
+        "object": "invoice",
+        "customer": customer_id,
+        "status": "paid",
+        "created": NOW,
+        "period_start": NOW,
+        "period_end": NOW,
+        "lines": {"object": "list", "data": []},
+    }
+
+def test_bulk_insert_matches_orm_and_skips_existing(db: Session):
+    db.add(Customer(id="cus_existing", email="keep@example.com"))
+    db.commit()
+
+    objects = [
+        fake_customer("cus_existing", "overwrite@example.com"),
+        fake_customer("cus_new_1", "one@example.com"),
+        fake_customer("cus_new_2", "two@example.com"),
+    ]
+    inserted = bulk_insert(db, Customer, objects, stripe_customer_to_model)
+    db.commit()
+
+    assert inserted == 2
+    assert db.query(Customer).count() == 3
+    assert db.get(Customer, "cus_existing").email == "keep@example.com"
+
+    new = db.get(Customer, "cus_new_1")
+    assert new.name == "Tab\tand\nnewline \\ name"
+    assert new.stripe_metadata == {"plan": "gold"}
+    assert new.deleted is False
+
+def test_bulk_insert_creates_placeholder_customers(db: Session):
+    objects = [fake_invoice("in_bulk_1", "cus_gone"), fake_invoice("in_bulk_2", "cus_gone")]
+
+    inserted = bulk_insert(db, Invoice, objects, stripe_invoice_to_model, before_merge=references_before_merge(Invoice))
+    db.commit()
+
+    assert inserted == 2
+    ghost = db.get(Customer, "cus_gone")
+    assert ghost is not None
+    assert ghost.deleted is True
+    assert ghost.stripe_metadata.get("placeholder") is True
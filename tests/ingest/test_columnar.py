@@ -0,0 +1,123 @@
+import json
+import time
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import _column_values, bulk_insert
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.payment_intent import PaymentIntent
+from app.models.payment_method import PaymentMethod
+from app.models.price import Price
+from app.models.products import Product
+from app.models.subscription import Subscription
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.columnar import stripe_customers_to_frame, transform_rows
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.payment_intent import stripe_payment_intent_to_model
+from app.transformers.payment_method import stripe_payment_method_to_model
+from app.transformers.price import stripe_price_to_model
+from app.transformers.products import stripe_product_to_model
+from app.transformers.subscription import stripe_subscription_to_model
+
+JSON_DIR = "data/imported_stripe_data"
+
+RESOURCES = [
+    (Customer, stripe_customer_to_model, "customers.json"),
+    (Product, stripe_product_to_model, "products.json"),
+    (Price, stripe_price_to_model, "prices.json"),
+    (PaymentMethod, stripe_payment_method_to_model, "payment_methods.json"),
+    (Subscription, stripe_subscription_to_model, "subscriptions.json"),
+    (Invoice, stripe_invoice_to_model, "invoices.json"),
+    (PaymentIntent, stripe_payment_intent_to_model, "payment_intents.json"),
+    (Charge, stripe_charge_to_model, "charges.json"),
+]
+
+def variants(objects):
+    """The exported objects plus edge cases: expanded references, optional timestamps set or 0, missing fields."""
+    out = [dict(obj) for obj in objects]
+    for i, obj in enumerate(objects):
+        edge = {**obj, "id": f"{obj['id']}_edge_{i}", "metadata": {"n": i}}
+        for key in ("customer", "product", "payment_intent"):
+            if isinstance(obj.get(key), str):
+                edge[key] = {"id": obj[key], "object": key}
+        for key in ("cancel_at", "canceled_at", "ended_at"):
+            if key in obj:
+                edge[key] = 1700000000 if i % 2 else 0
+        for key in ("recurring", "outcome", "invoice_settings", "description"):
+            edge.pop(key, None)
+        out.append(edge)
+    return out
+
+def load(filename):
+    with open(f"{JSON_DIR}/{filename}") as f:
+        return variants(json.load(f)["data"])
+
+@pytest.mark.parametrize("model, transform, filename", RESOURCES, ids=[r[2] for r in RESOURCES])
+def test_batch_rows_match_per_object_transformers(model, transform, filename):
+    objects = load(filename)
+    columns = list(model.__table__.columns)
+    no_processing = {c.key: None for c in columns}
+
+    expected = [tuple(_column_values(transform(obj), columns, no_processing)) for obj in objects]
+    assert transform_rows(model, objects) == expected
+
+def test_frame_columns_are_vectorized():
+    frame = stripe_customers_to_frame([
+        {"id": "cus_1", "created": 1700000000, "invoice_settings": {"default_payment_method": {"id": "pm_1"}}},
+        {"id": "cus_2", "created": None},
+    ])
+    assert frame["created"].dtype.kind == "M"
+    assert frame["created"].isna().tolist() == [False, True]
+    assert frame["default_payment_method_id"].tolist() == ["pm_1", None]
+
+@pytest.fixture
+def host_timezone(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_timestamps_are_utc_whatever_the_host_timezone(host_timezone):
+    data = {"id": "cus_1", "created": 1700000000}
+    assert stripe_customer_to_model(data).created == datetime(2023, 11, 14, 22, 13, 20)
+    assert stripe_customers_to_frame([data])["created"].tolist() == [datetime(2023, 11, 14, 22, 13, 20)]
+
+def test_nested_and_missing_fields_match_the_per_object_path():
+    objects = [
+        {"id": "sub_1", "customer": {"id": "cus_1"}, "created": 1, "start_date": 1, "current_period_start": 1,
+         "current_period_end": 1, "items": {"data": "not a list"}, "metadata": None},
+        {"id": "sub_2", "customer": "cus_2", "created": 1, "start_date": 1, "current_period_start": 1,
+         "current_period_end": 1, "items": {"data": [{"id": "si_1", "price": {"id": "price_1", "recurring": {"interval": "month"}}}]}},
+    ]
+    columns = list(Subscription.__table__.columns)
+    no_processing = {c.key: None for c in columns}
+    expected = [tuple(_column_values(stripe_subscription_to_model(obj), columns, no_processing)) for obj in objects]
+    assert transform_rows(Subscription, objects) == expected
+
+    with pytest.raises(KeyError):
+        transform_rows(Subscription, [{"customer": "cus_1"}])
+
+def test_columnar_bulk_insert_stores_the_same_rows(db: Session):
+    # Products before prices (FK); compare every stored row between both paths
+    loaded = [(model, transform, load(filename)) for model, transform, filename in RESOURCES[:3]]
+
+    def snapshot():
+        return {model: db.execute(select(model.__table__).order_by(model.id)).all() for model, _, _ in loaded}
+
+    for model, transform, objects in loaded:
+        assert bulk_insert(db, model, objects, transform) == len(objects)
+    db.commit()
+    orm_rows = snapshot()
+    for model, _, _ in reversed(loaded):
+        db.execute(model.__table__.delete())
+    db.commit()
+
+    for model, transform, objects in loaded:
+        assert bulk_insert(db, model, objects, transform, columnar=True) == len(objects)
+    db.commit()
+    assert snapshot() == orm_rows
@@ -0,0 +1,91 @@
+import json
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.utils import ndjson
+from app.utils.ndjson import iter_ndjson
+from app.utils.parquet import NULL_PARTITION, arrow_schema
+from scripts.dump_all_tables import MODELS, dump_table, dump_to_ndjson, export_to_parquet, iter_rows
+
+def seed(db: Session, customers: int = 25):
+    db.add_all(Customer(id=f"cus_{i:03d}", email=f"{i}@example.com", created=f"2024-01-{i % 28 + 1:02d}") for i in range(customers))
+    db.add(Charge(id="ch_1", amount=1200, stripe_metadata={"note": "é ✓"}))
+    db.commit()
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_dump_writes_one_ndjson_file_per_table(db: Session, tmp_path, compression):
+    if compression == "zstd" and ndjson.zstandard is None:
+        pytest.skip("zstandard not installed")
+    seed(db)
+    dump_dir = dump_to_ndjson(db, str(tmp_path), compression, batch_size=10)
+
+    suffix = ndjson.EXTENSIONS[compression]
+    assert sorted(os.listdir(dump_dir)) == sorted(m.__tablename__ + suffix for m in MODELS)
+    customers = list(iter_ndjson(os.path.join(dump_dir, "customers" + suffix)))
+    assert [c["id"] for c in customers] == [f"cus_{i:03d}" for i in range(25)]   # primary key order
+    assert customers[1]["created"] == "2024-01-02 00:00:00"                        # str() like the legacy dump
+    charge, = iter_ndjson(os.path.join(dump_dir, "charges" + suffix))
+    assert charge["stripe_metadata"] == {"note": "é ✓"} and charge["amount"] == 1200
+    assert list(iter_ndjson(os.path.join(dump_dir, "invoices" + suffix))) == []
+
+def test_rows_are_streamed_in_batches(db: Session):
+    seed(db, customers=30)
+    rows = iter_rows(db, Customer, batch_size=7)
+    assert next(rows)["id"] == "cus_000"
+    # A server-side cursor is open: the other rows are still in Postgres
+    assert db.execute(text("SELECT count(*) FROM pg_cursors")).scalar() == 1
+    assert len(list(rows)) == 29
+
+def test_gzip_output_is_reproducible(db: Session, tmp_path):
+    seed(db)
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir(); second.mkdir()
+    dump_table(db, Customer, str(first), "gzip")
+    dump_table(db, Customer, str(second), "gzip")
+    assert (first / "customers.ndjson.gz").read_bytes() == (second / "customers.ndjson.gz").read_bytes()
+
+def test_zstd_is_only_offered_when_installed():
+    assert ("zstd" in ndjson.available_compressions()) == (ndjson.zstandard is not None)
+
+def test_failed_dump_leaves_no_partial_file(tmp_path):
+    def records():
+        yield {"id": 1}
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        ndjson.write_ndjson(str(tmp_path / "t.ndjson.gz"), records(), "gzip")
+    assert os.listdir(tmp_path) == []
+
+def test_parquet_export_is_typed_and_partitioned_by_month(db: Session, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    seed(db, customers=3)
+    db.add(Charge(id="ch_2", amount=500, created="2024-02-03 10:00:00", paid=True, stripe_metadata={"a": [1, 2]}))
+    db.add(Charge(id="ch_3", amount=700, created="2024-03-01 00:00:00", paid=False))
+    db.commit()
+
+    dump_dir = export_to_parquet(db, str(tmp_path), row_group_size=2)
+    manifest = json.loads((tmp_path / os.path.basename(dump_dir) / "manifest.json").read_text())
+
+    charges = manifest["tables"]["charges"]
+    assert charges["rows"] == 3
+    assert [(f["partition"], f["rows"]) for f in charges["files"]] == [("2024-02", 1), ("2024-03", 1), (NULL_PARTITION, 1)]
+    assert "stripe_metadata" in manifest["json_columns"]["charges"]
+    assert [f["rows"] for f in manifest["tables"]["customers"]["files"]] == [3]
+    assert manifest["tables"]["invoices"] == {"rows": 0, "files": []}
+
+    table = pq.read_table(os.path.join(dump_dir, charges["files"][0]["path"]))
+    assert str(table.schema.field("created").type) == "timestamp[us]"
+    assert str(arrow_schema(Invoice.__table__).field("status_transitions_at").type) == "timestamp[us, tz=UTC]"
+    assert str(table.schema.field("amount").type) == "int64"
+    assert str(table.schema.field("paid").type) == "bool"
+    row, = table.to_pylist()
+    assert row["created"] == datetime(2024, 2, 3, 10) and json.loads(row["stripe_metadata"]) == {"a": [1, 2]}
+
+    # Readable as one dataset, the month coming back as a column
+    dataset = pq.read_table(os.path.join(dump_dir, "customers"))
+    assert dataset.num_rows == 3 and "created_month" in dataset.column_names
@@ -0,0 +1,97 @@
+import pytest
+import stripe
+from sqlalchemy.orm import Session
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.price import Price
+from app.models.products import Product
+from app.models.stripe_event import StripeEvent
+from app.models.sync_state import SyncState
+from app.utils.event_sync import sync_events
+
+START = 1700000000
+
+def event(n, event_type, obj, created=None):
+    return {"id": f"evt_{n:03d}", "object": "event", "type": event_type, "created": created or START + n,
+            "data": {"object": obj}}
+
+def recorded_events():
+    """A recorded history: creations, updates and a deletion, across three resources."""
+    product = {"id": "prod_1", "object": "product", "name": "Gold", "created": START, "updated": START}
+    price = {"id": "price_1", "object": "price", "product": "prod_1", "unit_amount": 900, "currency": "eur", "created": START}
+    customer = {"id": "cus_1", "object": "customer", "email": "old@example.com", "created": START}
+    return [
+        event(1, "product.created", product),
+        event(2, "price.created", price),
+        event(3, "customer.created", customer),
+        event(4, "customer.updated", {**customer, "email": "new@example.com"}),
+        event(5, "price.updated", {**price, "active": False}),
+        event(6, "product.updated", {**product, "name": "Platinum"}),
+    ]
+
+def test_events_are_applied_oldest_first_from_one_stream(db: Session, stripe_standin):
+    stripe_standin.resources["events"] = recorded_events()  # listed newest first by the stand-in
+
+    counts = sync_events(db, batch_size=2)
+
+    assert counts["events"] == 6
+    assert db.get(Customer, "cus_1").email == "new@example.com"
+    assert db.get(Product, "prod_1").name == "Platinum"
+    assert db.get(Price, "price_1").active is False
+    assert db.get(SyncState, "event").last_created == START + 6
+    # One listing for all tables
+    assert {path for path, _ in stripe_standin.requests} == {"/v1/events"}
+
+def test_next_run_only_lists_new_events(db: Session, stripe_standin):
+    stripe_standin.resources["events"] = recorded_events()
+    sync_events(db)
+
+    invoice = {"id": "in_1", "object": "invoice", "customer": "cus_1", "status": "draft",
+               "created": START, "period_start": START, "period_end": START}
+    stripe_standin.resources["events"] += [
+        event(7, "invoice.created", invoice),
+        event(8, "invoice.deleted", invoice),
+        event(9, "customer.deleted", {"id": "cus_1", "object": "customer", "deleted": True}),
+    ]
+    stripe_standin.requests.clear()
+
+    counts = sync_events(db)
+
+    assert stripe_standin.requests[0][1]["created[gte]"] == str(START + 6)
+    # evt_006 is listed again (same second as the cursor) but skipped
+    assert counts["duplicates"] == 1 and counts["events"] == 3
+    assert db.get(Invoice, "in_1") is None
+    db.expire_all()
+    assert db.get(Customer, "cus_1").deleted is True
+    assert db.query(StripeEvent).count() == 9
+
+def test_pages_are_applied_as_listed_and_an_interrupted_run_resumes(db: Session, stripe_standin):
+    customers = [{"id": f"cus_{i}", "object": "customer", "created": START} for i in range(25)]
+    stripe_standin.resources["events"] = [
+        event(n, "customer.updated", {**customers[n % 25], "email": f"v{n}@example.com"}) for n in range(1, 251)
+    ]
+    newest_first = stripe_standin.resources["events"][::-1]
+    stripe_standin.fail_after = 2  # pages 1-2 served (newest 200 events), page 3 fails
+
+    with pytest.raises(stripe.APIError):
+        sync_events(db, batch_size=100)
+    db.rollback()
+
+    # Page 1 minus its oldest second, then page 2, were committed while listing
+    state = db.get(SyncState, "event")
+    assert state.resume_after == newest_first[198]["id"] and state.last_created is None
+    assert db.query(StripeEvent).count() == 199
+
+    stripe_standin.fail_after = None
+    stripe_standin.requests.clear()
+    counts = sync_events(db, batch_size=100)
+
+    assert stripe_standin.requests[0][1]["starting_after"] == newest_first[198]["id"]
+    # Only older events are left: recorded, none applied
+    assert counts["events"] == 51 and counts["stale"] == 26 and counts["updated"] == 0
+    assert db.query(StripeEvent).count() == 250
+    # Every customer holds its newest event, whatever the page it was listed in
+    assert {c.id: c.email for c in db.query(Customer)} == {f"cus_{n % 25}": f"v{n}@example.com" for n in range(226, 251)}
+    db.expire_all()
+    state = db.get(SyncState, "event")
+    assert state.resume_after is None and state.last_created == START + 250
@@ -0,0 +1,124 @@
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+from app.db.base import Base
+from app.db.bulk_loader import bulk_upsert
+from app.db.change_tracking import DELETIONS_TABLE, enable_change_tracking
+from app.db.partitioning import convert_to_partitioned, ensure_partitions, partitions
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.products import Product
+from app.transformers.charge import stripe_charge_to_model
+from app.utils.ndjson import iter_ndjson
+from scripts.dump_all_tables import MODELS, dump_incremental, iter_rows, read_manifest
+from scripts.restore_dump import restore_chain
+
+@pytest.fixture()
+def tracked(db: Session):
+    enable_change_tracking(db)
+    db.commit()
+    yield db
+    db.rollback()
+    db.execute(text(f"DROP TABLE IF EXISTS {DELETIONS_TABLE}"))
+    db.commit()
+
+def charge(charge_id, amount):
+    return {"id": charge_id, "object": "charge", "created": 1704067200, "amount": amount}
+
+def rows(link_dir, link, table):
+    entry = link["tables"][table]
+    return list(iter_ndjson(os.path.join(link_dir, entry["file"]))) if "file" in entry else []
+
+def snapshot_of(db):
+    return {m.__tablename__: list(iter_rows(db, m)) for m in MODELS}
+
+def test_deltas_only_hold_what_changed(tracked: Session, tmp_path):
+    db = tracked
+    db.add_all([Customer(id="cus_1", email="a@x.io"), Customer(id="cus_2"), Product(id="prod_1", name="Pro")])
+    bulk_upsert(db, Charge, [charge("ch_1", 100), charge("ch_2", 200)], stripe_charge_to_model)
+    db.commit()
+
+    full = dump_incremental(db, str(tmp_path))
+    db.commit()
+    assert full["kind"] == "full" and full["since"] is None
+    assert {t: e["rows"] for t, e in full["tables"].items() if e["rows"]} == {"customers": 2, "products": 1, "charges": 2}
+
+    db.execute(update(Customer).where(Customer.id == "cus_1").values(email="b@x.io"))
+    bulk_upsert(db, Charge, [charge("ch_1", 100), charge("ch_2", 250)], stripe_charge_to_model)  # ch_1 unchanged
+    db.add(Customer(id="cus_3"))
+    db.delete(db.get(Product, "prod_1"))
+    db.commit()
+
+    delta = dump_incremental(db, str(tmp_path))
+    db.commit()
+    link_dir = tmp_path / delta["dir"]
+    assert delta["kind"] == "delta" and delta["since"] == full["snapshot"]
+    assert [r["id"] for r in rows(link_dir, delta, "customers")] == ["cus_1", "cus_3"]
+    assert [(r["id"], r["amount"]) for r in rows(link_dir, delta, "charges")] == [("ch_2", 250)]
+    assert delta["tables"]["products"] == {"rows": 0, "deleted": 1, "deleted_file": "products.deleted.ndjson.gz"}
+    assert list(iter_ndjson(str(link_dir / "products.deleted.ndjson.gz"))) == [{"id": "prod_1"}]
+    assert sorted(os.listdir(link_dir)) == ["charges.ndjson.gz", "customers.ndjson.gz", "products.deleted.ndjson.gz"]
+
+    quiet = dump_incremental(db, str(tmp_path))
+    assert os.listdir(tmp_path / quiet["dir"]) == []
+    assert [link["seq"] for link in read_manifest(str(tmp_path))["chain"]] == [0, 1, 2]
+
+def test_transaction_running_during_a_dump_lands_in_the_next_delta(tracked: Session, tmp_path):
+    db = tracked
+    db.add(Customer(id="cus_1", email="a@x.io"))
+    db.commit()
+    dump_incremental(db, str(tmp_path))
+    db.commit()
+
+    with db.get_bind().connect() as other:
+        other.execute(text("UPDATE customers SET email = 'late@x.io' WHERE id = 'cus_1'"))
+        missed = dump_incremental(db, str(tmp_path))  # the update is not committed yet
+        db.commit()
+        other.commit()
+
+    caught = dump_incremental(db, str(tmp_path))
+    assert missed["tables"]["customers"]["rows"] == 0
+    assert [r["email"] for r in rows(tmp_path / caught["dir"], caught, "customers")] == ["late@x.io"]
+
+def test_restore_replays_the_chain(tracked: Session, tmp_path):
+    db = tracked
+    db.add_all([Customer(id="cus_1", email="a@x.io", stripe_metadata={"tier": "gold"}), Product(id="prod_1", name="Pro")])
+    bulk_upsert(db, Charge, [charge("ch_1", 100)], stripe_charge_to_model)
+    db.commit()
+    dump_incremental(db, str(tmp_path))
+    db.commit()
+    db.execute(update(Customer).values(email="b@x.io"))
+    db.delete(db.get(Product, "prod_1"))
+    bulk_upsert(db, Charge, [charge("ch_2", 300)], stripe_charge_to_model)
+    db.commit()
+    dump_incremental(db, str(tmp_path))
+    db.commit()
+    expected = snapshot_of(db)
+    db.close()
+
+    Base.metadata.drop_all(bind=db.get_bind())
+    Base.metadata.create_all(bind=db.get_bind())
+    assert restore_chain(db, str(tmp_path)) == [0, 1]
+    assert snapshot_of(db) == expected
+    assert db.get(Customer, "cus_1").stripe_metadata == {"tier": "gold"}
+
+def test_moving_rows_between_partitions_is_not_a_deletion(tracked: Session, tmp_path):
+    db = tracked
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    convert_to_partitioned(db, "invoices", months_ahead=0)
+    db.commit()
+    dump_incremental(db, str(tmp_path))
+    db.commit()
+
+    db.execute(text("INSERT INTO invoices (id, customer_id, created) VALUES ('in_1', 'cus_1', '2030-01-05')"))
+    db.execute(text("INSERT INTO invoices (id, customer_id, created) VALUES ('in_2', 'cus_1', '2030-01-06')"))
+    db.commit()
+    assert "invoices_p203001" not in partitions(db, "invoices")
+    ensure_partitions(db, "invoices", [datetime(2030, 1, 1)])  # moves in_1, in_2 out of the default partition
+    db.commit()
+
+    delta = dump_incremental(db, str(tmp_path))
+    assert delta["tables"]["invoices"] == {"rows": 2, "deleted": 0, "file": "invoices.ndjson.gz"}
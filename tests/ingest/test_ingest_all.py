@@ -0,0 +1,66 @@
+import pytest
+from scripts.ingest import ingest_all
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.db.base import Base
+from sqlalchemy.orm import sessionmaker
+
+JSON_DIR = "data/imported_stripe_data"
+
+@pytest.fixture(autouse=True)
+def use_test_database(monkeypatch, db):
+    monkeypatch.setattr(ingest_all, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+def test_in_process_ingestion_of_all_tables(db):
+    modules = ingest_all.load_ingest_modules(ingest_all.TABLES)
+
+    counts = {
+        table: ingest_all.run_ingestion(modules[table], table, "json", JSON_DIR)
+        for table in ingest_all.TABLES
+    }
+
+    assert counts["customer"] == db.query(Customer).count() == 3
+    assert counts["charge"] == db.query(Charge).count() == 3
+
+def test_failing_table_stops_the_run(monkeypatch, capsys):
+    def boom(db, filepath, bulk=False):
+        raise RuntimeError("boom")
+
+    modules = ingest_all.load_ingest_modules(ingest_all.TABLES)
+    monkeypatch.setattr(modules["products"], "ingest_from_file", boom)
+    monkeypatch.setattr("sys.argv", ["ingest_all.py", "--source", "json", "--json-dir", JSON_DIR])
+
+    with pytest.raises(SystemExit) as exc:
+        ingest_all.main()
+
+    assert exc.value.code == 1
+    output = capsys.readouterr().out
+    assert "Stopped at 'products'" in output
+    assert "Ingesting price" not in output
+
+def test_dependency_graph_covers_foreign_keys():
+    table_of = {key: filename.removesuffix(".json") for key, filename in ingest_all.TABLE_FILE_MAP.items()}
+    key_of = {table: key for key, table in table_of.items()}
+
+    for key, table in table_of.items():
+        for fk in Base.metadata.tables[table].foreign_keys:
+            assert key_of[fk.column.table.name] in ingest_all.TABLE_DEPENDENCIES[key]
+
+    # TABLES stays a valid serial order of the graph
+    for i, table in enumerate(ingest_all.TABLES):
+        assert set(ingest_all.TABLE_DEPENDENCIES[table]) <= set(ingest_all.TABLES[:i])
+
+def test_parallel_run_respects_dependencies(monkeypatch):
+    modules = ingest_all.load_ingest_modules(ingest_all.TABLES)
+    finished = []
+
+    def fake_run(module, table, source, json_dir=None, **options):
+        assert set(ingest_all.TABLE_DEPENDENCIES[table]) <= set(finished)
+        finished.append(table)
+        return 0
+
+    monkeypatch.setattr(ingest_all, "run_ingestion", fake_run)
+    results, failed = ingest_all.run_all(modules, "api", workers=4)
+
+    assert failed is None
+    assert sorted(finished) == sorted(ingest_all.TABLES)
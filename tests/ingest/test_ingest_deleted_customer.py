@@ -1,22 +1,19 @@
-import pytest
 from sqlalchemy.orm import Session
 from app.models.customer import Customer
-from app.utils.stripe_helpers import ensure_customer_exists
+from app.models.invoice import Invoice
+from app.transformers.invoice import stripe_invoice_to_model
+from app.utils.stripe_helpers import add_new_objects
 
 def test_ensure_deleted_customer_placeholder_created(db: Session):
     ghost_id = "cus_DELETED123"
 
-    # Safety: should not exist
-    existing = db.get(Customer, ghost_id)
-    if existing:
-        db.delete(existing)
-        db.commit()
-
     # Ensure the customer does NOT exist
     assert db.get(Customer, ghost_id) is None
 
-    # Run the logic
-    ensure_customer_exists(db, ghost_id)
+    # Run the logic: an invoice of a deleted customer
+    invoice = {"id": "in_ghost", "object": "invoice", "customer": ghost_id, "status": "paid",
+               "created": 1700000000, "period_start": 1700000000, "period_end": 1700000000}
+    assert add_new_objects(db, Invoice, [invoice], stripe_invoice_to_model) == 1
     db.commit()  # Required for persistence
 
     # Fetch again
@@ -0,0 +1,42 @@
+import json
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert
+from app.db.json_codec import engine_options, get_codec
+from app.models.charge import Charge
+from app.models.price import Price
+from app.models.products import Product
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.price import stripe_price_to_model
+
+PAYLOAD = {"type": "card", "card": {"brand": "visa", "last4": "4242"}, "name": "Zoë", "tags": [1, None, True]}
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_codecs_round_trip(name):
+    if name == "orjson":
+        pytest.importorskip("orjson")
+    dumps, loads = get_codec(name)
+    encoded = dumps(PAYLOAD)
+    assert isinstance(encoded, str)
+    assert loads(encoded) == json.loads(encoded) == PAYLOAD
+
+def test_unknown_codec(monkeypatch):
+    monkeypatch.setenv("JSON_CODEC", "simdjson")
+    with pytest.raises(ValueError, match="simdjson"):
+        engine_options()
+
+def test_json_columns_are_stored_as_objects(db: Session):
+    db.add(Product(id="prod_1", name="Gold"))
+    db.commit()
+    charge = {"id": "ch_1", "created": 1700000000, "payment_method_details": PAYLOAD, "outcome": {"risk_level": "normal"}}
+    price = {"id": "price_1", "created": 1700000000, "product": "prod_1", "recurring": {"interval": "month"}}
+
+    db.add(stripe_charge_to_model(charge))
+    bulk_insert(db, Price, [price], stripe_price_to_model)
+    db.commit()
+
+    assert db.execute(text("SELECT jsonb_typeof(payment_method_details), outcome->>'risk_level' FROM charges")).one() == ("object", "normal")
+    assert db.execute(text("SELECT recurring->>'interval' FROM prices")).scalar() == "month"
+    db.expire_all()
+    assert db.get(Charge, "ch_1").payment_method_details == PAYLOAD
@@ -0,0 +1,39 @@
+import json
+import pytest
+from app.utils.json_stream import iter_stripe_objects, count_stripe_objects
+
+RECORDS = [
+    {"id": "ch_1", "object": "charge", "amount": 1200, "metadata": {"note": "a ] tricky } string"}},
+    {"id": "ch_2", "object": "charge", "amount": 123456789},
+]
+
+def write(tmp_path, payload):
+    path = tmp_path / "export.json"
+    path.write_text(payload if isinstance(payload, str) else json.dumps(payload, indent=2))
+    return str(path)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_stream_list_envelope(tmp_path, chunk_size):
+    path = write(tmp_path, {"object": "list", "data": RECORDS, "has_more": False, "url": "/v1/charges"})
+    assert list(iter_stripe_objects(path, expected_type="charge", chunk_size=chunk_size)) == RECORDS
+
+@pytest.mark.parametrize("chunk_size", [1, 65536])
+def test_stream_top_level_array(tmp_path, chunk_size):
+    path = write(tmp_path, RECORDS)
+    assert list(iter_stripe_objects(path, expected_type="charge", chunk_size=chunk_size)) == RECORDS
+
+def test_wrong_object_type_is_rejected(tmp_path):
+    path = write(tmp_path, RECORDS + [{"id": "in_1", "object": "invoice"}])
+    with pytest.raises(ValueError, match="Expected object type 'charge'"):
+        list(iter_stripe_objects(path, expected_type="charge"))
+
+def test_empty_data_is_rejected(tmp_path):
+    path = write(tmp_path, {"object": "list", "data": []})
+    with pytest.raises(ValueError, match="No objects found"):
+        list(iter_stripe_objects(path, expected_type="charge"))
+
+def test_count_matches_previous_semantics(tmp_path):
+    assert count_stripe_objects(write(tmp_path, {"object": "list", "data": RECORDS})) == 2
+    assert count_stripe_objects(write(tmp_path, RECORDS)) == 2
+    assert count_stripe_objects(write(tmp_path, RECORDS[0])) == 1
+    assert count_stripe_objects(write(tmp_path, {"object": "list"})) == 0
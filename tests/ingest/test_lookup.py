@@ -0,0 +1,47 @@
+from itertools import batched
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.db.lookup import missing_ids
+from app.models.customer import Customer
+from app.models.sync_state import SyncState
+from app.transformers.customer import stripe_customer_to_model
+from app.utils.stripe_fetch import PageEnd
+from app.utils.stripe_helpers import add_new_objects
+from app.utils.sync_state import CreatedCursor
+
+def test_missing_ids_anti_join(db: Session):
+    db.add_all([Customer(id="cus_a"), Customer(id="cus_b")])
+    db.commit()
+
+    assert missing_ids(db, Customer, ["cus_a", "cus_x", "cus_b", "cus_y"]) == {"cus_x", "cus_y"}
+    assert missing_ids(db, Customer, []) == set()
+
+def test_existence_checked_one_batch_at_a_time(db: Session):
+    db.add(Customer(id="cus_002"))
+    db.commit()
+    objects = [{"id": f"cus_{i:03d}", "object": "customer"} for i in range(7)]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        added = [add_new_objects(db, Customer, batch, stripe_customer_to_model) for batch in batched(objects, 3)]
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert added == [2, 3, 1]  # cus_002 already there
+    assert sum("unnest" in s for s in statements) == 3
+
+def test_iter_pages_checkpoints_after_page_is_processed(db: Session):
+    listing = [
+        {"id": "ch_4", "created": 400}, {"id": "ch_3", "created": 300}, PageEnd("ch_3"),
+        {"id": "ch_2", "created": 200}, {"id": "ch_1", "created": 100}, PageEnd("ch_1"),
+    ]
+    cursor = CreatedCursor(db, "charge", batch_size=1)
+
+    pages = cursor.iter_pages(listing)
+    assert [o["id"] for o in next(pages)] == ["ch_4", "ch_3"]
+    assert db.get(SyncState, "charge") is None  # nothing committed while the page is processed
+
+    assert [o["id"] for o in next(pages)] == ["ch_2", "ch_1"]
+    assert db.get(SyncState, "charge").resume_after == "ch_3"
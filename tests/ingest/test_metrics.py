@@ -0,0 +1,58 @@
+import json
+import time
+import pytest
+from sqlalchemy.orm import Session
+from app.utils import metrics
+from scripts.ingest import ingest_customer
+
+def customers_file(tmp_path, n):
+    data = [{"id": f"cus_{i}", "object": "customer", "created": 1700000000, "metadata": {}} for i in range(n)]
+    path = tmp_path / "customers.json"
+    path.write_text(json.dumps({"object": "list", "data": data}))
+    return str(path)
+
+@pytest.fixture(autouse=True)
+def quiet():
+    metrics.set_debug(False)
+    yield
+    metrics.set_debug(False)
+
+def test_stage_times_are_exclusive():
+    with metrics.track("charge") as tracked:
+        with metrics.stage("fetch"):
+            time.sleep(0.02)
+            with metrics.stage("commit"):
+                time.sleep(0.05)
+
+    assert 0.05 <= tracked.timings["commit"] < 0.1
+    assert 0.02 <= tracked.timings["fetch"] < 0.05
+
+def test_file_ingest_counts_without_per_object_logs(db: Session, tmp_path, capsys):
+    path = customers_file(tmp_path, 5)
+    with metrics.track("customer") as tracked:
+        ingest_customer.ingest_from_file(db, path)
+        db.commit()
+        ingest_customer.ingest_from_file(db, path)
+
+    assert tracked.counters == {"rows": 10, "inserted": 5, "skipped": 5}
+    assert tracked.timings["exists"] > 0 and tracked.timings["write"] > 0
+    assert "cus_0" not in capsys.readouterr().out
+
+    metrics.set_debug(True)
+    ingest_customer.ingest_from_file(db, path)
+    assert "✅ Skipped existing object: cus_0" in capsys.readouterr().out
+
+def test_summaries(tmp_path):
+    with metrics.track("charge") as tracked:
+        metrics.count("rows", 3)
+        metrics.count("inserted", 3)
+
+    prom = metrics.to_prometheus([tracked])
+    assert 'stripe_ingest_objects_total{table="charge",outcome="inserted"} 3' in prom
+    assert 'stripe_ingest_stage_seconds{table="charge",stage="fetch"}' in prom
+
+    path = tmp_path / "metrics.json"
+    metrics.write_summary(str(path), [tracked])
+    summary = json.loads(path.read_text())[0]
+    assert summary["counters"] == {"rows": 3, "inserted": 3}
+    assert set(summary["stages_s"]) == set(metrics.STAGES)
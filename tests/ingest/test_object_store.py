@@ -0,0 +1,66 @@
+import base64
+from types import SimpleNamespace
+import pytest
+from app.utils import object_store
+from app.utils.object_store import GCSBackend, LocalBackend, file_checksums, same_content, upload_folder
+
+@pytest.fixture()
+def source(tmp_path):
+    folder = tmp_path / "db_dump"
+    (folder / "dump_1").mkdir(parents=True)
+    (folder / "dump_1" / "customers.ndjson").write_text('{"id":"cus_1"}\n')
+    (folder / "dump_1" / "charges.ndjson").write_text('{"id":"ch_1"}\n')
+    (folder / "readme.txt").write_text("hello")
+    return folder
+
+def test_checksums_match_the_gcs_encoding(tmp_path):
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert file_checksums(str(empty))["md5"] == "1B2M2Y8AsgTpgAmY7PhCfg=="
+    if object_store.google_crc32c is not None:
+        assert file_checksums(str(empty))["crc32c"] == "AAAAAA=="
+
+def test_second_run_only_uploads_what_changed(source, tmp_path):
+    bucket = LocalBackend(str(tmp_path / "bucket"))
+    first = upload_folder(bucket, str(source), "dump", workers=4)
+    assert (first["uploaded"], first["skipped"], first["bytes"]) == (3, 0, 34)
+    assert (tmp_path / "bucket" / "dump" / "dump_1" / "charges.ndjson").read_text() == '{"id":"ch_1"}\n'
+
+    (source / "dump_1" / "charges.ndjson").write_text('{"id":"ch_2"}\n')  # same size, other content
+    second = upload_folder(bucket, str(source), "dump/", workers=4)
+    assert (second["uploaded"], second["skipped"]) == (1, 2)
+    assert (tmp_path / "bucket" / "dump" / "dump_1" / "charges.ndjson").read_text() == '{"id":"ch_2"}\n'
+
+def test_crc32c_is_used_when_the_object_has_no_md5():
+    local = {"size": 3, "md5": "a", "crc32c": "c"}
+    assert same_content(local, {"size": 3, "md5": None, "crc32c": "c"})  # composite object
+    assert not same_content(local, {"size": 3, "md5": None, "crc32c": "x"})
+    assert not same_content(local, {"size": 4, "md5": "a", "crc32c": "c"})
+    assert not same_content(local, None)
+
+class FakeBucket:
+    def __init__(self):
+        self.objects, self.uploads = {}, []
+
+    def list_blobs(self, prefix):
+        return [SimpleNamespace(name=n, **meta) for n, meta in self.objects.items() if n.startswith(prefix)]
+
+    def blob(self, name, chunk_size=None):
+        def upload_from_filename(path, checksum=None):
+            self.uploads.append((name, chunk_size))
+            sums = file_checksums(path)
+            self.objects[name] = {"size": sums["size"], "md5_hash": sums["md5"], "crc32c": sums["crc32c"]}
+        return SimpleNamespace(upload_from_filename=upload_from_filename)
+
+def test_gcs_backend_uses_resumable_chunks_for_large_files(source, monkeypatch):
+    monkeypatch.setattr(object_store, "RESUMABLE_THRESHOLD", 10)
+    bucket = FakeBucket()
+    backend = GCSBackend("stripe-oltp-bucket-test", client_factory=lambda: SimpleNamespace(bucket=lambda _: bucket))
+    upload_folder(backend, str(source), "dump", workers=2)
+    assert sorted(bucket.uploads) == [
+        ("dump/dump_1/charges.ndjson", object_store.CHUNK_SIZE),
+        ("dump/dump_1/customers.ndjson", object_store.CHUNK_SIZE),
+        ("dump/readme.txt", None),
+    ]
+    assert base64.b64decode(bucket.objects["dump/readme.txt"]["md5_hash"])
+    assert upload_folder(backend, str(source), "dump")["skipped"] == 3
@@ -0,0 +1,89 @@
+import json
+import psycopg2
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert
+from app.db.parallel_copy import dump_tables, restore_tables
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.utils.ndjson import zstandard
+from scripts.dump_all_tables import MODELS, iter_rows
+
+TABLES = [m.__tablename__ for m in MODELS]
+
+def seed(db: Session):
+    db.add_all([
+        Customer(id="cus_1", email="tab\there@x.io", description="line\nbreak \\ backslash", stripe_metadata={"k": "é"}),
+        Customer(id="cus_2", deleted=True),
+    ])
+    db.commit()
+    invoice = {"id": "in_1", "customer": "cus_1", "created": 1704067200, "period_start": 1704067200, "period_end": 1704067200, "total": 900}
+    bulk_insert(db, Invoice, [invoice], stripe_invoice_to_model)
+    bulk_insert(db, Charge, [{"id": "ch_1", "created": 1704067200, "amount": 900, "invoice": "in_1"}], stripe_charge_to_model)
+    db.commit()
+
+def contents(db: Session):
+    return {m.__tablename__: list(iter_rows(db, m)) for m in MODELS}
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_dump_then_restore_gives_the_same_rows(db: Session, tmp_path, compression):
+    if compression == "zstd" and zstandard is None:
+        pytest.skip("zstandard not installed")
+    seed(db)
+    expected = contents(db)
+    db.close()
+
+    manifest = dump_tables(db.get_bind(), str(tmp_path), TABLES, compression, jobs=4)
+    assert {t: e["rows"] for t, e in manifest["tables"].items() if e["rows"]} == {"customers": 2, "invoices": 1, "charges": 1}
+    assert json.loads((tmp_path / "manifest.json").read_text())["tables"]["customers"]["file"].startswith("customers.copy")
+
+    engine = db.get_bind()
+    schema = {t: (inspect(engine).get_indexes(t), inspect(engine).get_foreign_keys(t)) for t in TABLES}
+    restored = restore_tables(engine, str(tmp_path), jobs=4, truncate=True)
+    assert restored["charges"]["rows"] == 1
+    assert contents(db) == expected
+    # Deferred foreign keys and indexes are all back
+    assert {t: (inspect(engine).get_indexes(t), inspect(engine).get_foreign_keys(t)) for t in TABLES} == schema
+
+def schema_of(engine):
+    return {t: (inspect(engine).get_indexes(t), inspect(engine).get_foreign_keys(t)) for t in TABLES}
+
+def test_restore_checks_the_deferred_foreign_keys(db: Session, tmp_path):
+    seed(db)
+    db.close()
+    engine = db.get_bind()
+    schema = schema_of(engine)
+    dump_tables(engine, str(tmp_path), TABLES, "none")
+    # A dump whose invoice lost its customer
+    path = tmp_path / "customers.copy"
+    path.write_text("".join(line for line in path.read_text().splitlines(keepends=True) if not line.startswith("cus_1\t")))
+    with pytest.raises(RuntimeError, match="invoices_customer_id_fkey") as failure:
+        restore_tables(engine, str(tmp_path), truncate=True)
+    assert "charges_" not in str(failure.value)  # only the broken one is reported
+    # Every foreign key is still there, the broken one left NOT VALID
+    assert schema_of(engine) == schema
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT conname FROM pg_constraint WHERE contype = 'f' AND NOT convalidated")).scalars().all() \
+            == ["invoices_customer_id_fkey"]
+
+def test_failed_load_raises_its_own_error_and_puts_the_schema_back(db: Session, tmp_path):
+    seed(db)
+    db.close()
+    engine = db.get_bind()
+    schema = schema_of(engine)
+    dump_tables(engine, str(tmp_path), TABLES, "none")
+    (tmp_path / "charges.copy").write_text("not\ta\tcharge row\n")
+    with pytest.raises(psycopg2.DataError):
+        restore_tables(engine, str(tmp_path), truncate=True)
+    assert schema_of(engine) == schema
+
+def test_restore_refuses_to_mix_with_existing_rows(db: Session, tmp_path):
+    seed(db)
+    db.close()
+    dump_tables(db.get_bind(), str(tmp_path), TABLES)
+    with pytest.raises(RuntimeError, match="not empty"):
+        restore_tables(db.get_bind(), str(tmp_path))
@@ -0,0 +1,163 @@
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert, bulk_upsert
+from app.db.partitioning import (
+    PARTITIONED_TABLES, PLACEHOLDER_CREATED, convert_to_partitioned, convert_to_plain, ensure_partitions, is_partitioned,
+    partitions,
+)
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.spec import utc_datetime
+from app.utils.stripe_helpers import add_new_objects, references_before_merge
+
+JAN = 1704067200 + 86400 * 10   # 2024-01-11
+MAR = 1709251200 + 86400 * 10   # 2024-03-11
+
+def invoice(invoice_id, created, customer="cus_1"):
+    return {"id": invoice_id, "object": "invoice", "customer": customer, "status": "paid", "total": 100,
+            "created": created, "period_start": created, "period_end": created}
+
+def charge(charge_id, created, invoice_id=None, amount=100):
+    return {"id": charge_id, "object": "charge", "created": created, "amount": amount, "invoice": invoice_id}
+
+def partition_of(db, table, row_id):
+    return db.execute(text(f"SELECT tableoid::regclass::text FROM {table} WHERE id = :id"), {"id": row_id}).scalar()
+
+def foreign_keys(db, table):
+    return set(db.execute(text(
+        "SELECT conname FROM pg_constraint WHERE contype = 'f' AND conrelid = to_regclass(:t) AND conparentid = 0"
+    ), {"t": table}).scalars())
+
+def test_convert_then_ingest_into_monthly_partitions(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    bulk_insert(db, Invoice, [invoice("in_jan", JAN)], stripe_invoice_to_model)
+    # Unknown invoice → placeholder row without `created`
+    bulk_insert(db, Charge, [charge("ch_jan", JAN, "in_ghost")], stripe_charge_to_model, before_merge=references_before_merge(Charge))
+    db.commit()
+
+    for table in PARTITIONED_TABLES:
+        assert convert_to_partitioned(db, table)
+    db.commit()
+
+    assert all(is_partitioned(db, t) for t in PARTITIONED_TABLES)
+    assert partition_of(db, "invoices", "in_jan") == "invoices_p202401"
+    # The placeholder is kept with a sentinel `created`, the charge points at it with (id, created)
+    assert db.get(Invoice, "in_ghost").created == PLACEHOLDER_CREATED
+    assert db.get(Charge, "ch_jan").invoice_created == PLACEHOLDER_CREATED
+    assert foreign_keys(db, "charges") == {"charges_invoice_id_fkey", "charges_payment_intent_fkey"}
+    assert foreign_keys(db, "invoices") == {"invoices_customer_id_fkey"}
+    definition = db.execute(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = 'charges_invoice_id_fkey'")).scalar()
+    assert definition.startswith("FOREIGN KEY (invoice_id, invoice_created) REFERENCES invoices(id, created) MATCH FULL")
+
+    # Bulk (staging) and ORM paths create missing months; upserts match on (id, created)
+    assert bulk_insert(db, Charge, [charge("ch_mar", MAR, "in_unknown"), charge("ch_jan", JAN)], stripe_charge_to_model,
+                       before_merge=references_before_merge(Charge)) == 1
+    assert bulk_upsert(db, Charge, [charge("ch_mar", MAR, "in_unknown", amount=250)], stripe_charge_to_model,
+                       before_merge=references_before_merge(Charge)).updated == 1
+    assert add_new_objects(db, Invoice, [invoice("in_far", 1893456000 + 86400)], stripe_invoice_to_model) == 1  # 2030-01
+    db.commit()
+
+    assert partition_of(db, "charges", "ch_mar") == "charges_p202403"
+    assert db.query(Charge).filter_by(id="ch_mar").one().amount == 250
+    assert partition_of(db, "invoices", "in_unknown") == "invoices_default"   # placeholder
+    # Read the table in this transaction first: the month is only created once it commits
+    assert partition_of(db, "invoices", "in_far") == "invoices_p203001"
+
+    # Range queries only scan the matching month
+    plan = "\n".join(db.execute(text(
+        "EXPLAIN SELECT * FROM charges WHERE created >= :lo AND created < :hi"
+    ), {"lo": datetime(2024, 3, 1), "hi": datetime(2024, 4, 1)}).scalars())
+    assert "charges_p202403" in plan and "charges_p202401" not in plan
+
+def test_rows_in_the_default_partition_move_to_their_new_month(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    convert_to_partitioned(db, "invoices", months_ahead=0)
+    db.commit()
+    # Written without ensure_partitions (e.g. by hand): lands in the default partition
+    db.execute(text(
+        "INSERT INTO invoices (id, customer_id, created) VALUES ('in_early', 'cus_1', '2030-01-05')"
+    ))
+    assert partition_of(db, "invoices", "in_early") == "invoices_default"
+    db.commit()
+
+    bulk_insert(db, Invoice, [invoice("in_late", 1893456000 + 86400 * 20)], stripe_invoice_to_model)
+    db.commit()
+
+    assert partition_of(db, "invoices", "in_early") == "invoices_p203001"
+    assert partition_of(db, "invoices", "in_late") == "invoices_p203001"
+
+def test_revert_to_plain_tables_restores_keys(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    for table in PARTITIONED_TABLES:
+        convert_to_partitioned(db, table)
+    db.commit()
+    bulk_insert(db, Invoice, [invoice("in_1", JAN)], stripe_invoice_to_model)
+    bulk_insert(db, Charge, [charge("ch_1", JAN, "in_1")], stripe_charge_to_model, before_merge=references_before_merge(Charge))
+    db.commit()
+
+    for table in reversed(PARTITIONED_TABLES):
+        assert convert_to_plain(db, table)
+    db.commit()
+
+    assert not any(is_partitioned(db, t) for t in PARTITIONED_TABLES)
+    assert foreign_keys(db, "charges") == {"charges_invoice_id_fkey", "charges_payment_intent_fkey"}
+    assert db.get(Charge, "ch_1").invoice_id == "in_1"
+    assert db.get(Charge, "ch_1").invoice_created == utc_datetime(JAN)
+    primary_key = db.execute(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = 'charges_pkey'")).scalar()
+    assert primary_key == "PRIMARY KEY (id)"
+
+def test_partitions_are_committed_apart_from_the_ingest_transaction(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    convert_to_partitioned(db, "invoices", months_ahead=0)
+    db.commit()
+
+    assert ensure_partitions(db, "invoices", [datetime(2030, 1, 5)]) == 1
+    db.rollback()  # the ingest fails: the partition stays, and the cache says so
+    assert "invoices_p203001" in partitions(db, "invoices")
+    assert db.execute(text("SELECT to_regclass('invoices_p203001')")).scalar() is not None
+    assert ensure_partitions(db, "invoices", [datetime(2030, 1, 5)]) == 0
+
+def test_placeholder_is_replaced_by_the_real_row(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    for table in PARTITIONED_TABLES:
+        convert_to_partitioned(db, table)
+    db.commit()
+    bulk_insert(db, Charge, [charge("ch_1", JAN, "in_1")], stripe_charge_to_model, before_merge=references_before_merge(Charge))
+    db.commit()
+    assert partition_of(db, "invoices", "in_1") == "invoices_default"
+
+    # Like on plain tables, an insert keeps the placeholder and an upsert replaces it
+    assert bulk_insert(db, Invoice, [invoice("in_1", JAN)], stripe_invoice_to_model) == 0
+    assert bulk_upsert(db, Invoice, [invoice("in_1", JAN)], stripe_invoice_to_model).inserted == 1
+    db.commit()
+
+    assert partition_of(db, "invoices", "in_1") == "invoices_p202401"
+    assert db.query(Invoice).filter_by(id="in_1").count() == 1
+    assert db.get(Charge, "ch_1").invoice_created == utc_datetime(JAN)
+
+def test_plain_tables_skip_the_created_lookups(db: Session):
+    db.add(Customer(id="cus_1"))
+    db.commit()
+    bulk_insert(db, Invoice, [invoice("in_1", JAN)], stripe_invoice_to_model)
+    bulk_insert(db, Charge, [charge("ch_1", JAN, "in_1")], stripe_charge_to_model, before_merge=references_before_merge(Charge))
+    add_new_objects(db, Charge, [charge("ch_2", JAN, "in_1")], stripe_charge_to_model)
+    db.commit()
+    assert db.get(Charge, "ch_1").invoice_created is None and db.get(Charge, "ch_2").invoice_created is None
+
+    # Filled when the tables are partitioned
+    for table in PARTITIONED_TABLES:
+        convert_to_partitioned(db, table)
+    db.commit()
+    db.expire_all()
+    assert db.get(Charge, "ch_2").invoice_created == utc_datetime(JAN)
@@ -0,0 +1,68 @@
+import json
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.price import Price
+from app.models.subscription import Subscription
+from app.transformers.subscription import stripe_subscription_to_model
+from app.utils.stripe_helpers import ensure_references_exist, placeholders_before_merge
+from scripts.ingest import ingest_invoice
+
+START = 1700000000
+
+def fake_invoice(invoice_id, customer_id):
+    return {"id": invoice_id, "object": "invoice", "customer": customer_id, "status": "paid",
+            "created": START, "period_start": START, "period_end": START}
+
+def fake_subscription(subscription_id, customer_id, price_id):
+    return {"id": subscription_id, "object": "subscription", "customer": customer_id, "status": "active",
+            "created": START, "start_date": START, "items": {"data": [{"id": "si_1", "price": {"id": price_id}}]}}
+
+def test_file_ingest_creates_missing_customers_in_one_statement(db: Session, tmp_path):
+    db.add(Customer(id="cus_known"))
+    db.commit()
+    invoices = [fake_invoice(f"in_{i}", f"cus_gone_{i % 3}") for i in range(9)] + [fake_invoice("in_k", "cus_known")]
+    path = tmp_path / "invoices.json"
+    path.write_text(json.dumps({"object": "list", "data": invoices}))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert ingest_invoice.ingest_from_file(db, str(path)) == 10
+        db.commit()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert sum(s.startswith("INSERT INTO customers") for s in statements) == 1
+    ghosts = db.query(Customer).filter(Customer.deleted.is_(True)).all()
+    assert sorted(c.id for c in ghosts) == ["cus_gone_0", "cus_gone_1", "cus_gone_2"]
+    assert all(c.stripe_metadata == {"placeholder": True} for c in ghosts)
+
+def test_other_foreign_keys_get_placeholders(db: Session):
+    charges = [Charge(id="ch_1", invoice_id="in_gone"), Charge(id="ch_2", invoice_id=None)]
+    assert ensure_references_exist(db, charges) == 1
+    db.add_all(charges)
+    db.commit()
+    assert db.get(Invoice, "in_gone").stripe_metadata == {"placeholder": True}
+
+    objects = [fake_subscription("sub_1", "cus_gone", "price_gone"), fake_subscription("sub_2", "cus_gone", "price_gone")]
+    inserted = bulk_insert(db, Subscription, objects, stripe_subscription_to_model, before_merge=placeholders_before_merge(Subscription))
+    db.commit()
+
+    assert inserted == 2
+    assert db.get(Price, "price_gone").active is False
+    assert db.get(Customer, "cus_gone").deleted is True
+
+def test_placeholders_do_not_wait_for_the_ingesting_transaction(db: Session):
+    other = Session(bind=db.get_bind())
+    try:
+        ensure_references_exist(db, [Invoice(id="in_1", customer_id="cus_shared")])
+        # Another table ingested in parallel sees it right away, nothing left to lock
+        assert other.get(Customer, "cus_shared") is not None
+        assert ensure_references_exist(other, [Invoice(id="in_2", customer_id="cus_shared")]) == 0
+    finally:
+        other.close()
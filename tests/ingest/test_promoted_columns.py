@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_insert
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.price import Price
+from app.models.products import Product
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.price import stripe_price_to_model
+from app.utils.stripe_helpers import add_new_objects, references_before_merge
+from scripts.backfill_promoted_columns import backfill
+
+START = 1700000000
+
+def price(price_id, product, interval="month"):
+    return {"id": price_id, "object": "price", "product": product, "currency": "eur", "unit_amount": 900,
+            "created": START, "recurring": {"interval": interval, "usage_type": "licensed"}}
+
+def invoice(invoice_id, customer):
+    return {"id": invoice_id, "object": "invoice", "customer": customer, "status": "paid", "created": START,
+            "period_start": START, "period_end": START,
+            "status_transitions": {"finalized_at": START, "paid_at": START + 60, "voided_at": None}}
+
+def test_transformers_promote_payload_fields():
+    charge = stripe_charge_to_model({"id": "ch_1", "created": START,
+                                     "payment_method_details": {"card": {"brand": "visa", "funding": "debit"}}})
+    assert (charge.card_brand, charge.card_funding) == ("visa", "debit")
+
+    expanded = stripe_price_to_model(price("price_1", {"id": "prod_1", "name": "Gold"}, interval="year"))
+    assert (expanded.product_id, expanded.product_name, expanded.interval) == ("prod_1", "Gold", "year")
+
+def test_referenced_columns_are_copied_on_orm_and_bulk_paths(db: Session):
+    db.add_all([
+        Product(id="prod_1", name="Gold"),
+        Customer(id="cus_1", default_payment_method_id="pm_default"),
+    ])
+    db.commit()
+
+    assert add_new_objects(db, Price, [price("price_orm", "prod_1")], stripe_price_to_model) == 1
+    assert bulk_insert(db, Price, [price("price_bulk", "prod_1")], stripe_price_to_model,
+                       before_merge=references_before_merge(Price)) == 1
+    assert bulk_insert(db, Invoice, [invoice("in_1", "cus_1"), {**invoice("in_own", "cus_1"), "default_payment_method": "pm_own"}],
+                       stripe_invoice_to_model, before_merge=references_before_merge(Invoice)) == 2
+    db.commit()
+
+    assert [db.get(Price, i).product_name for i in ("price_orm", "price_bulk")] == ["Gold", "Gold"]
+    # The customer's current default was not necessarily the one when the invoice was issued
+    assert db.get(Invoice, "in_1").default_payment_method_id is None
+    assert db.get(Invoice, "in_own").default_payment_method_id == "pm_own"
+
+def test_backfill_fills_rows_ingested_without_promoted_columns(db: Session):
+    db.add(Product(id="prod_1", name="Gold"))
+    db.commit()
+    bulk_insert(db, Price, [price(f"price_{i}", "prod_1") for i in range(5)], stripe_price_to_model)
+    bulk_insert(db, Charge, [{"id": "ch_1", "created": START, "amount": 100,
+                              "payment_method_details": {"card": {"brand": "visa", "funding": "credit"}}}], stripe_charge_to_model)
+    bulk_insert(db, Invoice, [invoice("in_1", "cus_1")], stripe_invoice_to_model, before_merge=references_before_merge(Invoice))
+    # As ingested before the columns were populated
+    for model, values in ((Price, {"product_name": None, "interval": None}), (Charge, {"card_brand": None, "card_funding": None}),
+                          (Invoice, {"status_transitions_at": None})):
+        db.execute(update(model).values(**values))
+    db.commit()
+
+    assert backfill(db, batch_size=2) == {"charges": 1, "invoices": 1, "prices": 10, "subscriptions": 0}
+    db.expire_all()
+    assert {(p.product_name, p.interval) for p in db.query(Price)} == {("Gold", "month")}
+    assert (db.get(Charge, "ch_1").card_brand, db.get(Charge, "ch_1").card_funding) == ("visa", "credit")
+    assert db.get(Invoice, "in_1").status_transitions_at == datetime.fromtimestamp(START + 60, tz=timezone.utc)
+
+    # Nothing left to update
+    assert sum(backfill(db).values()) == 0
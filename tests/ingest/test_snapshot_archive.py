@@ -0,0 +1,50 @@
+import pytest
+from app.utils.object_store import LocalBackend
+from app.utils.snapshot_archive import archive_folder, blob_name, list_snapshots, materialize_snapshot, read_snapshot
+
+@pytest.fixture()
+def imported(tmp_path):
+    folder = tmp_path / "imported_stripe_data"
+    folder.mkdir()
+    (folder / "customers.json").write_text('[{"id": "cus_1"}]')
+    (folder / "products.json").write_text('[{"id": "prod_1"}]')
+    (folder / "prices.json").write_text('[{"id": "prod_1"}]')  # same content as products.json
+    return folder
+
+def test_identical_pushes_only_add_a_manifest(imported, tmp_path):
+    bucket = LocalBackend(str(tmp_path / "bucket"))
+    first = archive_folder(bucket, str(imported), snapshot="20250101_000000")
+    assert (first["files"], first["uploaded"]) == (3, 2)  # one blob for the two identical files
+
+    second = archive_folder(bucket, str(imported), snapshot="20250102_000000")
+    assert (second["uploaded"], second["bytes"]) == (0, 0)
+
+    (imported / "customers.json").write_text('[{"id": "cus_2"}]')
+    third = archive_folder(bucket, str(imported), snapshot="20250103_000000")
+    assert third["uploaded"] == 1
+    assert len(bucket.list("imported_data/blobs/")) == 3
+    assert list_snapshots(bucket) == ["20250101_000000", "20250102_000000", "20250103_000000"]
+
+def test_materialize_rebuilds_any_snapshot(imported, tmp_path):
+    bucket = LocalBackend(str(tmp_path / "bucket"))
+    archive_folder(bucket, str(imported), snapshot="old")
+    (imported / "customers.json").write_text('[{"id": "cus_2"}]')
+    archive_folder(bucket, str(imported), snapshot="new")
+
+    dest = tmp_path / "restored"
+    assert materialize_snapshot(bucket, "old", str(dest)) == {"files": 3, "downloaded": 3}
+    assert (dest / "customers.json").read_text() == '[{"id": "cus_1"}]'
+    assert (dest / "prices.json").read_text() == '[{"id": "prod_1"}]'
+
+    # Switching snapshots only fetches the files that differ
+    assert materialize_snapshot(bucket, "new", str(dest)) == {"files": 3, "downloaded": 1}
+    assert (dest / "customers.json").read_text() == '[{"id": "cus_2"}]'
+
+def test_materialize_rejects_a_corrupted_blob(imported, tmp_path):
+    bucket = LocalBackend(str(tmp_path / "bucket"))
+    archive_folder(bucket, str(imported), snapshot="s")
+    sha = read_snapshot(bucket, "s")["files"]["customers.json"]["sha256"]
+    (tmp_path / "bucket" / blob_name("imported_data", sha)).write_text("tampered")
+    with pytest.raises(ValueError, match="Corrupted"):
+        materialize_snapshot(bucket, "s", str(tmp_path / "restored"))
+    assert not (tmp_path / "restored" / "customers.json").exists()
@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime, timezone
+from app.db.bulk_loader import _column_values
+from app.models.customer import Customer
+from app.transformers.charge import stripe_charge_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.transformers.spec import compile_serializer, compile_spec, field, path, ref, required, timestamp
+
+START = 1700000000
+
+def fake_invoice(**extra):
+    return {"id": "in_1", "customer": "cus_1", "created": START, "period_start": START, "period_end": START, **extra}
+
+def test_compiled_converters_share_one_mapping():
+    converters = compile_spec(Customer, {
+        "id": required(),
+        "created": timestamp(optional=True),
+        "default_payment_method_id": ref(("invoice_settings", "default_payment_method")),
+        "stripe_metadata": field("metadata", default={}),
+        "address": path("address", "line1"),
+    }, name="test_customer")
+    data = {"id": "cus_1", "created": START, "invoice_settings": {"default_payment_method": {"id": "pm_1"}}}
+
+    instance = converters.to_model(data)
+    columns = list(Customer.__table__.columns)
+    assert list(converters.to_row(data)) == _column_values(instance, columns, {c.key: None for c in columns})
+    assert instance.default_payment_method_id == "pm_1"
+    assert instance.created == datetime(2023, 11, 14, 22, 13, 20)
+    assert instance.stripe_metadata == {} and instance.address is None
+    # Columns left out of the spec keep their model default in rows
+    assert converters.to_row(data)[[c.key for c in columns].index("deleted")] is False
+
+    with pytest.raises(ValueError, match="unknown columns"):
+        compile_spec(Customer, {"id": required(), "nope": field()})
+
+def test_columns_missing_from_the_old_transformers_are_filled():
+    charge = stripe_charge_to_model({"id": "ch_1", "created": START, "payment_method_details": {"type": "card", "card": {"brand": "visa"}}})
+    assert charge.card_brand == "visa"
+
+    invoice = stripe_invoice_to_model(fake_invoice(
+        status_transitions={"finalized_at": START, "paid_at": START + 60, "voided_at": None},
+        customer={"id": "cus_1", "invoice_settings": {"default_payment_method": "pm_from_customer"}},
+    ))
+    assert invoice.customer_id == "cus_1"
+    assert invoice.status_transitions_at == datetime.fromtimestamp(START + 60, tz=timezone.utc)
+    assert invoice.default_payment_method_id == "pm_from_customer"
+
+    invoice = stripe_invoice_to_model(fake_invoice(default_payment_method={"id": "pm_own"}, status_transitions=None))
+    assert invoice.default_payment_method_id == "pm_own"
+    assert invoice.status_transitions_at is None
+
+def test_serializer_reads_every_column():
+    serialize = compile_serializer(Customer)
+    row = serialize(Customer(id="cus_1", email="a@example.com"))
+    assert list(row) == [c.name for c in Customer.__table__.columns]
+    assert row["email"] == "a@example.com" and row["name"] is None
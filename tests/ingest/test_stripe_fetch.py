@@ -0,0 +1,97 @@
+import pytest
+import stripe
+from sqlalchemy.orm import Session
+from app.models.charge import Charge
+from app.models.sync_state import SyncState
+from app.utils.stripe_fetch import created_shards, fetch_sharded, find_oldest_created
+from scripts.ingest import ingest_charge
+
+START = 1700000000
+DAY = 86400
+
+def fake_charges(n, start=START, spacing=DAY // 4):
+    return [
+        {
+            "id": f"ch_{i:05d}",
+            "object": "charge",
+            "amount": 100 + i,
+            "currency": "eur",
+            "status": "succeeded",
+            "created": start + i * spacing,
+            "livemode": False,
+            "payment_intent": None,
+            "invoice": None,
+        }
+        for i in range(n)
+    ]
+
+def test_created_shards_cover_range_without_overlap():
+    shards = created_shards(1000, 2000, 7)
+    assert shards[0][0] == 1000 and shards[-1][1] == 2000
+    assert all(hi == next_lo for (_, hi), (next_lo, _) in zip(shards, shards[1:]))
+    assert created_shards(1000, 1003, 10) == [(1000, 1001), (1001, 1002), (1002, 1003)]
+
+def test_fetch_sharded_yields_each_object_once(stripe_standin):
+    stripe_standin.resources["charges"] = fake_charges(450)
+
+    objects = list(fetch_sharded(stripe.Charge.list, start=START, concurrency=4))
+
+    assert sorted(o["id"] for o in objects) == [f"ch_{i:05d}" for i in range(450)]
+    shard_requests = [p for _, p in stripe_standin.requests if "created[gte]" in p and "starting_after" not in p]
+    assert len(shard_requests) == 16
+
+def test_find_oldest_created_probes_with_limit_1(stripe_standin):
+    stripe_standin.resources["charges"] = fake_charges(10)
+
+    oldest = find_oldest_created(stripe.Charge.list, end=START + 10 * DAY)
+
+    assert START - DAY <= oldest <= START
+    assert all(p["limit"] == "1" for _, p in stripe_standin.requests)
+
+def test_sharded_ingest_then_incremental_run(db: Session, stripe_standin):
+    stripe_standin.resources["charges"] = fake_charges(250)
+
+    assert ingest_charge.ingest_from_api(db, concurrency=4) == 250
+    db.commit()
+    assert db.query(Charge).count() == 250
+    last_created = db.get(SyncState, "charge").last_created
+    assert last_created == START + 249 * (DAY // 4)
+
+    # Next run only asks for objects from the cursor on
+    stripe_standin.resources["charges"] += fake_charges(5, start=last_created + 10)
+    for i, obj in enumerate(stripe_standin.resources["charges"][-5:]):
+        obj["id"] = f"ch_new_{i}"
+    stripe_standin.requests.clear()
+
+    assert ingest_charge.ingest_from_api(db) == 5
+    db.commit()
+    assert stripe_standin.requests[0][1]["created[gte]"] == str(last_created)
+    assert db.query(Charge).count() == 255
+
+def test_interrupted_run_resumes_after_last_committed_page(db: Session, stripe_standin):
+    stripe_standin.resources["charges"] = fake_charges(450)
+    stripe_standin.fail_after = 3  # pages 1-3 served, page 4 fails
+
+    with pytest.raises(stripe.APIError):
+        ingest_charge.ingest_from_api(db, batch_size=200)
+    db.rollback()
+
+    # Pages 1-2 were committed together, page 3 was rolled back with the failure
+    assert db.query(Charge).count() == 200
+    state = db.get(SyncState, "charge")
+    newest_first = sorted(stripe_standin.resources["charges"], key=lambda o: o["created"], reverse=True)
+    assert state.resume_after == newest_first[199]["id"]
+    assert state.last_created is None
+
+    stripe_standin.fail_after = None
+    stripe_standin.requests.clear()
+
+    assert ingest_charge.ingest_from_api(db, batch_size=200) == 250
+    db.commit()
+
+    assert stripe_standin.requests[0][1]["starting_after"] == newest_first[199]["id"]
+    assert db.query(Charge).count() == 450
+    db.expire_all()
+    state = db.get(SyncState, "charge")
+    assert state.resume_after is None
+    assert state.last_created == newest_first[0]["created"]
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy.orm import Session
+from app.models.sync_state import SyncState
+from app.utils.sync_state import CreatedCursor
+
+class FakeListing:
+    """Stand-in for a stripe ListObject: objects sorted newest first."""
+    def __init__(self, objects):
+        self.objects = objects
+
+    def auto_paging_iter(self):
+        return iter(self.objects)
+
+def objs(*created):
+    return [{"id": f"ch_{c}", "created": c} for c in created]
+
+def test_first_run_lists_everything_and_saves_cursor(db: Session):
+    cursor = CreatedCursor(db, "charge")
+    assert cursor.list_params() == {}
+
+    seen = list(cursor.iter_new(FakeListing(objs(300, 200, 100))))
+    cursor.save()
+    db.commit()
+
+    assert len(seen) == 3
+    assert db.get(SyncState, "charge").last_created == 300
+
+def test_next_run_filters_and_stops_at_cursor(db: Session):
+    db.add(SyncState(resource="charge", last_created=200))
+    db.commit()
+
+    cursor = CreatedCursor(db, "charge")
+    assert cursor.list_params() == {"created": {"gte": 200}}
+
+    # Endpoints without a `created` filter still return old objects: paging stops there
+    seen = list(cursor.iter_new(FakeListing(objs(400, 200, 100, 50))))
+    cursor.save()
+    db.commit()
+
+    assert [o["created"] for o in seen] == [400, 200]
+    assert db.get(SyncState, "charge").last_created == 400
+
+def test_full_resync_ignores_cursor_but_never_moves_it_back(db: Session):
+    db.add(SyncState(resource="charge", last_created=500))
+    db.commit()
+
+    cursor = CreatedCursor(db, "charge", full_resync=True)
+    assert cursor.list_params() == {}
+
+    seen = list(cursor.iter_new(FakeListing(objs(300, 100))))
+    cursor.save()
+    db.commit()
+
+    assert len(seen) == 2
+    assert db.get(SyncState, "charge").last_created == 500
@@ -0,0 +1,75 @@
+import copy
+from sqlalchemy.orm import Session
+from app.db.bulk_loader import bulk_upsert, UpsertCounts
+from app.models.charge import Charge
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.transformers.customer import stripe_customer_to_model
+from app.transformers.invoice import stripe_invoice_to_model
+from app.utils.stripe_helpers import references_before_merge
+from scripts.ingest import ingest_charge
+
+START = 1700000000
+
+def fake_customer(customer_id, email):
+    return {"id": customer_id, "object": "customer", "email": email, "created": START, "metadata": {}}
+
+def fake_invoice(invoice_id, customer_id, status):
+    return {"id": invoice_id, "object": "invoice", "customer": customer_id, "status": status, "created": START,
+            "period_start": START, "period_end": START}
+
+def test_upsert_only_rewrites_changed_rows(db: Session):
+    customers = [fake_customer(f"cus_{i}", f"{i}@example.com") for i in range(3)]
+
+    assert bulk_upsert(db, Customer, customers, stripe_customer_to_model) == UpsertCounts(inserted=3)
+    db.commit()
+    assert bulk_upsert(db, Customer, customers, stripe_customer_to_model) == UpsertCounts(unchanged=3)
+    db.commit()
+
+    changed = copy.deepcopy(customers)
+    changed[1]["email"] = "changed@example.com"
+    changed.append(fake_customer("cus_3", "3@example.com"))
+    counts = bulk_upsert(db, Customer, changed, stripe_customer_to_model)
+    db.commit()
+
+    assert counts == UpsertCounts(inserted=1, updated=1, unchanged=2)
+    assert str(counts) == "1 inserted, 1 updated, 2 unchanged"
+    assert db.get(Customer, "cus_1").email == "changed@example.com"
+
+def test_upsert_picks_up_status_change_and_replaces_placeholder(db: Session):
+    counts = bulk_upsert(
+        db, Invoice, [fake_invoice("in_1", "cus_gone", "open")], stripe_invoice_to_model,
+        before_merge=references_before_merge(Invoice),
+    )
+    db.commit()
+    assert counts == UpsertCounts(inserted=1)
+    assert db.get(Customer, "cus_gone").deleted is True
+
+    # Same id twice in one batch: the last occurrence wins
+    batch = [fake_invoice("in_1", "cus_gone", "open"), fake_invoice("in_1", "cus_gone", "paid")]
+    assert bulk_upsert(db, Invoice, batch, stripe_invoice_to_model) == UpsertCounts(updated=1)
+    assert bulk_upsert(db, Customer, [fake_customer("cus_gone", "back@example.com")], stripe_customer_to_model) == UpsertCounts(updated=1)
+    db.commit()
+    db.expire_all()
+
+    assert db.get(Invoice, "in_1").status == "paid"
+    assert db.get(Customer, "cus_gone").email == "back@example.com"
+
+def test_api_upsert_with_checkpoints(db: Session, stripe_standin):
+    charges = [
+        {"id": f"ch_{i:03d}", "object": "charge", "amount": 100, "status": "pending", "created": START + i}
+        for i in range(250)
+    ]
+    stripe_standin.resources["charges"] = charges
+
+    counts = ingest_charge.ingest_from_api(db, batch_size=100, upsert=True)
+    db.commit()
+    assert counts == UpsertCounts(inserted=250)
+
+    for obj in charges[:7]:
+        obj["status"] = "succeeded"
+    counts = ingest_charge.ingest_from_api(db, full_resync=True, batch_size=100, upsert=True)
+    db.commit()
+
+    assert counts == UpsertCounts(updated=7, unchanged=243)
+    assert db.query(Charge).filter_by(status="succeeded").count() == 7
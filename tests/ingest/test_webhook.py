@@ -0,0 +1,115 @@
+import json
+import urllib.error
+import urllib.request
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.products import Product
+from app.models.stripe_event import StripeEvent
+from app.utils.stripe_events import apply_events
+from app.utils.webhook import WEBHOOK_PATH, WebhookReceiver, sign_payload
+
+SECRET = "whsec_test"
+START = 1700000000
+
+def event(event_id, event_type, obj, created=START):
+    return {"id": event_id, "object": "event", "type": event_type, "created": created, "data": {"object": obj}}
+
+def customer(customer_id, email, **extra):
+    return {"id": customer_id, "object": "customer", "email": email, "created": START, **extra}
+
+def invoice(invoice_id, customer_id, **extra):
+    return {"id": invoice_id, "object": "invoice", "customer": customer_id, "status": "paid",
+            "created": START, "period_start": START, "period_end": START, **extra}
+
+def post(server, evt, secret=SECRET) -> int:
+    payload = json.dumps(evt).encode()
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}{WEBHOOK_PATH}", data=payload, method="POST",
+        headers={"Stripe-Signature": sign_payload(payload, secret)},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_recorded_events_are_verified_batched_and_applied_once(db: Session):
+    receiver = WebhookReceiver(sessionmaker(bind=db.get_bind()), SECRET, batch_size=10, max_wait=0.2)
+    server = receiver.start(port=0)
+    try:
+        events = [
+            event("evt_1", "customer.created", customer("cus_1", "a@example.com")),
+            event("evt_2", "invoice.paid", invoice("in_1", "cus_1"), created=START + 1),
+            event("evt_3", "charge.succeeded", {"id": "ch_1", "object": "charge", "created": START + 2, "invoice": "in_1", "amount": 500}, created=START + 2),
+            event("evt_4", "balance.available", {"object": "balance"}),
+        ]
+        assert [post(server, e) for e in events] == [200] * 4
+        assert post(server, events[1]) == 200                       # redelivery
+        assert post(server, events[0], secret="whsec_wrong") == 400  # bad signature
+        receiver.wait_idle()
+    finally:
+        receiver.stop()
+
+    assert db.get(Invoice, "in_1").customer_id == "cus_1"
+    assert db.get(Customer, "cus_1").email == "a@example.com"
+    assert db.query(StripeEvent).count() == 4
+    assert receiver.counts["rejected"] == 1 and receiver.counts["ignored"] == 1
+    assert receiver.counts["inserted"] == 3
+
+def test_last_event_wins_and_deletions(db: Session):
+    db.add(Product(id="prod_1", name="Gold"))
+    db.commit()
+    counts = apply_events(db, [
+        event("evt_3", "customer.updated", customer("cus_1", "new@example.com"), created=START + 2),
+        event("evt_1", "customer.created", customer("cus_1", "old@example.com")),
+        event("evt_4", "customer.deleted", customer("cus_2", "gone@example.com"), created=START + 3),
+        event("evt_5", "invoice.created", invoice("in_draft", "cus_1", status="draft")),
+        event("evt_6", "invoice.deleted", invoice("in_draft", "cus_1", status="draft"), created=START + 4),
+        event("evt_7", "product.deleted", {"id": "prod_1", "object": "product", "deleted": True}, created=START + 5),
+    ])
+    db.commit()
+
+    assert counts["events"] == 6
+    assert db.get(Customer, "cus_1").email == "new@example.com"
+    assert db.get(Customer, "cus_2").deleted is True
+    assert db.get(Invoice, "in_draft") is None
+    assert db.get(Product, "prod_1").active is False
+
+    again = apply_events(db, [event("evt_1", "customer.created", customer("cus_1", "old@example.com"))])
+    assert again["duplicates"] == 1 and again["events"] == 0
+
+def test_older_event_in_a_later_batch_is_not_applied(db: Session):
+    apply_events(db, [
+        event("evt_2", "customer.updated", customer("cus_1", "new@example.com"), created=START + 2),
+        event("evt_4", "customer.deleted", customer("cus_2", "gone@example.com"), created=START + 4),
+        event("evt_5", "invoice.deleted", invoice("in_1", "cus_1"), created=START + 5),
+    ])
+    db.commit()
+    counts = apply_events(db, [
+        event("evt_1", "customer.created", customer("cus_1", "old@example.com"), created=START + 1),
+        event("evt_3", "customer.updated", customer("cus_2", "back@example.com"), created=START + 3),
+        event("evt_0", "invoice.created", invoice("in_1", "cus_1"), created=START),
+    ])
+    db.commit()
+
+    assert counts["stale"] == 3 and counts["events"] == 3
+    assert db.get(Customer, "cus_1").email == "new@example.com"
+    assert db.get(Customer, "cus_2").deleted is True
+    assert db.get(Invoice, "in_1") is None
+    assert db.get(StripeEvent, "evt_1") is not None  # recorded all the same: a redelivery is a duplicate
+
+def test_full_queue_and_failing_events(db: Session):
+    receiver = WebhookReceiver(sessionmaker(bind=db.get_bind()), SECRET, queue_size=1)
+    payload = json.dumps(event("evt_1", "customer.created", customer("cus_1", "a@example.com"))).encode()
+    assert receiver.receive(payload, sign_payload(payload, SECRET)) == 200
+    assert receiver.receive(payload, sign_payload(payload, SECRET)) == 503
+
+    # A malformed invoice (no period) fails alone, the rest of its batch is applied
+    counts = receiver.apply([
+        event("evt_2", "customer.created", customer("cus_2", "b@example.com")),
+        event("evt_3", "invoice.paid", {"id": "in_bad", "object": "invoice", "created": START}),
+    ])
+    assert counts["failed"] == 1 and counts["inserted"] == 1
+    assert db.get(Customer, "cus_2") is not None
+    assert db.get(StripeEvent, "evt_3") is None
@@ -0,0 +1,30 @@
+import importlib.util
+from pathlib import Path
+from sqlalchemy import inspect
+import app.models
+from app.db.base import Base
+
+VERSIONS = Path(__file__).resolve().parents[1] / "alembic/versions"
+MIGRATIONS = ["b6d1e4f8a209_add_fk_and_created_indexes.py", "e9c3b5a1d7f2_index_stripe_events_object_id.py"]
+
+def declared_indexes():
+    return {
+        (table.name, index.name)
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if not all(c.primary_key for c in index.columns)
+    }
+
+def test_migration_creates_the_indexes_declared_on_models(db):
+    migrated = set()
+    for filename in MIGRATIONS:
+        spec = importlib.util.spec_from_file_location("index_migration", VERSIONS / filename)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        migrated |= {(table, f"ix_{table}_{column}") for table, column in migration.INDEXES}
+    assert migrated == declared_indexes()
+
+    # create_all (tests, init_db) builds them too
+    inspector = inspect(db.get_bind())
+    built = {(table, ix["name"]) for table in inspector.get_table_names() for ix in inspector.get_indexes(table)}
+    assert migrated <= built